@@ -1,14 +1,19 @@
-from typing import Annotated
+from functools import partial
+from typing import Annotated, Dict, List, Optional
 
 from marker.builders import BaseBuilder
 from marker.builders.layout import LayoutBuilder
 from marker.builders.line import LineBuilder
 from marker.builders.ocr import OcrBuilder
+from marker.cache import PageResultCache, config_digest
+from marker.providers.images import ImageBudget, PageImageCache
 from marker.providers.pdf import PdfProvider
+from marker.providers.source import is_in_memory, source_filepath
 from marker.schema import BlockTypes
 from marker.schema.document import Document
 from marker.schema.groups.page import PageGroup
 from marker.schema.registry import get_block_class
+from marker.util import prefetch
 
 
 class DocumentBuilder(BaseBuilder):
@@ -23,31 +28,171 @@ class DocumentBuilder(BaseBuilder):
         int,
         "DPI setting for high-resolution page images used for OCR.",
     ] = 192
+    image_cache_max_bytes: Annotated[
+        int,
+        "The maximum number of bytes of page images to keep in memory, shared by every document converted in the",
+        "process with the same limit.  Page images are rendered on demand, and the least recently used ones are",
+        "evicted past this limit.",
+    ] = 1024 * 1024 * 1024
+    image_cache_spill: Annotated[
+        bool,
+        "Write page images evicted from memory to compressed temporary files, and read them back instead of",
+        "rendering the pages again.",
+    ] = True
+    image_cache_spill_dir: Annotated[
+        Optional[str],
+        "The directory to write evicted page images to.  Default is None, which uses the system temporary directory.",
+    ] = None
+    image_readahead_pages: Annotated[
+        int,
+        "The number of pages to render together when a low-resolution page image is first requested.",
+    ] = 8
+    highres_region_max_fraction: Annotated[
+        float,
+        "Render high-resolution crops, like tables and figures, on their own when they cover at most this fraction",
+        "of a page whose high-resolution image isn't rendered yet.  Set to 0 to always render the whole page.",
+    ] = 0.25
+    multires_images: Annotated[
+        bool,
+        "Render high-resolution images in the same pass as low-resolution images, downsampling for the low resolution.",
+        "Useful when most pages will be OCRed.",
+    ] = False
     disable_ocr: Annotated[
         bool,
         "Disable OCR processing.",
     ] = False
+    page_cache_dir: Annotated[
+        Optional[str],
+        "A directory to cache built pages in, keyed by a hash of the page content and the config.",
+        "Pages seen before skip the layout, line and OCR models.  Default is None, which disables the cache.",
+    ] = None
+    pipeline_batch_pages: Annotated[
+        Optional[int],
+        "Run the layout, line and OCR models over batches of this many pages, while page images and text",
+        "for the next batches are prepared in a background thread.  Default is None, which runs each model",
+        "over all pages at once.",
+    ] = None
+    pipeline_depth: Annotated[
+        int,
+        "The number of page batches to prepare ahead of the models when pipelining.",
+        "Prepared page images count towards the image cache budget.",
+    ] = 2
 
     def __call__(self, provider: PdfProvider, layout_builder: LayoutBuilder, line_builder: LineBuilder, ocr_builder: OcrBuilder):
         document = self.build_document(provider)
+
+        page_cache = None
+        fingerprints = {}
+        cached_pages = {}
+        if self.page_cache_dir:
+            page_cache = PageResultCache(
+                self.page_cache_dir,
+                config_digest(provider, self, layout_builder, line_builder, ocr_builder),
+            )
+            fingerprints = provider.get_page_fingerprints(list(provider.page_range))
+            cached_pages = self.load_cached_pages(document, page_cache, fingerprints)
+
+        # Only run the models over pages that weren't in the cache
+        all_pages = document.pages
+        document.pages = [p for p in all_pages if p.page_id not in cached_pages]
+        if document.pages:
+            if self.pipeline_batch_pages and len(document.pages) > self.pipeline_batch_pages:
+                self.build_pipelined(document, provider, layout_builder, line_builder, ocr_builder)
+            else:
+                self.build_pages(document, provider, layout_builder, line_builder, ocr_builder)
+
+            if page_cache is not None:
+                for page in document.pages:
+                    if page.page_id in fingerprints:
+                        page_cache.put_page(fingerprints[page.page_id], page)
+
+        document.pages = [cached_pages.get(p.page_id, p) for p in all_pages]
+        if cached_pages:
+            self.assign_provider_data(document, provider)
+        return document
+
+    def build_pages(self, document: Document, provider: PdfProvider, layout_builder: LayoutBuilder, line_builder: LineBuilder, ocr_builder: OcrBuilder):
         layout_builder(document, provider)
+        # Text extraction may still be streaming in while layout runs
+        self.assign_provider_data(document, provider)
         line_builder(document, provider)
         if not self.disable_ocr:
             ocr_builder(document, provider)
-        return document
+
+    def build_pipelined(self, document: Document, provider: PdfProvider, layout_builder: LayoutBuilder, line_builder: LineBuilder, ocr_builder: OcrBuilder):
+        """
+        Build the pages in batches, rendering images and extracting text for the next batches while the
+        models run on the current one.
+        """
+        pages = document.pages
+        batches = [
+            pages[i:i + self.pipeline_batch_pages]
+            for i in range(0, len(pages), self.pipeline_batch_pages)
+        ]
+        try:
+            for batch in prefetch(batches, partial(self.prepare_pages, provider), self.pipeline_depth):
+                document.pages = batch
+                self.build_pages(document, provider, layout_builder, line_builder, ocr_builder)
+        finally:
+            document.pages = pages
+
+    def prepare_pages(self, provider: PdfProvider, pages: List[PageGroup]):
+        # Everything the models need from the provider, so they don't wait on rendering or text extraction
+        page_ids = [page.page_id for page in pages]
+        pages[0]._image_cache.get_many(page_ids)
+        for page_id in page_ids:
+            provider.wait_for_page(page_id)
+
+    def load_cached_pages(self, document: Document, page_cache: PageResultCache, fingerprints: Dict[int, str]) -> Dict[int, PageGroup]:
+        cached_pages = {}
+        for page in document.pages:
+            if page.page_id not in fingerprints:
+                continue
+            cached_page = page_cache.get_page(fingerprints[page.page_id], page.page_id)
+            if cached_page is None:
+                continue
+            cached_page.set_image_cache(page._image_cache)
+            cached_page.page_plan = {**(cached_page.page_plan or {}), "cached": True}
+            cached_pages[page.page_id] = cached_page
+        return cached_pages
+
+    def create_image_cache(self, provider: PdfProvider) -> PageImageCache:
+        return PageImageCache(
+            provider,
+            self.lowres_image_dpi,
+            self.highres_image_dpi,
+            self.image_cache_max_bytes,
+            page_ids=provider.page_range,
+            readahead=self.image_readahead_pages,
+            multires=self.multires_images,
+            budget=ImageBudget.shared(self.image_cache_max_bytes),
+            spill=self.image_cache_spill,
+            spill_dir=self.image_cache_spill_dir,
+            region_max_fraction=self.highres_region_max_fraction,
+        )
 
     def build_document(self, provider: PdfProvider):
         PageGroupClass: PageGroup = get_block_class(BlockTypes.Page)
-        lowres_images = provider.get_images(provider.page_range, self.lowres_image_dpi)
-        highres_images = provider.get_images(provider.page_range, self.highres_image_dpi)
+        image_cache = self.create_image_cache(provider)
         initial_pages = [
             PageGroupClass(
                 page_id=p,
-                lowres_image=lowres_images[i],
-                highres_image=highres_images[i],
                 polygon=provider.get_page_bbox(p),
-                refs=provider.get_page_refs(p)
-            ) for i, p in enumerate(provider.page_range)
+            ) for p in provider.page_range
         ]
+        for page in initial_pages:
+            page.set_image_cache(image_cache)
         DocumentClass: Document = get_block_class(BlockTypes.Document)
-        return DocumentClass(filepath=provider.filepath, pages=initial_pages)
+        document = DocumentClass(filepath=source_filepath(provider.filepath), pages=initial_pages)
+        if is_in_memory(provider.filepath):
+            document.set_source(provider.filepath)
+        self.assign_provider_data(document, provider, wait=False)
+        return document
+
+    def assign_provider_data(self, document: Document, provider: PdfProvider, wait: bool = True):
+        for page in document.pages:
+            if not wait and not provider.is_page_ready(page.page_id):
+                continue
+            page.refs = provider.get_page_refs(page.page_id)
+            page.triage = provider.get_page_triage(page.page_id)
+            page.set_provider_chars(provider.get_page_chars(page.page_id))
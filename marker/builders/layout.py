@@ -1,9 +1,11 @@
-from typing import Annotated, List
+from typing import Annotated, Dict, List
 
+import numpy as np
 from surya.layout import LayoutPredictor
 from surya.layout.schema import LayoutResult, LayoutBox
 
 from marker.builders import BaseBuilder
+from marker.cache import LayoutTemplateCache, config_digest
 from marker.providers.pdf import PdfProvider
 from marker.schema import BlockTypes
 from marker.schema.document import Document
@@ -11,6 +13,9 @@ from marker.schema.groups.page import PageGroup
 from marker.schema.polygon import PolygonBox
 from marker.schema.registry import get_block_class
 from marker.settings import settings
+from marker.util import matrix_intersection_area
+from marker.utils.image import hash_distance, perceptual_hash
+from marker.utils.spatial import SpatialIndex
 
 
 class LayoutBuilder(BaseBuilder):
@@ -42,6 +47,33 @@ class LayoutBuilder(BaseBuilder):
     max_expand_frac: Annotated[
         float, "The maximum fraction to expand the layout box bounds by"
     ] = 0.05
+    layout_templates: Annotated[
+        bool,
+        "Reuse the layout of near-identical pages seen before, in the same document or earlier ones in this process,",
+        "instead of running the layout model.  Useful for forms, invoices and slides that repeat a page structure.",
+    ] = False
+    layout_template_hash_size: Annotated[
+        int,
+        "The width and height of the perceptual hash used to match pages to layout templates.",
+    ] = 16
+    layout_template_max_distance: Annotated[
+        int,
+        "The maximum number of differing hash bits for a page to match a layout template.",
+    ] = 12
+    layout_template_min_coverage: Annotated[
+        float,
+        "The minimum fraction of pdftext lines that must fall in a reused layout block, and of text blocks that must",
+        "contain a line, for a template to be used.  Pages without pdftext lines always run the layout model.",
+    ] = 0.9
+    layout_template_max_entries: Annotated[
+        int,
+        "The maximum number of layout templates to keep in memory.",
+    ] = 256
+    template_textless_blocks: List[BlockTypes] = [
+        BlockTypes.Picture,
+        BlockTypes.Figure,
+        BlockTypes.ComplexRegion,
+    ]
 
     def __init__(self, layout_model: LayoutPredictor, config=None):
         self.layout_model = layout_model
@@ -52,6 +84,8 @@ class LayoutBuilder(BaseBuilder):
         if self.force_layout_block is not None:
             # Assign the full content of every page to a single layout type
             layout_results = self.forced_layout(document.pages)
+        elif self.layout_templates:
+            layout_results = self.template_layout(document.pages, provider)
         else:
             layout_results = self.surya_layout(document.pages)
         self.add_blocks_to_pages(document.pages, layout_results)
@@ -91,26 +125,128 @@ class LayoutBuilder(BaseBuilder):
         )
         return layout_results
 
+    def template_layout(
+        self, pages: List[PageGroup], provider: PdfProvider
+    ) -> List[LayoutResult]:
+        """
+        Reuse the layout of matching templates, and run the model on the remaining pages.  Similar novel pages
+        are grouped, so the model runs on one page of each group, and the others are checked against its layout.
+        """
+        templates = LayoutTemplateCache.shared(
+            config_digest(self), self.layout_template_max_entries
+        )
+        images = [page.get_image(highres=False) for page in pages]
+        hashes = [
+            perceptual_hash(image, self.layout_template_hash_size) for image in images
+        ]
+        aspects = [image.width / image.height for image in images]
+
+        results: List[LayoutResult | None] = [None] * len(pages)
+        for i, page in enumerate(pages):
+            template = templates.find(
+                hashes[i], aspects[i], self.layout_template_max_distance
+            )
+            if template is not None and self.template_matches(page, provider, template):
+                results[i] = template
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(pages)):
+            if results[i] is not None:
+                continue
+            leader = next(
+                (
+                    j
+                    for j in groups
+                    if abs(aspects[j] - aspects[i]) <= 0.02 * aspects[i]
+                    and hash_distance(hashes[i], hashes[j])
+                    <= self.layout_template_max_distance
+                ),
+                None,
+            )
+            if leader is None:
+                groups[i] = []
+            else:
+                groups[leader].append(i)
+
+        reused = set(i for i in range(len(pages)) if results[i] is not None)
+
+        def run_model(idxs: List[int]):
+            if not idxs:
+                return
+            for i, result in zip(idxs, self.surya_layout([pages[i] for i in idxs])):
+                results[i] = result
+                templates.add(hashes[i], aspects[i], result)
+
+        run_model(list(groups))
+        retry = []
+        for leader, members in groups.items():
+            for i in members:
+                if self.template_matches(pages[i], provider, results[leader]):
+                    results[i] = results[leader]
+                    reused.add(i)
+                else:
+                    retry.append(i)
+        run_model(retry)
+
+        for i in reused:
+            pages[i].page_plan = {**(pages[i].page_plan or {}), "layout_template": True}
+        return results
+
+    def template_matches(
+        self, page: PageGroup, provider: PdfProvider, layout_result: LayoutResult
+    ) -> bool:
+        # Reused blocks have to cover the text lines on this page, and text blocks have to contain some text
+        provider_lines = provider.get_page_lines(page.page_id) or []
+        if not provider_lines or not layout_result.bboxes:
+            return False
+
+        layout_size = PolygonBox.from_bbox(layout_result.image_bbox).size
+        block_bboxes = [
+            PolygonBox(polygon=bbox.polygon).rescale(layout_size, page.polygon.size).bbox
+            for bbox in layout_result.bboxes
+        ]
+        line_bboxes = [line.line.polygon.bbox for line in provider_lines]
+        intersections = matrix_intersection_area(line_bboxes, block_bboxes)
+
+        line_areas = np.array(
+            [max((b[2] - b[0]) * (b[3] - b[1]), 1e-6) for b in line_bboxes]
+        )
+        lines_covered = (intersections.max(axis=1) / line_areas) >= 0.5
+        if lines_covered.mean() < self.layout_template_min_coverage:
+            return False
+
+        text_blocks = [
+            i
+            for i, bbox in enumerate(layout_result.bboxes)
+            if BlockTypes[bbox.label] not in self.template_textless_blocks
+        ]
+        if not text_blocks:
+            return True
+        blocks_filled = (intersections[:, text_blocks] > 0).any(axis=0)
+        return blocks_filled.mean() >= self.layout_template_min_coverage
+
     def expand_layout_blocks(self, document: Document):
         for page in document.pages:
             # Collect all blocks on this page as PolygonBox for easy access
             page_blocks = [document.get_block(bid) for bid in page.structure]
             page_size = page.polygon.size
+            block_index = SpatialIndex([b.polygon.bbox for b in page_blocks])
 
-            for block_id in page.structure:
-                block = document.get_block(block_id)
+            for block_idx, block in enumerate(page_blocks):
                 if block.block_type in self.expand_block_types:
-                    other_blocks = [b for b in page_blocks if b != block]
-                    if not other_blocks:
+                    # Blocks further away than the largest expansion can't limit it
+                    max_gap = self.max_expand_frac * max(block.polygon.size)
+                    _, gaps = block_index.gaps(
+                        block.polygon.bbox, max_gap, exclude=[block_idx]
+                    )
+                    if len(gaps) == 0:
                         block.polygon = block.polygon.expand(
                             self.max_expand_frac, self.max_expand_frac
                         ).fit_to_bounds((0, 0, *page_size))
+                        block_index.update(block_idx, block.polygon.bbox)
                         continue
 
-                    min_gap = min(
-                        block.polygon.minimum_gap(other.polygon)
-                        for other in other_blocks
-                    )
+                    min_gap = gaps.min()
                     if min_gap <= 0:
                         continue
 
@@ -127,6 +263,7 @@ class LayoutBuilder(BaseBuilder):
                         min(self.max_expand_frac, x_expand_frac),
                         min(self.max_expand_frac, y_expand_frac),
                     ).fit_to_bounds((0, 0, *page_size))
+                    block_index.update(block_idx, block.polygon.bbox)
 
     def add_blocks_to_pages(
         self, pages: List[PageGroup], layout_results: List[LayoutResult]
@@ -1,5 +1,5 @@
-from copy import deepcopy
-from typing import Annotated, List, Tuple
+from collections import defaultdict
+from typing import Annotated, Dict, List, Tuple
 
 import numpy as np
 from PIL import Image
@@ -11,15 +11,17 @@ from surya.ocr_error import OCRErrorPredictor
 from marker.builders import BaseBuilder
 from marker.providers import ProviderOutput, ProviderPageLines
 from marker.providers.pdf import PdfProvider
+from marker.providers.utils import word_stats
 from marker.schema import BlockTypes
+from marker.schema.blocks import Block
 from marker.schema.document import Document
 from marker.schema.groups.page import PageGroup
 from marker.schema.polygon import PolygonBox
 from marker.schema.registry import get_block_class
 from marker.schema.text.line import Line
 from marker.settings import settings
-from marker.util import matrix_intersection_area, sort_text_lines
-from marker.utils.image import is_blank_image
+from marker.util import sort_text_lines
+from marker.utils.spatial import SpatialIndex
 
 
 class LineBuilder(BaseBuilder):
@@ -66,6 +68,26 @@ class LineBuilder(BaseBuilder):
         BlockTypes.TableGroup,
         BlockTypes.PictureGroup,
     )
+    hybrid_ocr: Annotated[
+        bool,
+        "When a page's provider lines fail the quality checks, only OCR the blocks whose lines are missing or garbled,",
+        "and keep the provider text for the rest of the page.",
+    ] = False
+    hybrid_ocr_max_block_fraction: Annotated[
+        float,
+        "If more than this fraction of a page's blocks need OCR, the whole page is OCRed instead.",
+    ] = 0.75
+    hybrid_ocr_min_box_overlap: Annotated[
+        float,
+        "The minimum fraction of a detected line that has to be inside blocks that need OCR for it to be OCRed, on pages that are OCRed by block.",
+    ] = 0.5
+    # Pictures are kept as images, so their text isn't needed
+    hybrid_ocr_skip_blocks: Tuple[BlockTypes, ...] = (
+        BlockTypes.Figure,
+        BlockTypes.Picture,
+        BlockTypes.FigureGroup,
+        BlockTypes.PictureGroup,
+    )
     ocr_remove_blocks: Tuple[BlockTypes, ...] = (
         BlockTypes.Table,
         BlockTypes.Form,
@@ -80,7 +102,58 @@ class LineBuilder(BaseBuilder):
         "Disable OCR for the document. This will only use the lines from the provider.",
     ] = False
     keep_chars: Annotated[bool, "Keep individual characters."] = False
+    triage_skip_ocr_error: Annotated[
+        Tuple[str, ...],
+        "Page triage classes that skip the OCR error model, since their text quality is already known.",
+    ] = ("digital", "scanned", "blank", "image_only")
     detection_line_min_confidence: Annotated[float, "Minimum confidence for a detected line to be included"] = 0.8
+    ocr_error_cascade: Annotated[
+        bool,
+        "Label pages whose text is clearly clean or clearly garbled with cheap text statistics,",
+        "and only run the OCR error model on the rest.",
+    ] = False
+    ocr_error_min_words: Annotated[
+        int,
+        "The minimum number of words on a page for the text statistics to label it.",
+    ] = 20
+    ocr_error_clean_word_ratio: Annotated[
+        float,
+        "The minimum fraction of plausible words for a page to be labeled clean without the OCR error model.",
+    ] = 0.97
+    ocr_error_clean_common_ratio: Annotated[
+        float,
+        "The minimum fraction of common words, like 'the' or 'und', for a page to be labeled clean without the OCR error model.",
+    ] = 0.15
+    ocr_error_garbled_word_ratio: Annotated[
+        float,
+        "Pages with a lower fraction of plausible words than this are labeled garbled without the OCR error model.",
+    ] = 0.5
+    ocr_error_max_unknown_ratio: Annotated[
+        float,
+        "The maximum fraction of words in scripts the text statistics can't judge, for a page to be labeled clean without the model.",
+    ] = 0.1
+
+    adaptive_highres_dpi: Annotated[
+        bool,
+        "Pick the high-resolution DPI for each page from the height of its text lines, instead of using the same DPI",
+        "for every page.  Pages with large text are rendered with fewer pixels, and pages with small text with more.",
+    ] = False
+    highres_line_height: Annotated[
+        float,
+        "The target height of a text line in high-resolution page images, in pixels, with `adaptive_highres_dpi`.",
+    ] = 32
+    highres_line_percentile: Annotated[
+        float,
+        "The percentile of a page's line heights to size its high-resolution image for, so small text like footnotes stays legible.",
+    ] = 10
+    highres_min_dpi: Annotated[
+        int,
+        "The minimum DPI for high-resolution page images, with `adaptive_highres_dpi`.",
+    ] = 96
+    highres_max_dpi: Annotated[
+        int,
+        "The maximum DPI for high-resolution page images, with `adaptive_highres_dpi`.",
+    ] = 288
 
     def __init__(
         self,
@@ -136,8 +209,13 @@ class LineBuilder(BaseBuilder):
         return detection_results
 
     def get_all_lines(self, document: Document, provider: PdfProvider):
-        ocr_error_detection_results = self.ocr_error_detection(
-            document.pages, provider.page_lines
+        # Only the pages being built, so text for later pages can keep streaming in
+        provider_page_lines = {
+            page.page_id: provider.get_page_lines(page.page_id) or []
+            for page in document.pages
+        }
+        ocr_error_labels, ocr_error_decisions = self.get_ocr_error_labels(
+            document.pages, provider_page_lines, provider
         )
 
         boxes_to_ocr = {page.page_id: [] for page in document.pages}
@@ -146,29 +224,57 @@ class LineBuilder(BaseBuilder):
         LineClass: Line = get_block_class(BlockTypes.Line)
 
         layout_good = []
+        hybrid_ocr_blocks: Dict[int, List[Block] | None] = {}
         for document_page, ocr_error_detection_label in zip(
-            document.pages, ocr_error_detection_results.labels
+            document.pages, ocr_error_labels
         ):
             document_page.ocr_errors_detected = ocr_error_detection_label == "bad"
-            provider_lines: List[ProviderOutput] = provider.page_lines.get(
+            provider_lines: List[ProviderOutput] = provider_page_lines.get(
                 document_page.page_id, []
             )
-            provider_lines_good = all(
-                [
-                    bool(provider_lines),
-                    not document_page.ocr_errors_detected,
-                    self.check_layout_coverage(document_page, provider_lines),
-                    self.check_line_overlaps(
-                        document_page, provider_lines
-                    ),  # Ensure provider lines don't overflow the page or intersect
-                ]
-            )
+            if document_page.triage == "blank":
+                # Nothing to detect on a blank page
+                provider_lines_good = True
+            elif document_page.triage == "scanned":
+                # Scanned pages go straight to OCR
+                provider_lines_good = False
+            else:
+                provider_lines_good = all(
+                    [
+                        bool(provider_lines),
+                        not document_page.ocr_errors_detected,
+                        self.check_layout_coverage(document_page, provider_lines),
+                        self.check_line_overlaps(
+                            document_page, provider_lines
+                        ),  # Ensure provider lines don't overflow the page or intersect
+                    ]
+                )
             if self.disable_ocr:
                 provider_lines_good = True
 
+            if (
+                not provider_lines_good
+                and self.hybrid_ocr
+                and document_page.triage != "scanned"
+            ):
+                # Pages with some good provider text only OCR the blocks that need it
+                hybrid_ocr_blocks[document_page.page_id] = self.get_hybrid_ocr_blocks(
+                    document_page, provider_lines, provider
+                )
+
             layout_good.append(provider_lines_good)
 
         run_detection = [not good for good in layout_good]
+        for document_page, detect in zip(document.pages, run_detection):
+            ocr_blocks = hybrid_ocr_blocks.get(document_page.page_id)
+            document_page.page_plan = {
+                **(document_page.page_plan or {}),
+                "triage": document_page.triage,
+                "ocr_error_detection": ocr_error_decisions[document_page.page_id] == "model",
+                "ocr_error_decision": ocr_error_decisions[document_page.page_id],
+                "line_detection": detect,
+                "ocr_blocks": len(ocr_blocks) if ocr_blocks is not None else None,
+            }
         page_images = [
             page.get_image(highres=False, remove_blocks=self.ocr_remove_blocks)
             for page, bad in zip(document.pages, run_detection)
@@ -183,7 +289,7 @@ class LineBuilder(BaseBuilder):
         for document_page, detection_result, provider_lines_good in zip(
             document.pages, detection_results, layout_good
         ):
-            provider_lines: List[ProviderOutput] = provider.page_lines.get(
+            provider_lines: List[ProviderOutput] = provider_page_lines.get(
                 document_page.page_id, []
             )
 
@@ -196,6 +302,7 @@ class LineBuilder(BaseBuilder):
 
             detection_boxes = sort_text_lines(detection_boxes)
 
+            ocr_blocks = hybrid_ocr_blocks.get(document_page.page_id)
             if provider_lines_good:
                 document_page.text_extraction_method = "pdftext"
 
@@ -204,6 +311,20 @@ class LineBuilder(BaseBuilder):
                     provider_line.line.text_extraction_method = "pdftext"
 
                 page_lines[document_page.page_id] = provider_lines
+            elif ocr_blocks is not None:
+                document_page.text_extraction_method = "hybrid"
+                kept_lines, ocr_boxes = self.split_hybrid_lines(
+                    document_page, ocr_blocks, provider_lines, detection_boxes
+                )
+                for provider_line in kept_lines:
+                    provider_line.line.text_extraction_method = "pdftext"
+
+                # Blocks without any detected lines are still OCRed as a whole
+                for block in ocr_blocks:
+                    block.text_extraction_method = "surya"
+
+                page_lines[document_page.page_id] = kept_lines
+                boxes_to_ocr[document_page.page_id].extend(ocr_boxes)
             else:
                 document_page.text_extraction_method = "surya"
                 boxes_to_ocr[document_page.page_id].extend(detection_boxes)
@@ -213,10 +334,10 @@ class LineBuilder(BaseBuilder):
         for page_id, page_ocr_boxes in boxes_to_ocr.items():
             page_size = provider.get_page_bbox(page_id).size
             image_size = document.get_page(page_id).get_image(highres=False).size
-            for box_to_ocr in page_ocr_boxes:
-                line_polygon = PolygonBox(polygon=box_to_ocr.polygon).rescale(
-                    image_size, page_size
-                )
+            line_polygons = PolygonBox.rescale_many(
+                [box_to_ocr.polygon for box_to_ocr in page_ocr_boxes], image_size, page_size
+            )
+            for line_polygon in line_polygons:
                 ocr_lines[page_id].append(
                     ProviderOutput(
                         line=LineClass(
@@ -229,18 +350,206 @@ class LineBuilder(BaseBuilder):
                     )
                 )
 
+        if self.adaptive_highres_dpi:
+            for document_page in document.pages:
+                # Size for the lines that will be OCRed, and for the provider lines on pages without OCR
+                lines = ocr_lines[document_page.page_id] or page_lines[document_page.page_id]
+                dpi = self.get_highres_dpi(lines)
+                if dpi is not None:
+                    document_page.set_image_dpi(dpi, highres=True)
+                document_page.page_plan = {
+                    **(document_page.page_plan or {}),
+                    "highres_dpi": dpi,
+                }
+
         return page_lines, ocr_lines
 
+    def get_highres_dpi(self, lines: List[ProviderOutput]) -> int | None:
+        """
+        Pick the DPI that renders most of the lines, all but the smallest `highres_line_percentile` percent, at least
+        `highres_line_height` pixels tall.  Line heights are used instead of font sizes, since detected lines don't
+        have a font size, and some PDF fonts report a size of 1 and scale their glyphs instead.
+        """
+        heights = [line.line.polygon.height for line in lines]
+        heights = [height for height in heights if height > 0]
+        if not heights:
+            return None
+
+        line_height = np.percentile(heights, self.highres_line_percentile)
+        dpi = self.highres_line_height * 72 / line_height
+        return int(round(min(max(dpi, self.highres_min_dpi), self.highres_max_dpi)))
+
+    def get_hybrid_ocr_blocks(
+        self,
+        document_page: PageGroup,
+        provider_lines: List[ProviderOutput],
+        provider: PdfProvider | None = None,
+    ) -> List[Block] | None:
+        """
+        Pick the blocks on a page that need OCR, because no provider lines fall in them, or their text is garbled.
+        Returns None when the whole page should be OCRed instead.
+        """
+        if not provider_lines:
+            return None
+
+        blocks = [
+            block
+            for block in document_page.structure_blocks(document_page)
+            if block.block_type not in self.hybrid_ocr_skip_blocks
+        ]
+        if not blocks:
+            return None
+
+        block_lines = defaultdict(list)
+        line_intersections = document_page.compute_line_block_intersections(
+            blocks, provider_lines
+        )
+        for line_idx, (_, block_id) in line_intersections.items():
+            block_lines[block_id].append(provider_lines[line_idx])
+
+        ocr_blocks = []
+        for block in blocks:
+            lines = block_lines[block.id]
+            text = "\n".join(" ".join(s.text for s in line.spans) for line in lines)
+            label = self.heuristic_ocr_error_label(text, provider)
+            if (
+                len(lines) < self.layout_coverage_min_lines
+                or label == "bad"
+                # The page was flagged as a whole, so only blocks that are clearly clean keep their text
+                or (document_page.ocr_errors_detected and label != "good")
+                or not self.check_line_overlaps(document_page, lines)
+            ):
+                ocr_blocks.append(block)
+
+        # If no block explains the failed page checks, OCR the whole page like before
+        if not ocr_blocks or len(ocr_blocks) > self.hybrid_ocr_max_block_fraction * len(blocks):
+            return None
+        return ocr_blocks
+
+    def split_hybrid_lines(
+        self,
+        document_page: PageGroup,
+        ocr_blocks: List[Block],
+        provider_lines: List[ProviderOutput],
+        detection_boxes: List[PolygonBox],
+    ) -> Tuple[List[ProviderOutput], List[PolygonBox]]:
+        """
+        Keep the provider lines outside the blocks that need OCR, and the detected lines inside them.
+        Detected lines are in image coordinates, and stay that way.
+        """
+        page_blocks = [
+            block
+            for block in document_page.structure_blocks(document_page)
+            if block.block_type not in self.hybrid_ocr_skip_blocks
+        ]
+        ocr_block_ids = set(block.id for block in ocr_blocks)
+        line_intersections = document_page.compute_line_block_intersections(
+            page_blocks, provider_lines
+        )
+        kept_lines = [
+            line
+            for line_idx, line in enumerate(provider_lines)
+            if line_idx not in line_intersections
+            or line_intersections[line_idx][1] not in ocr_block_ids
+        ]
+
+        image_size = document_page.get_image(highres=False).size
+        block_index = SpatialIndex(
+            [
+                block.polygon.rescale(document_page.polygon.size, image_size).bbox
+                for block in ocr_blocks
+            ]
+        )
+        ocr_boxes = []
+        for box in detection_boxes:
+            _, areas = block_index.intersections(box.bbox)
+            if areas.sum() >= self.hybrid_ocr_min_box_overlap * max(box.area, 1):
+                ocr_boxes.append(box)
+        return kept_lines, ocr_boxes
+
+    def get_ocr_error_labels(
+        self,
+        pages: List[PageGroup],
+        provider_page_lines: ProviderPageLines,
+        provider: PdfProvider | None = None,
+    ) -> Tuple[List[str], Dict[int, str]]:
+        """
+        Label each page's text as good or bad, in tiers.  Pages the triage pre-scan classified skip the model,
+        then pages with clearly clean or garbled text, and only the remaining pages run the OCR error model.
+        Returns the labels, and which tier decided each page.
+        """
+        labels = []
+        decisions = {}
+        for page in pages:
+            if page.triage in self.triage_skip_ocr_error:
+                labels.append("good")
+                decisions[page.page_id] = "triage"
+                continue
+
+            label = None
+            if self.ocr_error_cascade:
+                label = self.heuristic_ocr_error_label(
+                    self.page_text(page, provider_page_lines), provider
+                )
+            labels.append(label)
+            decisions[page.page_id] = {
+                "good": "clean_text",
+                "bad": "garbled_text",
+                None: "model",
+            }[label]
+
+        model_pages = [page for page, label in zip(pages, labels) if label is None]
+        if model_pages:
+            model_labels = iter(
+                self.ocr_error_detection(model_pages, provider_page_lines).labels
+            )
+            labels = [
+                label if label is not None else next(model_labels) for label in labels
+            ]
+        return labels, decisions
+
+    def heuristic_ocr_error_label(
+        self, text: str, provider: PdfProvider | None = None
+    ) -> str | None:
+        # Returns None when the statistics aren't conclusive, so the model decides
+        if not text.strip():
+            return "bad"
+
+        detect_bad_ocr = getattr(provider, "detect_bad_ocr", None)
+        if detect_bad_ocr is not None and detect_bad_ocr(text):
+            return "bad"
+
+        stats = word_stats(text)
+        if stats["words"] < self.ocr_error_min_words:
+            return None
+
+        known_words = stats["words"] - stats["unknown"]
+        if known_words >= self.ocr_error_min_words:
+            plausible_ratio = stats["plausible"] / known_words
+            if plausible_ratio < self.ocr_error_garbled_word_ratio:
+                return "bad"
+        else:
+            plausible_ratio = 0
+
+        if (
+            stats["unknown"] / stats["words"] <= self.ocr_error_max_unknown_ratio
+            and plausible_ratio >= self.ocr_error_clean_word_ratio
+            and stats["common"] / stats["words"] >= self.ocr_error_clean_common_ratio
+        ):
+            return "good"
+        return None
+
+    @staticmethod
+    def page_text(page: PageGroup, provider_page_lines: ProviderPageLines) -> str:
+        provider_lines = provider_page_lines.get(page.page_id, [])
+        return "\n".join(
+            " ".join(s.text for s in line.spans) for line in provider_lines
+        )
+
     def ocr_error_detection(
         self, pages: List[PageGroup], provider_page_lines: ProviderPageLines
     ):
-        page_texts = []
-        for document_page in pages:
-            provider_lines = provider_page_lines.get(document_page.page_id, [])
-            page_text = "\n".join(
-                " ".join(s.text for s in line.spans) for line in provider_lines
-            )
-            page_texts.append(page_text)
+        page_texts = [self.page_text(page, provider_page_lines) for page in pages]
 
         self.ocr_error_model.disable_tqdm = self.disable_tqdm
         ocr_error_detection_results = self.ocr_error_model(
@@ -265,11 +574,11 @@ class LineBuilder(BaseBuilder):
             if bbox[3] > page_bbox[3]:
                 return False
 
-        intersection_matrix = matrix_intersection_area(provider_bboxes, provider_bboxes)
-        for i, line in enumerate(provider_lines):
+        line_index = SpatialIndex(provider_bboxes)
+        for bbox in provider_bboxes:
+            _, areas = line_index.intersections(bbox)
             intersect_counts = np.sum(
-                intersection_matrix[i]
-                > self.provider_line_provider_line_min_overlap_pct
+                areas > self.provider_line_provider_line_min_overlap_pct
             )
 
             # There should be one intersection with itself
@@ -303,11 +612,10 @@ class LineBuilder(BaseBuilder):
         if len(provider_bboxes) == 0:
             return False
 
-        intersection_matrix = matrix_intersection_area(layout_bboxes, provider_bboxes)
-
-        for idx, layout_block in enumerate(layout_blocks):
+        line_index = SpatialIndex(provider_bboxes)
+        for layout_block, layout_bbox in zip(layout_blocks, layout_bboxes):
             total_blocks += 1
-            intersecting_lines = np.count_nonzero(intersection_matrix[idx] > 0)
+            intersecting_lines = len(line_index.intersections(layout_bbox)[0])
 
             if intersecting_lines >= self.layout_coverage_min_lines:
                 covered_blocks += 1
@@ -327,21 +635,8 @@ class LineBuilder(BaseBuilder):
         return text_okay
 
     def filter_blank_lines(self, page: PageGroup, lines: List[ProviderOutput]):
-        page_size = (page.polygon.width, page.polygon.height)
-        page_image = page.get_image()
-        image_size = page_image.size
-
-        good_lines = []
-        for line in lines:
-            line_polygon_rescaled = deepcopy(line.line.polygon).rescale(
-                page_size, image_size
-            )
-            line_bbox = line_polygon_rescaled.fit_to_bounds((0, 0, *image_size)).bbox
-
-            if not is_blank_image(page_image.crop(line_bbox)):
-                good_lines.append(line)
-
-        return good_lines
+        # Every line is checked against the same page ink map, so each check is a constant time lookup
+        return [line for line in lines if not page.is_blank_region(line.line.polygon.bbox)]
 
     def merge_blocks(
         self,
@@ -360,6 +655,8 @@ class LineBuilder(BaseBuilder):
             merged_lines = self.filter_blank_lines(
                 document_page, provider_lines + ocr_lines
             )
+            # Later blank checks are rare, so they build the ink map again rather than holding it for every page
+            document_page.clear_ink_map()
 
             # Text extraction method is overridden later for OCRed documents
             document_page.merge_blocks(
@@ -0,0 +1,348 @@
+from html import escape
+import math
+from typing import Annotated, List, Optional, Tuple
+
+from PIL import Image
+from pydantic import BaseModel
+
+from marker.builders import BaseBuilder
+from marker.providers.source import (
+    BufferReader,
+    DocumentSource,
+    is_in_memory,
+    source_filepath,
+)
+from marker.schema import BlockTypes
+from marker.schema.blocks import Block
+from marker.schema.document import Document
+from marker.schema.groups.page import PageGroup
+from marker.schema.polygon import PolygonBox
+from marker.schema.registry import get_block_class
+
+
+class TextRun(BaseModel):
+    text: str
+    formats: List[str] = ["plain"]
+    url: Optional[str] = None
+
+
+class NativeTableCell(BaseModel):
+    text: str
+    row_id: int
+    col_id: int
+    rowspan: int = 1
+    colspan: int = 1
+    is_header: bool = False
+
+
+def split_runs(runs: List[TextRun]) -> List[List[TextRun]]:
+    # Split runs on newlines, so each group of runs becomes one line
+    lines = [[]]
+    for run in runs:
+        parts = run.text.split("\n")
+        for i, part in enumerate(parts):
+            if i > 0:
+                lines.append([])
+            if part:
+                lines[-1].append(run.model_copy(update={"text": part}))
+    return [line for line in lines if "".join(r.text for r in line).strip()]
+
+
+class NativeBuilder(BaseBuilder):
+    """
+    Builds a document directly from a structured file format, without converting it to a PDF or
+    running any models.  Most of these formats don't have fixed page geometry, so blocks are stacked
+    from top to bottom on synthetic pages.
+    """
+
+    page_width: Annotated[
+        float,
+        "The width of synthetic pages, in points.",
+    ] = 612
+    page_height: Annotated[
+        float,
+        "The height of synthetic pages, in points.",
+    ] = 792
+    page_margin: Annotated[
+        float,
+        "The margin around the content of synthetic pages, in points.",
+    ] = 36
+    line_height: Annotated[
+        float,
+        "The height of a line of text on synthetic pages, in points.",
+    ] = 14
+    chars_per_line: Annotated[
+        int,
+        "The number of characters that fit on a line of a synthetic page, used to estimate block heights.",
+    ] = 100
+    block_spacing: Annotated[
+        float,
+        "The vertical space between blocks on synthetic pages, in points.",
+    ] = 6
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.document: Document | None = None
+        self.page: PageGroup | None = None
+        self.cursor = 0.0
+
+    def __call__(self, filepath: DocumentSource) -> Document:
+        raise NotImplementedError
+
+    @staticmethod
+    def open_input(filepath: DocumentSource):
+        # The parsers for these formats all accept a path or a file object
+        if is_in_memory(filepath):
+            return BufferReader(filepath)
+        return filepath
+
+    def new_document(self, filepath: DocumentSource) -> Document:
+        DocumentClass: Document = get_block_class(BlockTypes.Document)
+        self.document = DocumentClass(filepath=source_filepath(filepath), pages=[])
+        if is_in_memory(filepath):
+            self.document.set_source(filepath)
+        self.page = None
+        return self.document
+
+    def finalize(self) -> Document:
+        # Renderers expect at least one page
+        if not self.document.pages:
+            self.new_page()
+        return self.document
+
+    def new_page(
+        self, width: float | None = None, height: float | None = None
+    ) -> PageGroup:
+        PageGroupClass: PageGroup = get_block_class(BlockTypes.Page)
+        page = PageGroupClass(
+            page_id=len(self.document.pages),
+            polygon=PolygonBox.from_bbox(
+                [0, 0, width or self.page_width, height or self.page_height]
+            ),
+            page_plan={"native": True},
+        )
+        self.document.pages.append(page)
+        self.page = page
+        self.cursor = self.page_margin
+        return page
+
+    def page_break(self):
+        # The next block starts a new page, so a break after the last block doesn't add an empty page
+        self.page = None
+
+    def allocate(self, height: float) -> PolygonBox:
+        """
+        Reserve the next `height` points of the current page, starting a new page if they don't fit.
+        """
+        if self.page is None:
+            self.new_page()
+
+        if (
+            self.cursor + height > self.page.polygon.height - self.page_margin
+            and self.cursor > self.page_margin
+        ):
+            self.new_page()
+
+        if self.cursor + height > self.page.polygon.height - self.page_margin:
+            # Blocks taller than a page, like long tables, stretch the page instead of being split
+            self.page.polygon = PolygonBox.from_bbox(
+                [0, 0, self.page.polygon.width, self.cursor + height + self.page_margin]
+            )
+
+        polygon = PolygonBox.from_bbox(
+            [
+                self.page_margin,
+                self.cursor,
+                self.page.polygon.width - self.page_margin,
+                self.cursor + height,
+            ]
+        )
+        self.cursor += height + self.block_spacing
+        return polygon
+
+    def text_height(self, text: str, width_fraction: float = 1) -> float:
+        chars_per_line = max(1, int(self.chars_per_line * width_fraction))
+        line_count = sum(
+            max(1, math.ceil(len(line) / chars_per_line)) for line in text.split("\n")
+        )
+        return line_count * self.line_height
+
+    def add_block(
+        self,
+        block_type: BlockTypes,
+        polygon: PolygonBox,
+        parent: Block | None = None,
+        **fields,
+    ) -> Block:
+        BlockClass = get_block_class(block_type)
+        block = self.page.add_full_block(
+            BlockClass(polygon=polygon, page_id=self.page.page_id, **fields)
+        )
+        (parent or self.page).add_structure(block)
+        return block
+
+    def add_lines(self, block: Block, runs: List[TextRun], polygon: PolygonBox):
+        lines = split_runs(runs)
+        line_height = polygon.height / max(len(lines), 1)
+        for i, line_runs in enumerate(lines):
+            line_polygon = PolygonBox.from_bbox(
+                [
+                    polygon.x_start,
+                    polygon.y_start + i * line_height,
+                    polygon.x_end,
+                    polygon.y_start + (i + 1) * line_height,
+                ]
+            )
+            line = self.add_block(BlockTypes.Line, line_polygon, parent=block)
+
+            position = 0
+            for j, run in enumerate(line_runs):
+                text = run.text
+                if j == len(line_runs) - 1:
+                    # Line breaks are rendered as spaces
+                    text += "\n"
+                self.add_block(
+                    BlockTypes.Span,
+                    line_polygon,
+                    parent=line,
+                    text=text,
+                    font="",
+                    font_weight=700 if "bold" in run.formats else 400,
+                    font_size=self.line_height,
+                    minimum_position=position,
+                    maximum_position=position + len(text),
+                    formats=run.formats,
+                    url=run.url,
+                )
+                position += len(text)
+
+    def add_text(
+        self,
+        block_type: BlockTypes,
+        runs: List[TextRun],
+        polygon: PolygonBox | None = None,
+        **fields,
+    ) -> Block | None:
+        text = "".join(run.text for run in runs).strip()
+        if not text:
+            return None
+
+        if polygon is None:
+            polygon = self.allocate(self.text_height(text))
+        block = self.add_block(block_type, polygon, **fields)
+        self.add_lines(block, runs, polygon)
+        return block
+
+    def add_list(
+        self,
+        items: List[Tuple[List[TextRun], int]],
+        polygon: PolygonBox | None = None,
+    ) -> List[Block]:
+        """
+        Add a list from (runs, indent level) items.  Lists that run over a page break are split into
+        one group per page.
+        """
+        items = [
+            (runs, level) for runs, level in items if "".join(r.text for r in runs).strip()
+        ]
+        if polygon is not None:
+            item_height = polygon.height / max(len(items), 1)
+
+        groups = []
+        for i, (runs, level) in enumerate(items):
+            if polygon is None:
+                text = "".join(run.text for run in runs)
+                item_polygon = self.allocate(self.text_height(text))
+            else:
+                item_polygon = PolygonBox.from_bbox(
+                    [
+                        polygon.x_start,
+                        polygon.y_start + i * item_height,
+                        polygon.x_end,
+                        polygon.y_start + (i + 1) * item_height,
+                    ]
+                )
+
+            if not groups or groups[-1].page_id != self.page.page_id:
+                groups.append(
+                    self.add_block(
+                        BlockTypes.ListGroup, PolygonBox.from_bbox(item_polygon.bbox)
+                    )
+                )
+            else:
+                groups[-1].polygon = groups[-1].polygon.merge([item_polygon])
+
+            item = self.add_block(
+                BlockTypes.ListItem,
+                item_polygon,
+                parent=groups[-1],
+                list_indent_level=level,
+            )
+            self.add_lines(item, runs, item_polygon)
+        return groups
+
+    def add_table(
+        self, cells: List[NativeTableCell], polygon: PolygonBox | None = None
+    ) -> Block | None:
+        cells = [cell for cell in cells if cell.rowspan > 0 and cell.colspan > 0]
+        if not cells:
+            return None
+
+        row_count = max(cell.row_id + cell.rowspan for cell in cells)
+        col_count = max(cell.col_id + cell.colspan for cell in cells)
+
+        # Rows are as tall as their tallest single-row cell
+        row_heights = [self.line_height] * row_count
+        for cell in cells:
+            if cell.rowspan == 1:
+                height = self.text_height(cell.text, cell.colspan / col_count)
+                row_heights[cell.row_id] = max(row_heights[cell.row_id], height)
+
+        if polygon is None:
+            polygon = self.allocate(sum(row_heights))
+        scale = polygon.height / sum(row_heights)
+        row_tops = [polygon.y_start]
+        for height in row_heights:
+            row_tops.append(row_tops[-1] + height * scale)
+        col_width = polygon.width / col_count
+
+        table = self.add_block(BlockTypes.Table, polygon)
+        for cell in cells:
+            cell_polygon = PolygonBox.from_bbox(
+                [
+                    polygon.x_start + cell.col_id * col_width,
+                    row_tops[cell.row_id],
+                    polygon.x_start + (cell.col_id + cell.colspan) * col_width,
+                    row_tops[cell.row_id + cell.rowspan],
+                ]
+            )
+            self.add_block(
+                BlockTypes.TableCell,
+                cell_polygon,
+                parent=table,
+                text_lines=[escape(line) for line in cell.text.split("\n")],
+                rowspan=cell.rowspan,
+                colspan=cell.colspan,
+                row_id=cell.row_id,
+                col_id=cell.col_id,
+                is_header=cell.is_header,
+            )
+        return table
+
+    def add_picture(
+        self, image: Image.Image, polygon: PolygonBox | None = None
+    ) -> Block:
+        if polygon is None:
+            content_width = self.page_width - 2 * self.page_margin
+            content_height = self.page_height - 2 * self.page_margin
+            height = min(
+                image.height * min(1.0, content_width / max(image.width, 1)),
+                content_height,
+            )
+            polygon = self.allocate(max(height, self.line_height))
+
+        # The original image is kept, since there is no page image to crop it from
+        image = image.convert("RGB")
+        return self.add_block(
+            BlockTypes.Picture, polygon, lowres_image=image, highres_image=image
+        )
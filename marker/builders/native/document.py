@@ -0,0 +1,24 @@
+from marker.builders.native.html import HTMLBuilder
+from marker.providers.source import DocumentSource
+from marker.schema.document import Document
+
+
+class DocxBuilder(HTMLBuilder):
+    """
+    Builds DOCX documents from the semantic HTML mammoth produces, so headings, lists, tables and
+    images come straight from the document styles.
+    """
+
+    def __call__(self, filepath: DocumentSource) -> Document:
+        import mammoth
+
+        source = self.open_input(filepath)
+        if isinstance(source, str):
+            with open(source, "rb") as docx_file:
+                result = mammoth.convert_to_html(docx_file)
+        else:
+            result = mammoth.convert_to_html(source)
+
+        self.new_document(filepath)
+        self.build_html(result.value)
+        return self.finalize()
@@ -0,0 +1,54 @@
+import posixpath
+from urllib.parse import unquote
+
+from PIL import Image
+
+from marker.builders.native.html import HTMLBuilder, open_image
+from marker.providers.source import DocumentSource
+from marker.schema.document import Document
+
+
+class EpubBuilder(HTMLBuilder):
+    """
+    Builds EPUB books by walking the DOM of each chapter in spine order.  Every chapter starts on a new
+    page, and images are read straight from the archive.
+    """
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.images = {}
+
+    def __call__(self, filepath: DocumentSource) -> Document:
+        import ebooklib
+        from ebooklib import epub
+
+        book = epub.read_epub(self.open_input(filepath), {"ignore_ncx": True})
+        self.images = {
+            item.file_name: item
+            for item in book.get_items()
+            if item.get_type() in (ebooklib.ITEM_IMAGE, ebooklib.ITEM_COVER)
+        }
+
+        self.new_document(filepath)
+        for item_id, _ in book.spine:
+            item = book.get_item_with_id(item_id)
+            if item is None or item.get_type() != ebooklib.ITEM_DOCUMENT:
+                continue
+
+            # Image paths in a chapter are relative to the chapter
+            self.base_path = posixpath.dirname(item.file_name)
+            self.page_break()
+            self.build_html(item.get_content().decode("utf-8", errors="replace"))
+        return self.finalize()
+
+    def load_image(self, src: str) -> Image.Image | None:
+        if src.startswith("data:"):
+            return super().load_image(src)
+
+        path = posixpath.normpath(
+            posixpath.join(self.base_path or "", unquote(src.split("#")[0]))
+        )
+        item = self.images.get(path)
+        if item is None:
+            return None
+        return open_image(item.get_content())
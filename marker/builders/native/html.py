@@ -0,0 +1,338 @@
+import base64
+import io
+import os
+import re
+from typing import List, Tuple
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
+from PIL import Image
+
+from marker.builders.native import NativeBuilder, NativeTableCell, TextRun
+from marker.logger import get_logger
+from marker.providers.source import DocumentSource, is_in_memory
+from marker.schema import BlockTypes
+from marker.schema.document import Document
+
+logger = get_logger()
+
+HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+LIST_TAGS = ("ul", "ol")
+SKIPPED_TAGS = ("script", "style", "head", "noscript", "template", "title", "meta")
+CONTAINER_TAGS = (
+    "html",
+    "body",
+    "div",
+    "section",
+    "article",
+    "main",
+    "header",
+    "footer",
+    "nav",
+    "aside",
+    "figure",
+    "figcaption",
+    "blockquote",
+    "address",
+    "form",
+    "fieldset",
+    "dl",
+    "dt",
+    "dd",
+    "center",
+)
+BLOCK_TAGS = (
+    tuple(HEADING_TAGS)
+    + LIST_TAGS
+    + CONTAINER_TAGS
+    + ("p", "table", "pre", "hr", "li")
+)
+IMAGE_TAGS = ("img", "svg")
+INLINE_FORMATS = {
+    "b": "bold",
+    "strong": "bold",
+    "i": "italic",
+    "em": "italic",
+    "sup": "superscript",
+    "sub": "subscript",
+    "code": "code",
+    "kbd": "code",
+    "tt": "code",
+    "u": "underline",
+    "mark": "highlight",
+    "small": "small",
+}
+
+
+def clean_runs(runs: List[TextRun]) -> List[TextRun]:
+    # Trim the whitespace around a block, and around the line breaks inside it
+    text = "".join(run.text for run in runs)
+    if not text.strip():
+        return []
+
+    runs = [run.model_copy() for run in runs]
+    for i, run in enumerate(runs):
+        prev_text = runs[i - 1].text if i > 0 else "\n"
+        if prev_text.endswith("\n") or prev_text.endswith(" "):
+            run.text = run.text.lstrip(" ")
+        run.text = re.sub(r" *\n *", "\n", run.text)
+
+    while runs and not runs[-1].text.strip(" \n"):
+        runs.pop()
+    if runs:
+        runs[-1].text = runs[-1].text.rstrip(" \n")
+    return [run for run in runs if run.text]
+
+
+def is_hidden(element: Tag) -> bool:
+    style = element.get("style") or ""
+    return element.has_attr("hidden") or bool(
+        re.search(r"display\s*:\s*none", style, re.IGNORECASE)
+    )
+
+
+def has_page_break(element: Tag, side: str) -> bool:
+    style = element.get("style") or ""
+    return bool(
+        re.search(rf"(page-)?break-{side}\s*:\s*(always|page)", style, re.IGNORECASE)
+    )
+
+
+def open_image(data: bytes) -> Image.Image | None:
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+    except Exception as e:
+        # Formats PIL can't read, like WMF, are dropped
+        logger.warning(f"Skipping unreadable image: {e}")
+        return None
+
+
+class HTMLBuilder(NativeBuilder):
+    """
+    Builds a document by walking the HTML DOM.  Headings, paragraphs, lists, tables and images are
+    taken from the tags that declare them, so no layout detection is needed.  CSS page breaks start a
+    new synthetic page.
+    """
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.base_path: str | None = None
+        self.blockquote_level = 0
+
+    def __call__(self, filepath: DocumentSource) -> Document:
+        if is_in_memory(filepath):
+            markup = memoryview(filepath).tobytes().decode("utf-8", errors="replace")
+        else:
+            with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+                markup = f.read()
+            # Relative images are loaded from next to the file
+            self.base_path = os.path.dirname(os.path.abspath(filepath))
+
+        self.new_document(filepath)
+        self.build_html(markup)
+        return self.finalize()
+
+    def build_html(self, markup: str):
+        soup = BeautifulSoup(markup, "html.parser")
+        self.walk(soup.body or soup)
+
+    def walk(self, element: Tag):
+        runs = []
+        for child in element.children:
+            if isinstance(child, Tag) and is_hidden(child):
+                continue
+
+            if not isinstance(child, Tag) or child.name not in BLOCK_TAGS + IMAGE_TAGS:
+                runs.extend(self.node_runs(child))
+                if isinstance(child, Tag) and child.find("img") is not None:
+                    self.add_paragraph(runs)
+                    runs = []
+                    self.add_images(child)
+                continue
+
+            self.add_paragraph(runs)
+            runs = []
+            if has_page_break(child, "before"):
+                self.page_break()
+            self.handle_block(child)
+            if has_page_break(child, "after"):
+                self.page_break()
+        self.add_paragraph(runs)
+
+    def handle_block(self, element: Tag):
+        name = element.name
+        if name in HEADING_TAGS:
+            self.add_text(
+                BlockTypes.SectionHeader,
+                clean_runs(self.inline_runs(element)),
+                heading_level=HEADING_TAGS[name],
+            )
+            self.add_images(element)
+        elif name == "p":
+            self.add_paragraph(self.inline_runs(element))
+            self.add_images(element)
+        elif name in LIST_TAGS:
+            self.add_list(self.list_items(element, 0))
+            self.add_images(element)
+        elif name == "li":
+            self.add_list(self.list_items(element, 0, items=[element]))
+        elif name == "table":
+            caption = element.find("caption", recursive=False)
+            if caption is not None:
+                self.add_text(BlockTypes.Caption, clean_runs(self.inline_runs(caption)))
+            self.add_table(self.table_cells(element))
+            self.add_images(element)
+        elif name == "figcaption":
+            self.add_text(BlockTypes.Caption, clean_runs(self.inline_runs(element)))
+        elif name == "img":
+            self.add_image(element)
+        elif name == "svg":
+            # Covers are often an svg wrapping a single image
+            for image in element.find_all("image"):
+                self.add_image(image)
+        elif name == "pre":
+            self.add_code(element.get_text())
+        elif name == "blockquote":
+            self.blockquote_level += 1
+            self.walk(element)
+            self.blockquote_level -= 1
+        elif name != "hr":
+            self.walk(element)
+
+    def add_paragraph(self, runs: List[TextRun]):
+        fields = {}
+        if self.blockquote_level:
+            fields = {"blockquote": True, "blockquote_level": self.blockquote_level}
+        self.add_text(BlockTypes.Text, clean_runs(runs), **fields)
+
+    def add_code(self, code: str):
+        code = code.strip("\n")
+        if not code.strip():
+            return
+        polygon = self.allocate(self.text_height(code))
+        self.add_block(BlockTypes.Code, polygon, code=code)
+
+    def inline_runs(
+        self, element: Tag, formats: Tuple[str, ...] = (), url: str | None = None
+    ) -> List[TextRun]:
+        runs = []
+        for child in element.children:
+            runs.extend(self.node_runs(child, formats, url))
+        return runs
+
+    def node_runs(
+        self, node, formats: Tuple[str, ...] = (), url: str | None = None
+    ) -> List[TextRun]:
+        if isinstance(node, PreformattedString):
+            # Comments, doctypes and other markup declarations
+            return []
+        if isinstance(node, NavigableString):
+            text = re.sub(r"\s+", " ", str(node))
+            return [TextRun(text=text, formats=list(formats) or ["plain"], url=url)]
+        if not isinstance(node, Tag) or node.name in SKIPPED_TAGS or is_hidden(node):
+            return []
+        if node.name == "br":
+            return [TextRun(text="\n")]
+
+        node_format = INLINE_FORMATS.get(node.name)
+        if node_format and node_format not in formats:
+            formats = formats + (node_format,)
+        if node.name == "a" and node.get("href"):
+            url = node["href"]
+
+        runs = self.inline_runs(node, formats, url)
+        if node.name in BLOCK_TAGS:
+            # Blocks nested in inline content, like paragraphs in table cells, start a new line
+            runs.append(TextRun(text="\n"))
+        return runs
+
+    def list_items(
+        self, element: Tag, level: int, items: List[Tag] | None = None
+    ) -> List[Tuple[List[TextRun], int]]:
+        if items is None:
+            items = element.find_all("li", recursive=False)
+
+        list_items = []
+        for item in items:
+            runs = []
+            nested = []
+            for child in item.children:
+                if isinstance(child, Tag) and child.name in LIST_TAGS:
+                    nested.append(child)
+                else:
+                    runs.extend(self.node_runs(child))
+
+            list_items.append((clean_runs(runs), level))
+            for nested_list in nested:
+                list_items.extend(self.list_items(nested_list, level + 1))
+        return list_items
+
+    def table_cells(self, table: Tag) -> List[NativeTableCell]:
+        rows = [row for row in table.find_all("tr") if row.find_parent("table") is table]
+
+        cells = []
+        occupied = set()
+        for row_id, row in enumerate(rows):
+            col_id = 0
+            for cell in row.find_all(["td", "th"], recursive=False):
+                while (row_id, col_id) in occupied:
+                    col_id += 1
+
+                rowspan = min(self.span_value(cell.get("rowspan")), len(rows) - row_id)
+                colspan = self.span_value(cell.get("colspan"))
+                for r in range(row_id, row_id + rowspan):
+                    for c in range(col_id, col_id + colspan):
+                        occupied.add((r, c))
+
+                text = "".join(run.text for run in clean_runs(self.inline_runs(cell)))
+                cells.append(
+                    NativeTableCell(
+                        text=re.sub(r"\n+", "\n", text),
+                        row_id=row_id,
+                        col_id=col_id,
+                        rowspan=rowspan,
+                        colspan=colspan,
+                        is_header=cell.name == "th" or row.find_parent("thead") is not None,
+                    )
+                )
+                col_id += colspan
+        return cells
+
+    @staticmethod
+    def span_value(value) -> int:
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return 1
+
+    def add_images(self, element: Tag):
+        # Images inside text blocks are placed after the text
+        for img in element.find_all("img"):
+            self.add_image(img)
+
+    def add_image(self, element: Tag):
+        src = element.get("src") or element.get("xlink:href") or element.get("href")
+        if not src:
+            return
+
+        image = self.load_image(src)
+        if image is not None:
+            self.add_picture(image)
+
+    def load_image(self, src: str) -> Image.Image | None:
+        match = re.match(r"data:[^;,]*;base64,(.*)", src, re.DOTALL)
+        if match is not None:
+            return open_image(base64.b64decode(match.group(1)))
+
+        # Remote images aren't fetched
+        if self.base_path is None or re.match(r"^[a-z][a-z0-9+.-]*:", src, re.I):
+            return None
+
+        path = os.path.join(self.base_path, unquote(src.split("#")[0]))
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            return open_image(f.read())
@@ -0,0 +1,188 @@
+import io
+from typing import List
+
+from PIL import Image
+
+from marker.builders.native import NativeBuilder, NativeTableCell, TextRun
+from marker.logger import get_logger
+from marker.providers.source import DocumentSource
+from marker.schema import BlockTypes
+from marker.schema.document import Document
+from marker.schema.polygon import PolygonBox
+
+logger = get_logger()
+
+EMU_PER_POINT = 12700
+
+
+class PowerPointBuilder(NativeBuilder):
+    """
+    Builds PPTX presentations straight from their shapes.  Each slide becomes a page the size of the
+    slide, and blocks keep the position of the shape they came from.
+    """
+
+    def __call__(self, filepath: DocumentSource) -> Document:
+        from pptx import Presentation
+
+        presentation = Presentation(self.open_input(filepath))
+        width = presentation.slide_width / EMU_PER_POINT
+        height = presentation.slide_height / EMU_PER_POINT
+
+        self.new_document(filepath)
+        for slide in presentation.slides:
+            self.new_page(width, height)
+            for shape in slide.shapes:
+                self.add_shape(shape)
+        return self.finalize()
+
+    def add_shape(self, shape):
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            for child in shape.shapes:
+                self.add_shape(child)
+        elif shape.has_table:
+            self.add_table(self.table_cells(shape.table), self.shape_polygon(shape))
+        elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            try:
+                image = Image.open(io.BytesIO(shape.image.blob))
+                image.load()
+            except Exception as e:
+                logger.warning(f"Skipping unreadable image: {e}")
+                return
+            self.add_picture(image, self.shape_polygon(shape))
+        elif shape.has_text_frame:
+            self.add_text_frame(shape)
+
+    def shape_polygon(self, shape) -> PolygonBox | None:
+        if None in (shape.left, shape.top, shape.width, shape.height):
+            return None
+
+        # Shapes can hang off the edge of the slide
+        page_width, page_height = self.page.polygon.size
+        x_start = min(max(shape.left / EMU_PER_POINT, 0), page_width - 1)
+        y_start = min(max(shape.top / EMU_PER_POINT, 0), page_height - 1)
+        x_end = min((shape.left + shape.width) / EMU_PER_POINT, page_width)
+        y_end = min((shape.top + shape.height) / EMU_PER_POINT, page_height)
+        return PolygonBox.from_bbox(
+            [x_start, y_start, x_end, y_end], ensure_nonzero_area=True
+        )
+
+    def add_text_frame(self, shape):
+        from pptx.enum.shapes import PP_PLACEHOLDER
+
+        block_type = BlockTypes.Text
+        fields = {}
+        bulleted = False
+        if shape.is_placeholder:
+            placeholder_type = shape.placeholder_format.type
+            if placeholder_type in [PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE]:
+                block_type, fields = BlockTypes.SectionHeader, {"heading_level": 1}
+            elif placeholder_type == PP_PLACEHOLDER.SUBTITLE:
+                block_type, fields = BlockTypes.SectionHeader, {"heading_level": 2}
+            elif placeholder_type in [PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT]:
+                # Body placeholders inherit their bullets from the slide master
+                bulleted = True
+
+        # Consecutive bullet paragraphs form one list, other paragraphs are blocks of their own
+        segments = []
+        for paragraph in shape.text_frame.paragraphs:
+            runs = self.paragraph_runs(paragraph)
+            if not "".join(run.text for run in runs).strip():
+                continue
+
+            if self.is_list_paragraph(paragraph, bulleted):
+                if segments and segments[-1][0] == "list":
+                    segments[-1][1].append((runs, paragraph.level))
+                else:
+                    segments.append(("list", [(runs, paragraph.level)]))
+            else:
+                segments.append(("text", runs))
+
+        if not segments:
+            return
+
+        # Split the shape between its blocks, in proportion to their text
+        heights = []
+        for kind, content in segments:
+            if kind == "list":
+                heights.append(
+                    sum(
+                        self.text_height("".join(run.text for run in runs))
+                        for runs, _ in content
+                    )
+                )
+            else:
+                heights.append(self.text_height("".join(run.text for run in content)))
+
+        polygon = self.shape_polygon(shape)
+        y_start = polygon.y_start if polygon else 0
+        for (kind, content), height in zip(segments, heights):
+            segment_polygon = None
+            if polygon is not None:
+                segment_height = polygon.height * height / sum(heights)
+                segment_polygon = PolygonBox.from_bbox(
+                    [polygon.x_start, y_start, polygon.x_end, y_start + segment_height]
+                )
+                y_start += segment_height
+
+            if kind == "list":
+                self.add_list(content, segment_polygon)
+            else:
+                self.add_text(block_type, content, segment_polygon, **fields)
+
+    @staticmethod
+    def is_list_paragraph(paragraph, bulleted: bool = False) -> bool:
+        p_el = paragraph._element
+        if p_el.find(".//a:buNone", namespaces=p_el.nsmap) is not None:
+            return False
+
+        bullet_char = p_el.find(".//a:buChar", namespaces=p_el.nsmap)
+        bullet_num = p_el.find(".//a:buAutoNum", namespaces=p_el.nsmap)
+        return (
+            bulleted
+            or bullet_char is not None
+            or bullet_num is not None
+            or paragraph.level > 0
+        )
+
+    @staticmethod
+    def paragraph_runs(paragraph) -> List[TextRun]:
+        runs = []
+        for run in paragraph.runs:
+            formats = []
+            if run.font.bold:
+                formats.append("bold")
+            if run.font.italic:
+                formats.append("italic")
+            if run.font.underline:
+                formats.append("underline")
+            runs.append(
+                TextRun(
+                    text=run.text,
+                    formats=formats or ["plain"],
+                    url=run.hyperlink.address,
+                )
+            )
+        return runs
+
+    @staticmethod
+    def table_cells(table) -> List[NativeTableCell]:
+        cells = []
+        for row_id, row in enumerate(table.rows):
+            for col_id, cell in enumerate(row.cells):
+                # Cells covered by a merge are part of their merge origin
+                if cell.is_spanned:
+                    continue
+
+                cells.append(
+                    NativeTableCell(
+                        text=cell.text.replace("\v", "\n"),
+                        row_id=row_id,
+                        col_id=col_id,
+                        rowspan=cell.span_height if cell.is_merge_origin else 1,
+                        colspan=cell.span_width if cell.is_merge_origin else 1,
+                        is_header=row_id == 0 and table.first_row,
+                    )
+                )
+        return cells
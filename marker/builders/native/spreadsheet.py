@@ -0,0 +1,67 @@
+from typing import List
+
+from marker.builders.native import NativeBuilder, NativeTableCell, TextRun
+from marker.providers.source import DocumentSource
+from marker.providers.spreadsheet import SpreadSheetProvider
+from marker.schema import BlockTypes
+from marker.schema.document import Document
+
+
+class SpreadSheetBuilder(NativeBuilder):
+    """
+    Builds XLSX workbooks straight from their cells.  Each sheet starts a new page, with the sheet name
+    as a header and its cells as a table, keeping merged ranges as row and column spans.
+    """
+
+    # Landscape pages, since sheets tend to be wide
+    page_width = 792
+    page_height = 612
+    chars_per_line = 130
+
+    def __call__(self, filepath: DocumentSource) -> Document:
+        from openpyxl import load_workbook
+
+        # Cached values are used for formulas, since that's what the sheet shows
+        workbook = load_workbook(self.open_input(filepath), data_only=True)
+        self.new_document(filepath)
+        for sheet_name in workbook.sheetnames:
+            self.new_page()
+            self.add_text(
+                BlockTypes.SectionHeader, [TextRun(text=sheet_name)], heading_level=1
+            )
+
+            cells = self.sheet_cells(workbook[sheet_name])
+            if any(cell.text for cell in cells):
+                self.add_table(cells)
+        return self.finalize()
+
+    @staticmethod
+    def sheet_cells(sheet) -> List[NativeTableCell]:
+        merged_cells = SpreadSheetProvider._get_merged_cell_ranges(sheet)
+
+        cells = []
+        skip_cells = set()
+        for row_idx, row in enumerate(sheet.iter_rows(), 1):
+            for col_idx, cell in enumerate(row, 1):
+                if (row_idx, col_idx) in skip_cells:
+                    continue
+
+                rowspan = colspan = 1
+                merge_info = merged_cells.get((row_idx, col_idx))
+                if merge_info:
+                    rowspan = merge_info["rowspan"]
+                    colspan = merge_info["colspan"]
+                    for r in range(row_idx, row_idx + rowspan):
+                        for c in range(col_idx, col_idx + colspan):
+                            skip_cells.add((r, c))
+
+                cells.append(
+                    NativeTableCell(
+                        text="" if cell.value is None else str(cell.value),
+                        row_id=row_idx - 1,
+                        col_id=col_idx - 1,
+                        rowspan=rowspan,
+                        colspan=colspan,
+                    )
+                )
+        return cells
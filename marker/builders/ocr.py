@@ -80,7 +80,7 @@ class OcrBuilder(BaseBuilder):
         self.recognition_model = recognition_model
 
     def __call__(self, document: Document, provider: PdfProvider):
-        pages_to_ocr = [page for page in document.pages if page.text_extraction_method == 'surya']
+        pages_to_ocr = [page for page in document.pages if page.text_extraction_method in ['surya', 'hybrid']]
         ocr_page_images, block_polygons, block_ids, block_original_texts = (
             self.get_ocr_images_polygons_ids(document, pages_to_ocr, provider)
         )
@@ -135,17 +135,19 @@ class OcrBuilder(BaseBuilder):
                     # Skip OCR
                     continue
 
+                if document_page.text_extraction_method == "hybrid" and block.text_extraction_method != "surya":
+                    # Only some blocks on the page need OCR, the rest keep the provider text
+                    continue
+
                 block_lines = block.contained_blocks(document, [BlockTypes.Line])
                 blocks_to_ocr = self.select_ocr_blocks_by_mode(document_page, block, block_lines, max_intersection_pct)
 
                 block.text_extraction_method = "surya"
                 for block in blocks_to_ocr:
                     # Fit the polygon to image bounds since PIL image crop expands by default which might create bad images for the OCR model.
-                    block_polygon_rescaled = (
-                        copy.deepcopy(block.polygon)
-                        .rescale(page_size, image_size)
-                        .fit_to_bounds((0, 0, *image_size))
-                    )
+                    block_polygon_rescaled = block.polygon.rescale(
+                        page_size, image_size
+                    ).fit_to_bounds((0, 0, *image_size))
                     block_bbox_rescaled = block_polygon_rescaled.polygon
                     block_bbox_rescaled = [
                         [int(x) for x in point] for point in block_bbox_rescaled
@@ -316,10 +318,10 @@ class OcrBuilder(BaseBuilder):
         current_chars = []
         image_size = image.size
 
-        for idx, char in enumerate(chars):
-            char_box = PolygonBox(polygon=char.polygon).rescale(
-                image_size, page.polygon.size
-            )
+        char_boxes = PolygonBox.rescale_many(
+            [char.polygon for char in chars], image_size, page.polygon.size
+        )
+        for idx, (char, char_box) in enumerate(zip(chars, char_boxes)):
             marker_char = CharClass(
                 text=char.text,
                 idx=idx,
@@ -0,0 +1,298 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from marker.logger import get_logger
+from marker.providers.source import DocumentSource, is_in_memory
+from marker.utils.image import hash_distance
+
+logger = get_logger()
+
+# Settings that change how work is scheduled, but not what a page converts to
+IGNORED_CONFIG_KEYS = {
+    "page_range",
+    "pdftext_window_pages",
+    "image_cache_max_bytes",
+    "image_cache_spill",
+    "image_cache_spill_dir",
+    "image_readahead_pages",
+    "highres_region_max_fraction",
+    "page_cache_dir",
+    "disable_tqdm",
+}
+IGNORED_CONFIG_SUFFIXES = ("_workers", "batch_size")
+
+# Settings that don't change the rendered output of a whole document
+IGNORED_DOCUMENT_CONFIG_KEYS = {
+    "output_dir",
+    "conversion_cache_dir",
+    "conversion_cache_max_bytes",
+    "release_page_images",
+    "disable_tqdm",
+}
+
+
+def marker_version() -> str:
+    try:
+        return version("marker-pdf")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize(v) for v in value)
+    if isinstance(value, (list, tuple, range)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def config_digest(*objs) -> str:
+    """
+    Hash the annotated config attributes of the given builders and providers, so cached results are
+    only reused when they were produced with the same settings.
+    """
+    digest = {"version": marker_version()}
+    for obj in objs:
+        attrs = {}
+        for cls in reversed(type(obj).__mro__):
+            for name in getattr(cls, "__annotations__", {}):
+                if name in IGNORED_CONFIG_KEYS or name.endswith(
+                    IGNORED_CONFIG_SUFFIXES
+                ):
+                    continue
+                attrs[name] = _normalize(getattr(obj, name, None))
+        digest[type(obj).__name__] = attrs
+
+    serialized = json.dumps(digest, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def file_digest(filepath: DocumentSource, chunk_size: int = 1024 * 1024) -> str:
+    if is_in_memory(filepath):
+        return hashlib.sha256(memoryview(filepath)).hexdigest()
+
+    hasher = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def document_key(filepath: DocumentSource, config: dict) -> str:
+    """
+    Key a conversion by the input file contents, the effective config and the marker version.
+    """
+    config = {
+        k: v
+        for k, v in config.items()
+        if k not in IGNORED_DOCUMENT_CONFIG_KEYS
+        and not k.endswith(IGNORED_CONFIG_SUFFIXES)
+    }
+    serialized = json.dumps(
+        {
+            "file": file_digest(filepath),
+            "config": _normalize(config),
+            "version": marker_version(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    A directory of pickled results, keyed by content hash.  Writes are atomic, so several processes
+    can share a cache directory.
+    """
+
+    def __init__(self, cache_dir: str, namespace: str):
+        self.cache_dir = os.path.join(cache_dir, namespace)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def put(self, key: str, value: Any):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), suffix=".tmp", delete=False
+        ) as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, path)
+
+
+class PageResultCache(DiskCache):
+    """
+    Caches built pages (layout, lines and OCR), keyed by the page content fingerprint and the config.
+    """
+
+    def __init__(self, cache_dir: str, config_hash: str):
+        super().__init__(cache_dir, "pages")
+        self.config_hash = config_hash
+
+    def page_key(self, fingerprint: str) -> str:
+        return hashlib.sha256(
+            f"{fingerprint}:{self.config_hash}".encode("utf-8")
+        ).hexdigest()
+
+    def get_page(self, fingerprint: str, page_id: int):
+        page = self.get(self.page_key(fingerprint))
+        if page is None:
+            return None
+        page.reassign_page_id(page_id)
+        return page
+
+    def put_page(self, fingerprint: str, page):
+        # Images and provider data are reattached from the current document on load
+        page = page.model_copy()
+        page.lowres_image = None
+        page.highres_image = None
+        page.refs = None
+        page.set_image_cache(None)
+        page.set_provider_chars(None)
+        page.clear_ink_map()
+        self.put(self.page_key(fingerprint), page)
+
+
+class ConversionCache(DiskCache):
+    """
+    Caches rendered conversions of whole documents.  Once the cache grows past `max_bytes`, the least
+    recently used entries are removed.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        super().__init__(cache_dir, "documents")
+        self.max_bytes = max_bytes
+
+    def get(self, key: str) -> Optional[Any]:
+        value = super().get(key)
+        if value is not None:
+            # Mark the entry as recently used
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(self.path(key))
+        return value
+
+    def put(self, key: str, value: Any):
+        super().put(key, value)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                with contextlib.suppress(FileNotFoundError):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total_bytes -= size
+
+
+class LayoutTemplateCache:
+    """
+    Layout results of pages seen before, matched by a perceptual hash of the page image.  One cache is kept
+    in memory per layout config for the life of the process, so pages repeated across documents match too.
+    The least recently matched templates are dropped past `max_entries`.
+    """
+
+    _shared: Dict[str, "LayoutTemplateCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.templates: OrderedDict[int, Tuple[np.ndarray, float, Any]] = OrderedDict()
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, config_hash: str, max_entries: int) -> "LayoutTemplateCache":
+        with cls._shared_lock:
+            if config_hash not in cls._shared:
+                cls._shared[config_hash] = cls(max_entries)
+            return cls._shared[config_hash]
+
+    def find(
+        self,
+        page_hash: np.ndarray,
+        aspect: float,
+        max_distance: int,
+        aspect_tolerance: float = 0.02,
+    ) -> Optional[Any]:
+        """
+        Return the layout result of the closest template within `max_distance` bits, with the same page shape.
+        """
+        with self.lock:
+            best_id, best_distance = None, max_distance + 1
+            for template_id, (template_hash, template_aspect, _) in self.templates.items():
+                if abs(template_aspect - aspect) > aspect_tolerance * aspect:
+                    continue
+                distance = hash_distance(page_hash, template_hash)
+                if distance < best_distance:
+                    best_id, best_distance = template_id, distance
+
+            if best_id is None:
+                return None
+            self.templates.move_to_end(best_id)
+            return self.templates[best_id][2]
+
+    def add(self, page_hash: np.ndarray, aspect: float, layout_result: Any):
+        with self.lock:
+            self.templates[self.next_id] = (page_hash, aspect, layout_result)
+            self.next_id += 1
+            while len(self.templates) > self.max_entries:
+                self.templates.popitem(last=False)
+
+
+class RequestCoalescer:
+    """
+    Lets concurrent async requests with the same key wait on a single in-flight computation.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+        # Shield the shared task, so one cancelled request doesn't cancel it for the others
+        return await asyncio.shield(task)
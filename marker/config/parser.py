@@ -103,6 +103,7 @@ class ConfigParser:
                         config.update(json.load(f))
                 case "disable_multiprocessing":
                     config["pdftext_workers"] = 1
+                    config["raster_workers"] = 1
                 case "disable_image_extraction":
                     config["extract_images"] = False
                 case _:
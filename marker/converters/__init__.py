@@ -1,5 +1,5 @@
 import inspect
-from typing import Optional, List, Type
+from typing import Any, Callable, Optional, List, Type
 
 from pydantic import BaseModel
 
@@ -21,6 +21,11 @@ class BaseConverter:
     def __call__(self, *args, **kwargs):
         raise NotImplementedError
 
+    def build_renderer(self, *args, **kwargs) -> Callable[[], Any]:
+        # Converters that don't separate building from rendering do all of the work up front
+        rendered = self(*args, **kwargs)
+        return lambda: rendered
+
     def resolve_dependencies(self, cls):
         init_signature = inspect.signature(cls.__init__)
         parameters = init_signature.parameters
@@ -5,6 +5,7 @@ from marker.builders.document import DocumentBuilder
 from marker.builders.line import LineBuilder
 from marker.builders.ocr import OcrBuilder
 from marker.builders.structure import StructureBuilder
+from marker.converters import BaseConverter
 from marker.converters.pdf import PdfConverter
 from marker.extractors.document import DocumentExtractor
 from marker.extractors.page import PageExtractor
@@ -29,18 +30,20 @@ class ExtractionConverter(PdfConverter):
         layout_builder = self.resolve_dependencies(self.layout_builder_class)
         line_builder = self.resolve_dependencies(LineBuilder)
         ocr_builder = self.resolve_dependencies(OcrBuilder)
-        provider = provider_cls(filepath, self.config)
+        provider = provider_cls(filepath, self.provider_config())
         document = DocumentBuilder(self.config)(
             provider, layout_builder, line_builder, ocr_builder
         )
         structure_builder_cls = self.resolve_dependencies(StructureBuilder)
         structure_builder_cls(document)
 
-        for processor in self.processor_list:
-            processor(document)
+        self.run_processors(document, self.processor_list)
 
         return document, provider
 
+    # Extraction needs the rendered markdown, so the whole conversion runs up front
+    build_renderer = BaseConverter.build_renderer
+
     def __call__(self, filepath: str) -> ExtractionOutput:
         self.config["paginate_output"] = True  # Ensure we can split the output properly
         self.config["output_format"] = (
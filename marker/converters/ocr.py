@@ -29,11 +29,10 @@ class OCRConverter(PdfConverter):
         ocr_builder = self.resolve_dependencies(OcrBuilder)
         document_builder = DocumentBuilder(self.config)
 
-        provider = provider_cls(filepath, self.config)
+        provider = provider_cls(filepath, self.provider_config())
         document = document_builder(provider, layout_builder, line_builder, ocr_builder)
 
-        for processor in self.processor_list:
-            processor(document)
+        self.run_processors(document, self.processor_list)
 
         return document
 
@@ -4,17 +4,35 @@ from marker.schema.document import Document
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"  # disables a tokenizers warning
 
-from collections import defaultdict
-from typing import Annotated, Any, Dict, List, Optional, Type, Tuple, Union
+import copy
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Any, Callable, Dict, Iterable, Iterator, List, Optional, Type, Tuple, Union
 import io
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
 import tempfile
 
+from pydantic import BaseModel
+
+from marker.cache import ConversionCache, document_key
 from marker.processors import BaseProcessor
 from marker.services import BaseService
 from marker.processors.llm.llm_table_merge import LLMTableMergeProcessor
-from marker.providers.registry import provider_from_filepath
+from marker.providers import BaseProvider
+from marker.providers.document import DocumentProvider
+from marker.providers.epub import EpubProvider
+from marker.providers.html import HTMLProvider
+from marker.providers.powerpoint import PowerPointProvider
+from marker.providers.registry import provider_from_filepath, supports_in_memory
+from marker.providers.source import DocumentSource, is_in_memory
+from marker.providers.spreadsheet import SpreadSheetProvider
 from marker.builders.document import DocumentBuilder
+from marker.builders.native import NativeBuilder
+from marker.builders.native.document import DocxBuilder
+from marker.builders.native.epub import EpubBuilder
+from marker.builders.native.html import HTMLBuilder
+from marker.builders.native.powerpoint import PowerPointBuilder
+from marker.builders.native.spreadsheet import SpreadSheetBuilder
 from marker.builders.layout import LayoutBuilder
 from marker.builders.line import LineBuilder
 from marker.builders.ocr import OcrBuilder
@@ -41,11 +59,14 @@ from marker.processors.text import TextProcessor
 from marker.processors.block_relabel import BlockRelabelProcessor
 from marker.processors.blank_page import BlankPageProcessor
 from marker.processors.llm.llm_equation import LLMEquationProcessor
+from marker.renderers import BaseRenderer
 from marker.renderers.markdown import MarkdownRenderer
 from marker.schema import BlockTypes
 from marker.schema.blocks import Block
-from marker.schema.registry import register_block_class
-from marker.util import strings_to_classes
+from marker.schema.registry import get_block_class, register_block_class
+from marker.settings import settings
+from marker.util import classes_to_strings, strings_to_classes
+from marker.utils.batch import ModelBatcher
 from marker.processors.llm.llm_handwriting import LLMHandwritingProcessor
 from marker.processors.order import OrderProcessor
 from marker.services.gemini import GoogleGeminiService
@@ -101,6 +122,43 @@ class PdfConverter(BaseConverter):
         BlankPageProcessor,
         DebugProcessor,
     )
+    conversion_cache_dir: Annotated[
+        Optional[str],
+        "A directory to cache rendered conversions in, keyed by the file hash, config and marker version.",
+        "Defaults to the CONVERSION_CACHE_DIR setting.  The cache is disabled if no directory is set.",
+    ] = settings.CONVERSION_CACHE_DIR
+    conversion_cache_max_bytes: Annotated[
+        int,
+        "The maximum size of the conversion cache.  Least recently used entries are removed past this size.",
+    ] = settings.CONVERSION_CACHE_MAX_BYTES
+    native_office: Annotated[
+        bool,
+        "Build DOCX, XLSX and PPTX files directly from their contents, instead of converting them to PDF",
+        "and running the layout and OCR models.",
+    ] = False
+    batch_documents: Annotated[
+        int,
+        "The number of documents to build at once with `convert_many`, sharing model batches.",
+    ] = 8
+    native_html: Annotated[
+        bool,
+        "Build HTML and EPUB files by walking their DOM, instead of converting them to PDF",
+        "and running the layout and OCR models.",
+    ] = False
+    release_page_images: Annotated[
+        bool,
+        "Drop page images as soon as no remaining processor or the renderer reads them, instead of",
+        "keeping them until the document is rendered.",
+    ] = True
+    native_builders: Dict[Type[BaseProvider], Type[NativeBuilder]] = {
+        DocumentProvider: DocxBuilder,
+        SpreadSheetProvider: SpreadSheetBuilder,
+        PowerPointProvider: PowerPointBuilder,
+        HTMLProvider: HTMLBuilder,
+        EpubProvider: EpubBuilder,
+    }
+    # Natively built documents have no page images, so only processors that work on the blocks are run
+    native_processors: Tuple[Type[BaseProcessor], ...] = (DocumentTOCProcessor,)
     default_llm_service: BaseService = GoogleGeminiService
 
     def __init__(
@@ -131,6 +189,8 @@ class PdfConverter(BaseConverter):
 
         # Put here so that resolve_dependencies can access it
         self.artifact_dict = artifact_dict
+        # Converters sharing the models share their batcher, and so their model batches
+        self.model_batcher = ModelBatcher.for_artifacts(self.artifact_dict)
 
         if llm_service:
             llm_service_cls = strings_to_classes([llm_service])[0]
@@ -146,54 +206,292 @@ class PdfConverter(BaseConverter):
 
         processor_list = self.initialize_processors(processor_list)
         self.processor_list = processor_list
+        # Processors hold their models, which are only wrapped while documents are batched
+        self.model_batcher.register(self.processor_list)
 
         self.layout_builder_class = LayoutBuilder
         self.page_count = None  # Track how many pages were converted
 
     @contextmanager
-    def filepath_to_str(self, file_input: Union[str, io.BytesIO]):
+    def filepath_to_str(self, file_input: Union[DocumentSource, io.BytesIO]):
         temp_file = None
         try:
+            if isinstance(file_input, io.BytesIO):
+                # A view of the buffer, so it isn't copied
+                file_input = file_input.getbuffer()
+
             if isinstance(file_input, str):
                 yield file_input
+            elif not is_in_memory(file_input):
+                raise TypeError(
+                    f"Expected str, bytes or a buffer, got {type(file_input)}"
+                )
+            elif self.reads_in_memory(provider_from_filepath(file_input)):
+                yield file_input
             else:
+                # Other formats are converted to PDF from a file on disk
                 with tempfile.NamedTemporaryFile(
                     delete=False, suffix=".pdf"
                 ) as temp_file:
-                    if isinstance(file_input, io.BytesIO):
-                        file_input.seek(0)
-                        temp_file.write(file_input.getvalue())
-                    else:
-                        raise TypeError(
-                            f"Expected str or BytesIO, got {type(file_input)}"
-                        )
+                    temp_file.write(file_input)
 
                 yield temp_file.name
         finally:
             if temp_file is not None and os.path.exists(temp_file.name):
                 os.unlink(temp_file.name)
 
-    def build_document(self, filepath: str) -> Document:
+    def native_builder_class(self, provider_cls) -> Type[NativeBuilder] | None:
+        if provider_cls in (HTMLProvider, EpubProvider):
+            enabled = self.native_html
+        else:
+            enabled = self.native_office
+        return self.native_builders.get(provider_cls) if enabled else None
+
+    def reads_in_memory(self, provider_cls) -> bool:
+        return supports_in_memory(provider_cls) or (
+            self.native_builder_class(provider_cls) is not None
+        )
+
+    def build_native_document(
+        self,
+        filepath: DocumentSource,
+        native_builder_cls: Type[NativeBuilder],
+        document_global: bool | None = None,
+    ) -> Document:
+        document = self.resolve_dependencies(native_builder_cls)(filepath)
+
+        for processor in self.select_processors(document_global):
+            if isinstance(processor, self.native_processors):
+                processor(document)
+
+        return document
+
+    def build_document(
+        self, filepath: DocumentSource, document_global: bool | None = None
+    ) -> Document:
         provider_cls = provider_from_filepath(filepath)
+        native_builder_cls = self.native_builder_class(provider_cls)
+        if native_builder_cls is not None:
+            return self.build_native_document(
+                filepath, native_builder_cls, document_global
+            )
+
         layout_builder = self.resolve_dependencies(self.layout_builder_class)
         line_builder = self.resolve_dependencies(LineBuilder)
         ocr_builder = self.resolve_dependencies(OcrBuilder)
-        provider = provider_cls(filepath, self.config)
+        provider = provider_cls(filepath, self.provider_config())
         document = DocumentBuilder(self.config)(
             provider, layout_builder, line_builder, ocr_builder
         )
         structure_builder_cls = self.resolve_dependencies(StructureBuilder)
         structure_builder_cls(document)
 
-        for processor in self.processor_list:
-            processor(document)
+        self.run_processors(document, self.select_processors(document_global))
+        return document
+
+    def run_processors(self, document: Document, processors: List[BaseProcessor]):
+        renderer = self.resolve_dependencies(self.renderer)
+        self.release_unused_images(document, processors, renderer)
+        for i, processor in enumerate(processors):
+            # Processors for block types the document doesn't have are skipped entirely
+            skip = processor.skip_without_blocks and not document.has_block_types(
+                processor.block_types
+            )
+            if not skip:
+                processor(document)
+            self.release_unused_images(document, processors[i + 1 :], renderer)
+
+    def release_unused_images(
+        self,
+        document: Document,
+        processors: List[BaseProcessor],
+        renderer: BaseRenderer,
+    ):
+        # Released images are rendered again if something reads them after all, so this only costs time
+        if not self.release_page_images:
+            return
+
+        uses = renderer.page_image_uses(document)
+        for processor in processors:
+            uses |= processor.page_image_uses(document)
+        for page in document.pages:
+            for highres in (False, True):
+                if (page.page_id, highres) not in uses:
+                    page.release_image(highres)
+
+    def select_processors(self, document_global: bool | None = None) -> List[BaseProcessor]:
+        """
+        None selects every processor.  Shards run the processors before the first document-global one, and
+        the merged document runs the rest, so every processor runs in the same order as for a whole document.
+        """
+        if document_global is None:
+            return self.processor_list
+
+        split = next(
+            (i for i, p in enumerate(self.processor_list) if p.document_global),
+            len(self.processor_list),
+        )
+        if document_global:
+            return self.processor_list[split:]
+        return self.processor_list[:split]
 
+    def build_shard(self, filepath: str) -> Document:
+        """
+        Build the pages in the configured page range, running the processors up to the first one that needs
+        the whole document.  Shards are merged with `merge_shards`.
+        """
+        document = self.build_document(filepath, document_global=False)
+        self.page_count = len(document.pages)
+        for page in document.pages:
+            # The image cache holds the provider, which can't be sent to another process
+            page.set_image_cache(None)
         return document
 
-    def __call__(self, filepath: str | io.BytesIO):
-        with self.filepath_to_str(filepath) as temp_path:
+    def merge_shards(self, filepath: str, shards: List[Document]):
+        """
+        Merge shards built with `build_shard`, then run the remaining processors and render once.
+        """
+        pages = sorted(
+            [page for shard in shards for page in shard.pages], key=lambda p: p.page_id
+        )
+
+        # Page images are rendered again on demand.  Text is already in the pages, so the provider
+        # only extracts it lazily if something asks for it.
+        provider_config = {
+            **self.provider_config(),
+            "page_range": [page.page_id for page in pages],
+            "pdftext_window_pages": len(pages),
+            "pdftext_workers": 1,
+        }
+        provider = provider_from_filepath(filepath)(filepath, provider_config)
+        image_cache = DocumentBuilder(provider_config).create_image_cache(provider)
+        for page in pages:
+            page.set_image_cache(image_cache)
+
+        DocumentClass: Document = get_block_class(BlockTypes.Document)
+        document = DocumentClass(filepath=shards[0].filepath, pages=pages)
+        self.run_processors(document, self.select_processors(document_global=True))
+
+        self.page_count = len(document.pages)
+        renderer = self.resolve_dependencies(self.renderer)
+        return renderer(document)
+
+    def config_dict(self) -> dict:
+        config = self.config or {}
+        if isinstance(config, BaseModel):
+            config = config.model_dump()
+        return config
+
+    def provider_config(self) -> dict:
+        # Character boxes are only kept when table cell text will read them
+        config = self.config_dict()
+        if "retain_chars" not in config and any(
+            isinstance(p, TableProcessor) for p in self.processor_list
+        ):
+            config = {**config, "retain_chars": True}
+        return config
+
+    def cache_config(self) -> dict:
+        # Everything that changes the rendered output, besides the file itself
+        return {
+            **self.config_dict(),
+            "converter": classes_to_strings([type(self)])[0],
+            "layout_builder": classes_to_strings([self.layout_builder_class])[0],
+            "processors": classes_to_strings([type(p) for p in self.processor_list]),
+            "renderer": classes_to_strings([self.renderer])[0],
+            "llm_service": type(self.llm_service).__name__ if self.llm_service else None,
+        }
+
+    def build_renderer(
+        self, filepath: DocumentSource | io.BytesIO
+    ) -> Callable[[], Any]:
+        """
+        Build the document, and return a function that renders it.  Rendering doesn't use the models, so
+        it can run in another thread while the next document is built.
+        """
+        conversion_cache = None
+        if self.conversion_cache_dir:
+            conversion_cache = ConversionCache(
+                self.conversion_cache_dir, self.conversion_cache_max_bytes
+            )
+
+        with ExitStack() as stack:
+            temp_path = stack.enter_context(self.filepath_to_str(filepath))
+            cache_key = None
+            if conversion_cache is not None:
+                cache_key = document_key(temp_path, self.cache_config())
+                cached = conversion_cache.get(cache_key)
+                if cached is not None:
+                    self.page_count = cached["page_count"]
+                    return lambda: cached["rendered"]
+
             document = self.build_document(temp_path)
             self.page_count = len(document.pages)
-            renderer = self.resolve_dependencies(self.renderer)
-            rendered = renderer(document)
-        return rendered
+            page_count = self.page_count
+            # Page images are rendered from the file, so it is kept until the document is rendered
+            cleanup = stack.pop_all()
+
+        def render():
+            with cleanup:
+                renderer = self.resolve_dependencies(self.renderer)
+                rendered = renderer(document)
+                for page in document.pages:
+                    page.release_image(highres=False)
+                    page.release_image(highres=True)
+
+                if cache_key is not None:
+                    conversion_cache.put(
+                        cache_key, {"rendered": rendered, "page_count": page_count}
+                    )
+            return rendered
+
+        return render
+
+    def __call__(self, filepath: DocumentSource | io.BytesIO):
+        return self.build_renderer(filepath)()
+
+    def convert_many(
+        self,
+        filepaths: Iterable[DocumentSource | io.BytesIO],
+        max_documents: int | None = None,
+        return_exceptions: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Convert several documents at once, pooling their pages into shared model batches.  Outputs are
+        yielded in input order, and `page_count` is set for each one as it is yielded.  With
+        `return_exceptions`, documents that fail yield their exception instead of raising it.
+        """
+        max_documents = max_documents or self.batch_documents
+
+        def build(filepath):
+            # A copy per document, so page counts don't mix
+            converter = copy.copy(self)
+            with self.model_batcher.document():
+                render = converter.build_renderer(filepath)
+            return converter, render
+
+        pending = deque()
+        filepaths = iter(filepaths)
+        with ThreadPoolExecutor(max_workers=max_documents) as executor:
+            try:
+                while True:
+                    # Rendering runs here while the other documents are built
+                    for filepath in filepaths:
+                        pending.append(executor.submit(build, filepath))
+                        if len(pending) >= max_documents:
+                            break
+                    if not pending:
+                        break
+
+                    try:
+                        converter, render = pending.popleft().result()
+                        rendered = render()
+                        self.page_count = converter.page_count
+                    except Exception as e:
+                        if not return_exceptions:
+                            raise
+                        rendered = e
+                    yield rendered
+            finally:
+                for future in pending:
+                    future.cancel()
@@ -36,7 +36,7 @@ class TableConverter(PdfConverter):
         document_builder = DocumentBuilder(self.config)
         document_builder.disable_ocr = True
 
-        provider = provider_cls(filepath, self.config)
+        provider = provider_cls(filepath, self.provider_config())
         document = document_builder(provider, layout_builder, line_builder, ocr_builder)
 
         for page in document.pages:
@@ -44,8 +44,7 @@ class TableConverter(PdfConverter):
                 p for p in page.structure if p.block_type in self.converter_block_types
             ]
 
-        for processor in self.processor_list:
-            processor(document)
+        self.run_processors(document, self.processor_list)
 
         return document
 
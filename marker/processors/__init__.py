@@ -1,4 +1,4 @@
-from typing import Optional, Tuple
+from typing import Optional, Set, Tuple
 
 from pydantic import BaseModel
 
@@ -9,9 +9,23 @@ from marker.util import assign_config
 
 class BaseProcessor:
     block_types: Tuple[BlockTypes] | None = None  # What block types this processor is responsible for
+    document_global = False  # Whether the processor needs the whole document, e.g. to link blocks across pages
+    page_images: Tuple[bool, ...] = (False, True)  # Page image resolutions the processor may read, True for highres
+    page_images_by_block = False  # Whether page images are only read for pages with `block_types` blocks
+    skip_without_blocks = False  # Whether the processor only touches `block_types` blocks, so it can be skipped without any
 
     def __init__(self, config: Optional[BaseModel | dict] = None):
         assign_config(self, config)
 
+    def page_image_uses(self, document: Document) -> Set[Tuple[int, bool]]:
+        """
+        The (page id, highres) page images the processor may read.  Images that no later processor or the renderer
+        may read are released from the image cache as the processors run.
+        """
+        pages = document.pages
+        if self.page_images_by_block:
+            pages = [page for page in pages if page.has_block_types(self.block_types)]
+        return {(page.page_id, highres) for page in pages for highres in self.page_images}
+
     def __call__(self, document: Document, *args, **kwargs):
         raise NotImplementedError
@@ -1,13 +1,12 @@
 from typing import Annotated
 
 from PIL import Image
-import numpy as np
-import cv2
 
 from marker.processors import BaseProcessor
 from marker.schema import BlockTypes
 from marker.schema.blocks import Block
 from marker.schema.document import Document
+from marker.utils.image import is_blank_image
 
 from marker.logger import get_logger
 
@@ -26,31 +25,19 @@ class BlankPageProcessor(BaseProcessor):
         False
     )
 
-    def is_blank(self, image: Image.Image):
-        image = np.asarray(image)
-        if image.size == 0 or image.shape[0] == 0 or image.shape[1] == 0:
-            # Handle empty image case
-            return True
-
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        gray = cv2.GaussianBlur(gray, (7, 7), 0)
-
-        # Adaptive threshold (inverse for text as white)
-        binarized = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 15
-        )
+    def page_image_uses(self, document: Document):
+        if not self.filter_blank_pages:
+            return set()
+        return {(page.page_id, False) for page in document.pages}
 
-        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
-            binarized, connectivity=8
-        )
-        cleaned = np.zeros_like(binarized)
-        for i in range(1, num_labels):  # skip background
-            cleaned[labels == i] = 255
+    def is_blank(self, image: Image.Image):
+        return is_blank_image(image)
 
-        kernel = np.ones((1, 5), np.uint8)
-        dilated = cv2.dilate(cleaned, kernel, iterations=3)
-        b = dilated / 255
-        return b.sum() == 0
+    def is_blank_block(self, document: Document, block: Block):
+        if block.lowres_image is not None:
+            return self.is_blank(block.lowres_image)
+        page = document.get_page(block.page_id)
+        return page.is_blank_region(block.polygon.bbox)
 
     def __call__(self, document: Document):
         if not self.filter_blank_pages:
@@ -63,14 +50,13 @@ class BlankPageProcessor(BaseProcessor):
 
             full_page_block: Block = structure_blocks[0]
 
-            conditions = [
-                full_page_block.block_type in [BlockTypes.Picture, BlockTypes.Figure],
-                self.is_blank(full_page_block.get_image(document)),
-                page.polygon.intersection_area(full_page_block.polygon)
-                > self.full_page_block_intersection_threshold,
-            ]
-
-            if all(conditions):
+            # The blank check goes last, so it only runs for full page images
+            if (
+                full_page_block.block_type in [BlockTypes.Picture, BlockTypes.Figure]
+                and page.polygon.intersection_area(full_page_block.polygon)
+                > self.full_page_block_intersection_threshold
+                and self.is_blank_block(document, full_page_block)
+            ):
                 logger.debug(f"Removing blank block {full_page_block.id}")
                 page.remove_structure_items([full_page_block.id])
                 full_page_block.removed = True
@@ -17,6 +17,7 @@ class BlockRelabelProcessor(BaseProcessor):
     Each rule in the relabel string maps an original block label to a new one
     if the confidence exceeds a given threshold.
     """
+    page_images = ()
     
     block_relabel_str: Annotated[
         str,
@@ -9,6 +9,8 @@ class BlockquoteProcessor(BaseProcessor):
     """
     A processor for tagging blockquotes.
     """
+    page_images = ()
+    skip_without_blocks = True
     block_types: Annotated[
         Tuple[BlockTypes],
         "The block types to process.",
@@ -8,6 +8,8 @@ class CodeProcessor(BaseProcessor):
     """
     A processor for formatting code blocks.
     """
+    page_images = ()
+    skip_without_blocks = True
     block_types = (BlockTypes.Code, )
 
     def __call__(self, document: Document):
@@ -38,6 +38,11 @@ class DebugProcessor(BaseProcessor):
         "Whether to dump block debug data.",
     ] = False
 
+    def page_image_uses(self, document: Document):
+        if not (self.debug_layout_images or self.debug_pdf_images):
+            return set()
+        return {(page.page_id, True) for page in document.pages}
+
     def __call__(self, document: Document):
         # Remove extension from doc name
         doc_base = os.path.basename(document.filepath).rsplit(".", 1)[0]
@@ -95,7 +100,7 @@ class DebugProcessor(BaseProcessor):
 
     def draw_layout_debug_images(self, document: Document, pdf_mode=False):
         for page in document.pages:
-            img_size = page.get_image(highres=True).size
+            img_size = page.get_image_size(highres=True)
             png_image = Image.new("RGB", img_size, color="white")
 
             line_bboxes = []
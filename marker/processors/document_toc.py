@@ -7,6 +7,8 @@ class DocumentTOCProcessor(BaseProcessor):
     """
     A processor for generating a table of contents for the document.
     """
+    page_images = ()
+    document_global = True
     block_types = (BlockTypes.SectionHeader, )
 
     def __call__(self, document: Document):
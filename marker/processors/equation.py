@@ -18,6 +18,9 @@ class EquationProcessor(BaseProcessor):
     """
     A processor for recognizing equations in the document.
     """
+    page_images = (True,)
+    page_images_by_block = True
+    skip_without_blocks = True
 
     block_types: Annotated[
         Tuple[BlockTypes],
@@ -60,24 +63,14 @@ class EquationProcessor(BaseProcessor):
         total_equation_blocks = 0
 
         for page in document.pages:
-            page_image = page.get_image(highres=True)
-            page_size = page.polygon.width, page.polygon.height
-            image_size = page_image.size
-
-            page_equation_boxes = []
-            page_equation_block_ids = []
-            equation_blocks = page.contained_blocks(document, self.block_types)
-            for block in equation_blocks:
-                page_equation_boxes.append(
-                    block.polygon.rescale(page_size, image_size).bbox
-                )
-                page_equation_block_ids.append(block.id)
+            # Each equation is cropped on its own, so pages without equations are never rendered in highres
+            for block in page.contained_blocks(document, self.block_types):
+                image = block.get_image(document, highres=True)
+                images.append(image)
+                equation_boxes.append([[0, 0, image.width, image.height]])
+                equation_block_ids.append([block.id])
                 total_equation_blocks += 1
 
-            images.append(page_image)
-            equation_boxes.append(page_equation_boxes)
-            equation_block_ids.append(page_equation_block_ids)
-
         if total_equation_blocks == 0:
             return
 
@@ -10,6 +10,8 @@ class FootnoteProcessor(BaseProcessor):
     """
     A processor for pushing footnotes to the bottom, and relabeling mislabeled text blocks.
     """
+    page_images = ()
+    skip_without_blocks = True
     block_types = (BlockTypes.Footnote,)
 
     def __call__(self, document: Document):
@@ -16,6 +16,9 @@ class IgnoreTextProcessor(BaseProcessor):
     A processor for identifying and ignoring common text blocks in a document. 
     These blocks often represent repetitive or non-essential elements, such as headers, footers, or page numbers.
     """
+    page_images = ()
+    skip_without_blocks = True
+    document_global = True
     block_types = (
         BlockTypes.Text, BlockTypes.SectionHeader,
         BlockTypes.TextInlineMath
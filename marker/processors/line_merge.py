@@ -5,13 +5,15 @@ from marker.schema import BlockTypes
 from marker.schema.blocks import Block
 from marker.schema.document import Document
 from marker.schema.text import Line
-from marker.util import matrix_intersection_area
+from marker.utils.spatial import SpatialIndex
 
 
 class LineMergeProcessor(BaseProcessor):
     """
     A processor for merging inline math lines.
     """
+    page_images = ()
+    skip_without_blocks = True
     block_types = (BlockTypes.Text, BlockTypes.TextInlineMath, BlockTypes.Caption, BlockTypes.Footnote, BlockTypes.SectionHeader)
     min_merge_pct: Annotated[
         float,
@@ -44,27 +46,29 @@ class LineMergeProcessor(BaseProcessor):
     def merge_lines(self, lines: List[Line], block: Block):
         lines = [l for l in lines if l.polygon.width * 5 > l.polygon.height]  # Skip vertical lines
         line_bboxes = [l.polygon.expand(self.block_expand_threshold, 0).bbox for l in lines]  # Expand horizontally
-        intersections = matrix_intersection_area(line_bboxes, line_bboxes)
+        line_index = SpatialIndex(line_bboxes)
 
         merges = []
         merge = []
         for i in range(len(line_bboxes)):
-            intersection_row = intersections[i]
-            intersection_row[i] = 0  # Zero out the current idx
-
-            if i < len(line_bboxes) - 1:
-                intersection_row[i+1] = 0 # Zero out the next idx, so we only evaluate merge from the left
-
             if len(merge) == 0:
                 merge.append(i)
                 continue
 
+            intersecting_idxs, intersection_areas = line_index.intersections(line_bboxes[i])
+            # Zero out the current idx, and the next idx, so we only evaluate merge from the left
+            intersection_row = {
+                idx: area
+                for idx, area in zip(intersecting_idxs.tolist(), intersection_areas.tolist())
+                if idx not in (i, i + 1)
+            }
+
             # Zero out previous merge segments
-            merge_intersection = sum([intersection_row[m] for m in merge])
+            merge_intersection = sum([intersection_row.get(m, 0) for m in merge])
             line_area = lines[i].polygon.area
             intersection_pct = merge_intersection / max(1, line_area)
 
-            total_intersection = max(1, sum(intersection_row))
+            total_intersection = max(1, sum(intersection_row.values()))
 
             line_start = lines[merge[0]].polygon.y_start
             line_end = lines[merge[0]].polygon.y_end
@@ -9,6 +9,7 @@ class LineNumbersProcessor(BaseProcessor):
     """
     A processor for ignoring line numbers.
     """
+    page_images = ()
     block_types = (BlockTypes.Text, BlockTypes.TextInlineMath)
     strip_numbers_threshold: Annotated[
         float,
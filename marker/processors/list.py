@@ -10,6 +10,9 @@ class ListProcessor(BaseProcessor):
     """
     A processor for merging lists across pages and columns
     """
+    page_images = ()
+    skip_without_blocks = True
+    document_global = True
     block_types = (BlockTypes.ListGroup,)
     ignored_block_types: Annotated[
         Tuple[BlockTypes],
@@ -66,6 +66,12 @@ class BaseLLMProcessor(BaseProcessor):
 
         self.llm_service = llm_service
 
+    def page_image_uses(self, document: Document):
+        # Without an LLM, these processors don't run
+        if not self.use_llm:
+            return set()
+        return super().page_image_uses(document)
+
     def extract_image(
         self,
         document: Document,
@@ -15,6 +15,7 @@ from marker.logger import get_logger
 logger = get_logger()
 
 class LLMTableMergeProcessor(BaseLLMComplexBlockProcessor):
+    document_global = True
     block_types: Annotated[
         Tuple[BlockTypes],
         "The block types to process.",
@@ -10,12 +10,13 @@ class OrderProcessor(BaseProcessor):
     """
     A processor for sorting the blocks in order if needed.  This can help when the layout image was sliced.
     """
+    page_images = ()
     block_types = tuple()
 
     def __call__(self, document: Document):
         for page in document.pages:
-            # Skip OCRed pages
-            if page.text_extraction_method != "pdftext":
+            # Skip OCRed pages, pages that are only partly OCRed still have provider positions for most blocks
+            if page.text_extraction_method not in ["pdftext", "hybrid"]:
                 continue
 
             # Skip pages without layout slicing
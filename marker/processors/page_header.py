@@ -8,6 +8,8 @@ class PageHeaderProcessor(BaseProcessor):
     """
     A processor for moving PageHeaders to the top
     """
+    page_images = ()
+    skip_without_blocks = True
     block_types = (BlockTypes.PageHeader,)
 
     def __call__(self, document: Document):
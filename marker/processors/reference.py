@@ -14,6 +14,7 @@ class ReferenceProcessor(BaseProcessor):
     """
     A processor for adding references to the document.
     """
+    page_images = ()
 
     def __init__(self, config):
         super().__init__(config)
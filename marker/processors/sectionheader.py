@@ -17,6 +17,9 @@ class SectionHeaderProcessor(BaseProcessor):
     """
     A processor for recognizing section headers in the document.
     """
+    page_images = ()
+    skip_without_blocks = True
+    document_global = True
     block_types = (BlockTypes.SectionHeader, )
     level_count: Annotated[
         int,
@@ -11,15 +11,23 @@ from surya.recognition import RecognitionPredictor, TextLine
 from surya.table_rec import TableRecPredictor
 from surya.table_rec.schema import TableResult, TableCell as SuryaTableCell
 from pdftext.extraction import table_output
+from pdftext.tables import table_cell_text
 
 from marker.processors import BaseProcessor
+from marker.providers.source import (
+    DocumentSource,
+    is_in_memory,
+    open_source,
+    source_bytes,
+)
 from marker.schema import BlockTypes
 from marker.schema.blocks.tablecell import TableCell
 from marker.schema.document import Document
 from marker.schema.polygon import PolygonBox
 from marker.settings import settings
 from marker.util import matrix_intersection_area, unwrap_math
-from marker.utils.image import is_blank_image
+from marker.utils.image import InkMap, is_degenerate_polygon
+from marker.utils.spatial import SpatialIndex
 from marker.logger import get_logger
 
 logger = get_logger()
@@ -29,6 +37,9 @@ class TableProcessor(BaseProcessor):
     """
     A processor for recognizing tables in the document.
     """
+    page_images = (True,)
+    page_images_by_block = True
+    skip_without_blocks = True
 
     block_types = (BlockTypes.Table, BlockTypes.TableOfContents, BlockTypes.Form)
     table_rec_batch_size: Annotated[
@@ -83,7 +94,7 @@ class TableProcessor(BaseProcessor):
         self.detection_model = detection_model
 
     def __call__(self, document: Document):
-        filepath = document.filepath  # Path to original pdf file
+        filepath = document.get_source()  # Path to original pdf file, or the in-memory pdf
 
         table_data = []
         for page in document.pages:
@@ -93,7 +104,7 @@ class TableProcessor(BaseProcessor):
                 image = block.get_image(document, highres=True)
                 image_poly = block.polygon.rescale(
                     (page.polygon.width, page.polygon.height),
-                    page.get_image(highres=True).size,
+                    page.get_image_size(highres=True),
                 )
 
                 table_data.append(
@@ -102,11 +113,12 @@ class TableProcessor(BaseProcessor):
                         "page_id": page.page_id,
                         "table_image": image,
                         "table_bbox": image_poly.bbox,
-                        "img_size": page.get_image(highres=True).size,
+                        "img_size": page.get_image_size(highres=True),
                         "ocr_block": any(
                             [
                                 page.text_extraction_method in ["surya"],
                                 page.ocr_errors_detected,
+                                block.text_extraction_method == "surya",
                             ]
                         ),
                     }
@@ -126,7 +138,7 @@ class TableProcessor(BaseProcessor):
         # We do this at a line level
         extract_blocks = [t for t in table_data if not t["ocr_block"]]
         self.assign_pdftext_lines(
-            extract_blocks, filepath
+            extract_blocks, filepath, document
         )  # Handle tables where good text exists in the PDF
         self.assign_text_to_cells(tables, table_data)
 
@@ -142,16 +154,15 @@ class TableProcessor(BaseProcessor):
             for block in page.contained_blocks(document, self.block_types):
                 block.structure = []  # Remove any existing lines, spans, etc.
                 cells: List[SuryaTableCell] = tables[table_idx].cells
-                for cell in cells:
-                    # Rescale the cell polygon to the page size
-                    cell_polygon = PolygonBox(polygon=cell.polygon).rescale(
-                        page.get_image(highres=True).size, page.polygon.size
-                    )
-
-                    # Rescale cell polygon to be relative to the page instead of the table
-                    for corner in cell_polygon.polygon:
-                        corner[0] += block.polygon.bbox[0]
-                        corner[1] += block.polygon.bbox[1]
+                # Rescale the cell polygons to the page size
+                cell_polygons = PolygonBox.rescale_many(
+                    [cell.polygon for cell in cells],
+                    page.get_image_size(highres=True),
+                    page.polygon.size,
+                )
+                for cell, cell_polygon in zip(cells, cell_polygons):
+                    # Shift the cell polygon to be relative to the page instead of the table
+                    cell_polygon = cell_polygon.shift(block.polygon.x_start, block.polygon.y_start)
 
                     cell_block = TableCell(
                         polygon=cell_polygon,
@@ -173,12 +184,15 @@ class TableProcessor(BaseProcessor):
             child_contained_blocks = page.contained_blocks(
                 document, self.contained_block_types
             )
+            child_index = SpatialIndex(
+                [c.polygon.bbox for c in child_contained_blocks]
+            )
             for block in page.contained_blocks(document, self.block_types):
-                intersections = matrix_intersection_area(
-                    [c.polygon.bbox for c in child_contained_blocks],
-                    [block.polygon.bbox],
+                child_idxs, intersections = child_index.intersections(
+                    block.polygon.bbox
                 )
-                for child, intersection in zip(child_contained_blocks, intersections):
+                for child_idx, intersection in zip(child_idxs, intersections):
+                    child = child_contained_blocks[child_idx]
                     # Adjust this to percentage of the child block that is enclosed by the table
                     intersection_pct = intersection / max(child.polygon.area, 1)
                     if intersection_pct > 0.95 and child.id in page.structure:
@@ -454,21 +468,59 @@ class TableProcessor(BaseProcessor):
                 assert all("bbox" in t for t in text), "All text lines must have a bbox"
                 table_cells[k].text_lines = text
 
-    def assign_pdftext_lines(self, extract_blocks: list, filepath: str):
+    def assign_pdftext_lines(
+        self,
+        extract_blocks: list,
+        filepath: DocumentSource,
+        document: Document | None = None,
+    ):
+        # Rebuild pdftext pages from the characters the provider already extracted, and only re-parse pages without them
+        reparse_blocks = []
+        page_blocks = defaultdict(list)
+        pdftext_pages = {}
+        for block in extract_blocks:
+            page_id = block["page_id"]
+            if page_id not in pdftext_pages:
+                page = document.get_page(page_id) if document else None
+                page_chars = page.get_provider_chars() if page else None
+                pdftext_pages[page_id] = (
+                    page_chars.to_pdftext_page() if page_chars is not None else None
+                )
+            if pdftext_pages[page_id] is None:
+                reparse_blocks.append(block)
+            else:
+                page_blocks[page_id].append(block)
+
+        for page_id, blocks in page_blocks.items():
+            page_tables = table_cell_text(
+                [block["table_bbox"] for block in blocks],
+                pdftext_pages[page_id],
+                blocks[-1]["img_size"],
+            )
+            for block, table_text in zip(blocks, page_tables):
+                self.set_table_text_lines(block, table_text)
+
         table_inputs = []
-        unique_pages = list(set([t["page_id"] for t in extract_blocks]))
+        unique_pages = list(set([t["page_id"] for t in reparse_blocks]))
         if len(unique_pages) == 0:
             return
 
         for page in unique_pages:
             tables = []
             img_size = None
-            for block in extract_blocks:
+            for block in reparse_blocks:
                 if block["page_id"] == page:
                     tables.append(block["table_bbox"])
                     img_size = block["img_size"]
 
             table_inputs.append({"tables": tables, "img_size": img_size})
+        if is_in_memory(filepath):
+            # pdftext reopens the document in each worker process
+            filepath = (
+                source_bytes(filepath)
+                if self.pdftext_workers > 1
+                else open_source(filepath)
+            )
         cell_text = table_output(
             filepath,
             table_inputs,
@@ -481,20 +533,20 @@ class TableProcessor(BaseProcessor):
 
         for pidx, (page_tables, pnum) in enumerate(zip(cell_text, unique_pages)):
             table_idx = 0
-            for block in extract_blocks:
+            for block in reparse_blocks:
                 if block["page_id"] == pnum:
-                    table_text = page_tables[table_idx]
-                    if len(table_text) == 0:
-                        block["ocr_block"] = (
-                            True  # Re-OCR the block if pdftext didn't find any text
-                        )
-                    else:
-                        block["table_text_lines"] = page_tables[table_idx]
+                    self.set_table_text_lines(block, page_tables[table_idx])
                     table_idx += 1
             assert table_idx == len(page_tables), (
                 "Number of tables and table inputs must match"
             )
 
+    def set_table_text_lines(self, block: dict, table_text: List[dict]):
+        if len(table_text) == 0:
+            block["ocr_block"] = True  # Re-OCR the block if pdftext didn't find any text
+        else:
+            block["table_text_lines"] = table_text
+
     def align_table_cells(
         self, table: TableResult, table_detection_result: TextDetectionResult
     ):
@@ -607,13 +659,11 @@ class TableProcessor(BaseProcessor):
         ocr_polys_bad = []
 
         for table_image, polys in zip(table_images, ocr_polys):
+            ink_map = InkMap(table_image) if polys else None
             table_polys_bad = [
-                any(
-                    [
-                        poly.height < 6,
-                        is_blank_image(table_image.crop(poly.bbox), poly.polygon),
-                    ]
-                )
+                poly.height < 6
+                or is_degenerate_polygon(poly.polygon)
+                or ink_map.is_blank(poly.bbox)
                 for poly in polys
             ]
             ocr_polys_bad.append(table_polys_bad)
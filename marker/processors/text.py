@@ -13,6 +13,9 @@ class TextProcessor(BaseProcessor):
     """
     A processor for merging text across pages and columns.
     """
+    page_images = ()
+    skip_without_blocks = True
+    document_global = True
 
     block_types = (BlockTypes.Text, BlockTypes.TextInlineMath)
     ignored_block_types = (BlockTypes.PageHeader, BlockTypes.PageFooter)
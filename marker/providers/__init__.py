@@ -1,8 +1,9 @@
 from copy import deepcopy
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Sequence, Tuple
 
+import numpy as np
 from PIL import Image
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from pdftext.schema import Reference
 
@@ -11,7 +12,6 @@ from marker.schema.polygon import PolygonBox
 from marker.schema.text import Span
 from marker.schema.text.char import Char
 from marker.schema.text.line import Line
-from marker.settings import settings
 from marker.util import assign_config
 
 configure_logging()
@@ -48,6 +48,60 @@ class ProviderOutput(BaseModel):
 ProviderPageLines = Dict[int, List[ProviderOutput]]
 
 
+class ProviderPageChars(BaseModel):
+    # Columnar character store for a page, in extraction order.  Bboxes are an (N, 4) array in page coordinates,
+    # and idxs holds the pdftext character index.  Spans refer to it through their char_range.
+    chars: List[str]
+    bboxes: np.ndarray
+    idxs: np.ndarray
+    # The pdftext lines and spans the characters came from, as offsets into the store, and the line bboxes
+    line_starts: Optional[np.ndarray] = None
+    line_bboxes: Optional[np.ndarray] = None
+    span_starts: Optional[np.ndarray] = None
+    width: float = 0
+    height: float = 0
+    rotation: int = 0
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def to_pdftext_page(self) -> dict | None:
+        """
+        Rebuild the pdftext page dict the characters came from, for pdftext's table functions.  Blocks aren't
+        kept, so every line is in a single block.
+        """
+        if self.line_starts is None:
+            return None
+
+        bboxes = self.bboxes.tolist()
+        line_ends = self.line_starts.tolist()[1:] + [len(self.chars)]
+        span_bounds = self.span_starts.tolist() + [len(self.chars)]
+        span_idx = 0
+        lines = []
+        for line_bbox, start, end in zip(
+            self.line_bboxes.tolist(), self.line_starts.tolist(), line_ends
+        ):
+            spans = []
+            while span_idx < len(span_bounds) - 1 and span_bounds[span_idx] < end:
+                span_start, span_end = span_bounds[span_idx], span_bounds[span_idx + 1]
+                spans.append(
+                    {
+                        "chars": [
+                            {"char": self.chars[i], "bbox": bboxes[i]}
+                            for i in range(span_start, span_end)
+                        ]
+                    }
+                )
+                span_idx += 1
+            lines.append({"bbox": line_bbox, "spans": spans})
+
+        return {
+            "width": self.width,
+            "height": self.height,
+            "rotation": self.rotation,
+            "blocks": [{"lines": lines}],
+        }
+
+
 class BaseProvider:
     def __init__(self, filepath: str, config: Optional[BaseModel | dict] = None):
         assign_config(self, config)
@@ -59,6 +113,24 @@ class BaseProvider:
     def get_images(self, idxs: List[int], dpi: int) -> List[Image.Image]:
         pass
 
+    def get_multires_images(
+        self, idxs: List[int], dpis: List[int]
+    ) -> Dict[int, List[Image.Image]]:
+        return {dpi: self.get_images(idxs, dpi) for dpi in set(dpis)}
+
+    def get_image_size(self, idx: int, dpi: int) -> Tuple[int, int] | None:
+        # Providers that can't size a page image without rendering it return None
+        return None
+
+    def get_region_image(
+        self, idx: int, bbox: Sequence[int], dpi: int
+    ) -> Image.Image | None:
+        """
+        Render only part of a page, as a bbox in the pixels of the whole page image at `dpi`.  Returns None
+        if the provider can't, and the region is cropped from the whole page image instead.
+        """
+        return None
+
     def get_page_bbox(self, idx: int) -> PolygonBox | None:
         pass
 
@@ -68,29 +140,33 @@ class BaseProvider:
     def get_page_refs(self, idx: int) -> List[Reference]:
         pass
 
+    def get_page_chars(self, idx: int) -> ProviderPageChars | None:
+        return None
+
+    def get_page_triage(self, idx: int) -> str | None:
+        return None
+
+    def get_page_fingerprints(self, idxs: List[int]) -> Dict[int, str]:
+        # Content hashes used to reuse cached page results, pages without one are always converted
+        return {}
+
+    def get_all_page_lines(self) -> ProviderPageLines:
+        return getattr(self, "page_lines", {})
+
+    def is_page_ready(self, idx: int) -> bool:
+        # Whether text extraction has finished for a page
+        return True
+
+    def wait_for_page(self, idx: int):
+        # Block until text extraction has finished for a page
+        pass
+
     def __enter__(self):
         return self
 
     @staticmethod
     def get_font_css():
-        from weasyprint import CSS
-        from weasyprint.text.fonts import FontConfiguration
-
-        font_config = FontConfiguration()
-        css = CSS(
-            string=f"""
-            @font-face {{
-                font-family: GoNotoCurrent-Regular;
-                src: url({settings.FONT_PATH});
-                font-display: swap;
-            }}
-            body {{
-                font-family: {settings.FONT_NAME.split(".")[0]}, sans-serif;
-                font-variant-ligatures: none;
-                font-feature-settings: "liga" 0;
-                text-rendering: optimizeLegibility;
-            }}
-            """,
-            font_config=font_config,
-        )
-        return css
+        from marker.providers.html_pdf import FONT_CSS, get_stylesheet
+
+        # Cached, so fonts are only loaded once per process
+        return get_stylesheet(FONT_CSS)
@@ -1,13 +1,11 @@
 import base64
-import os
 import re
-import tempfile
 from io import BytesIO
 
 from PIL import Image
 from marker.logger import get_logger
 
-from marker.providers.pdf import PdfProvider
+from marker.providers.html_pdf import RenderedPdfProvider, render_pdf
 
 logger = get_logger()
 
@@ -49,27 +47,9 @@ td {
 """
 
 
-class DocumentProvider(PdfProvider):
-    def __init__(self, filepath: str, config=None):
-        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        self.temp_pdf_path = temp_pdf.name
-        temp_pdf.close()
-
-        # Convert DOCX to PDF
-        try:
-            self.convert_docx_to_pdf(filepath)
-        except Exception as e:
-            raise RuntimeError(f"Failed to convert {filepath} to PDF: {e}")
-
-        # Initialize the PDF provider with the temp pdf path
-        super().__init__(self.temp_pdf_path, config)
-
-    def __del__(self):
-        if os.path.exists(self.temp_pdf_path):
-            os.remove(self.temp_pdf_path)
-
-    def convert_docx_to_pdf(self, filepath: str):
-        from weasyprint import CSS, HTML
+class DocumentProvider(RenderedPdfProvider):
+    @classmethod
+    def convert_to_pdf(cls, filepath: str, output_path: str):
         import mammoth
 
         with open(filepath, "rb") as docx_file:
@@ -77,10 +57,8 @@ class DocumentProvider(PdfProvider):
             result = mammoth.convert_to_html(docx_file)
             html = result.value
 
-            # We convert the HTML into a PDF
-            HTML(string=self._preprocess_base64_images(html)).write_pdf(
-                self.temp_pdf_path, stylesheets=[CSS(string=css), self.get_font_css()]
-            )
+        # We convert the HTML into a PDF
+        render_pdf(output_path, string=cls._preprocess_base64_images(html), css=css)
 
     @staticmethod
     def _preprocess_base64_images(html_content):
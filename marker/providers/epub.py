@@ -1,10 +1,8 @@
 import base64
-import os
-import tempfile
 
 from bs4 import BeautifulSoup
 
-from marker.providers.pdf import PdfProvider
+from marker.providers.html_pdf import RenderedPdfProvider, render_pdf
 
 css = '''
 @page {
@@ -44,27 +42,9 @@ td {
 '''
 
 
-class EpubProvider(PdfProvider):
-    def __init__(self, filepath: str, config=None):
-        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=f".pdf")
-        self.temp_pdf_path = temp_pdf.name
-        temp_pdf.close()
-
-        # Convert Epub to PDF
-        try:
-            self.convert_epub_to_pdf(filepath)
-        except Exception as e:
-            raise RuntimeError(f"Failed to convert {filepath} to PDF: {e}")
-
-        # Initialize the PDF provider with the temp pdf path
-        super().__init__(self.temp_pdf_path, config)
-
-    def __del__(self):
-        if os.path.exists(self.temp_pdf_path):
-            os.remove(self.temp_pdf_path)
-
-    def convert_epub_to_pdf(self, filepath):
-        from weasyprint import CSS, HTML
+class EpubProvider(RenderedPdfProvider):
+    @classmethod
+    def convert_to_pdf(cls, filepath: str, output_path: str):
         from ebooklib import epub
         import ebooklib
 
@@ -104,7 +84,6 @@ class EpubProvider(PdfProvider):
         full_style = ''.join([css])  # + styles)
 
         # we convert the epub to HTML
-        HTML(string=html_content, base_url=filepath).write_pdf(
-            self.temp_pdf_path,
-            stylesheets=[CSS(string=full_style), self.get_font_css()]
+        render_pdf(
+            output_path, string=html_content, base_url=filepath, css=full_style
         )
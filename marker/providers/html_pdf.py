@@ -0,0 +1,242 @@
+import atexit
+import contextlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+from marker.logger import get_logger
+from marker.providers.pdf import PdfProvider
+from marker.settings import settings
+
+logger = get_logger()
+
+FONT_CSS = f"""
+@font-face {{
+    font-family: GoNotoCurrent-Regular;
+    src: url({settings.FONT_PATH});
+    font-display: swap;
+}}
+body {{
+    font-family: {settings.FONT_NAME.split(".")[0]}, sans-serif;
+    font-variant-ligatures: none;
+    font-feature-settings: "liga" 0;
+    text-rendering: optimizeLegibility;
+}}
+"""
+
+
+@lru_cache(maxsize=None)
+def get_font_config():
+    from weasyprint.text.fonts import FontConfiguration
+
+    # Loading fonts is slow, so one configuration is shared by every render in the process
+    return FontConfiguration()
+
+
+@lru_cache(maxsize=32)
+def get_stylesheet(css: str):
+    from weasyprint import CSS
+
+    return CSS(string=css, font_config=get_font_config())
+
+
+def write_pdf(
+    output_path: str,
+    string: Optional[str] = None,
+    filename: Optional[str] = None,
+    base_url: Optional[str] = None,
+    css: Optional[str] = None,
+):
+    from weasyprint import HTML
+
+    stylesheets = [get_stylesheet(FONT_CSS)]
+    if css:
+        stylesheets.insert(0, get_stylesheet(css))
+
+    HTML(
+        string=string, filename=filename, base_url=base_url, encoding="utf-8"
+    ).write_pdf(output_path, stylesheets=stylesheets, font_config=get_font_config())
+
+
+def _render_worker(conn):
+    # Fonts and the base stylesheet are loaded once, before the first document arrives
+    get_stylesheet(FONT_CSS)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        try:
+            write_pdf(**task)
+            conn.send(None)
+        except Exception as e:
+            conn.send(f"{type(e).__name__}: {e}")
+    conn.close()
+
+
+class RenderPool:
+    """
+    A pool of WeasyPrint worker processes that keep their fonts and stylesheets loaded between documents.
+    It can be used from several threads at once.  A render that takes longer than `timeout` seconds
+    kills its worker, which is replaced on the next render.
+    """
+
+    def __init__(self, workers: int, timeout: float | None = None):
+        self.workers = workers
+        self.timeout = timeout
+        self.idle = deque()
+        self.started = 0
+        # Signalled whenever a worker goes idle or a worker slot frees up
+        self.available = threading.Condition()
+        self.context = multiprocessing.get_context("spawn")
+
+    def start_worker(self):
+        conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=_render_worker, args=(child_conn,), daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    def acquire(self):
+        with self.available:
+            while not self.idle and self.started >= self.workers:
+                self.available.wait()
+            if self.idle:
+                return self.idle.popleft()
+            self.started += 1
+
+        # Workers are started outside the lock, since spawning a process is slow
+        try:
+            return self.start_worker()
+        except BaseException:
+            self.free_slot()
+            raise
+
+    def free_slot(self):
+        with self.available:
+            self.started -= 1
+            self.available.notify()
+
+    def release(self, worker, healthy: bool):
+        if healthy:
+            with self.available:
+                self.idle.append(worker)
+                self.available.notify()
+            return
+
+        process, conn = worker
+        process.kill()
+        process.join()
+        conn.close()
+        # Waiting renders start a replacement worker in the freed slot
+        self.free_slot()
+
+    def write_pdf(self, output_path: str, **kwargs):
+        worker = self.acquire()
+        process, conn = worker
+        healthy = False
+        try:
+            conn.send({"output_path": output_path, **kwargs})
+            if conn.poll(self.timeout):
+                error = conn.recv()
+                healthy = True
+        except (EOFError, OSError) as e:
+            raise RuntimeError(f"The PDF render worker exited unexpectedly: {e}")
+        finally:
+            # Workers that timed out are killed, so a stuck render doesn't hold up the pool
+            self.release(worker, healthy)
+
+        if not healthy:
+            raise TimeoutError(f"Rendering to PDF took over {self.timeout} seconds")
+        if error is not None:
+            raise RuntimeError(error)
+
+    def close(self):
+        with self.available:
+            idle = list(self.idle)
+            self.idle.clear()
+            self.started -= len(idle)
+        for process, conn in idle:
+            with contextlib.suppress(OSError):
+                conn.send(None)
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+            conn.close()
+
+
+_render_pool: RenderPool | None = None
+_render_pool_lock = threading.Lock()
+
+
+def set_render_pool(pool: RenderPool | None):
+    global _render_pool
+    _render_pool = pool
+
+
+def get_render_pool() -> RenderPool | None:
+    global _render_pool
+    # Daemonic processes, like multiprocessing pool workers, can't start their own workers
+    if settings.PDF_RENDER_WORKERS <= 0 or multiprocessing.current_process().daemon:
+        return _render_pool
+
+    with _render_pool_lock:
+        # Several converter threads can ask for the pool at once, and should share one
+        if _render_pool is None:
+            _render_pool = RenderPool(
+                settings.PDF_RENDER_WORKERS, settings.PDF_RENDER_TIMEOUT
+            )
+            atexit.register(_render_pool.close)
+    return _render_pool
+
+
+def render_pdf(output_path: str, **kwargs):
+    """
+    Render HTML to a PDF, in the render pool if one is configured, or in this process otherwise.
+    """
+    pool = get_render_pool()
+    if pool is not None:
+        pool.write_pdf(output_path, **kwargs)
+    else:
+        write_pdf(output_path, **kwargs)
+
+
+class RenderedPdfProvider(PdfProvider):
+    """
+    Base for providers that render their input to a temporary PDF, and then read it like any other PDF.
+    """
+
+    def __init__(self, filepath: str, config=None):
+        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+        self.temp_pdf_path = temp_pdf.name
+        temp_pdf.close()
+
+        try:
+            self.convert_to_pdf(filepath, self.temp_pdf_path)
+        except Exception as e:
+            raise self.conversion_error(filepath, e)
+
+        # Initialize the PDF provider with the temp pdf path
+        super().__init__(self.temp_pdf_path, config)
+
+    @classmethod
+    def conversion_error(cls, filepath: str, error: Exception) -> Exception:
+        return RuntimeError(f"Failed to convert {filepath} to PDF: {error}")
+
+    def __del__(self):
+        if os.path.exists(self.temp_pdf_path):
+            os.remove(self.temp_pdf_path)
+        super().__del__()
+
+    @classmethod
+    def convert_to_pdf(cls, filepath: str, output_path: str):
+        raise NotImplementedError
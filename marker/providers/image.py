@@ -2,6 +2,7 @@ from typing import List, Annotated
 from PIL import Image
 
 from marker.providers import ProviderPageLines, BaseProvider
+from marker.providers.source import BufferReader, DocumentSource, is_in_memory
 from marker.schema.polygon import PolygonBox
 from marker.schema.text import Line
 from pdftext.schema import Reference
@@ -16,9 +17,11 @@ class ImageProvider(BaseProvider):
 
     image_count: int = 1
 
-    def __init__(self, filepath: str, config=None):
+    def __init__(self, filepath: DocumentSource, config=None):
         super().__init__(filepath, config)
 
+        if is_in_memory(filepath):
+            filepath = BufferReader(filepath)
         self.images = [Image.open(filepath)]
         self.page_lines: ProviderPageLines = {i: [] for i in range(self.image_count)}
 
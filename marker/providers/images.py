@@ -0,0 +1,360 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from marker.providers import BaseProvider
+
+# (page id, highres) for whole page images, and (page id, highres, bbox) for regions rendered on their own
+ImageKey = Tuple[int, bool] | Tuple[int, bool, Tuple[int, int, int, int]]
+
+
+def image_nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageBudget:
+    """
+    A byte budget for page images in memory, shared by every image cache that uses it.  Past the budget,
+    the least recently used image across all of the caches is evicted from its cache.
+    """
+
+    _shared: Dict[int, "ImageBudget"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Tuple[int, ImageKey], Tuple[weakref.ref, int]] = (
+            OrderedDict()
+        )
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, max_bytes: int) -> "ImageBudget":
+        # Documents converted in the same process with the same budget share it
+        with cls._shared_lock:
+            if max_bytes not in cls._shared:
+                cls._shared[max_bytes] = cls(max_bytes)
+            return cls._shared[max_bytes]
+
+    def add(
+        self, cache: "PageImageCache", key: ImageKey, nbytes: int
+    ) -> List[Tuple["PageImageCache", ImageKey]]:
+        """
+        Count an image against the budget, and return the (cache, key) images to evict to stay within it.
+        """
+        victims = []
+        with self.lock:
+            entry_key = (id(cache), key)
+            if entry_key in self.entries:
+                self.current_bytes -= self.entries.pop(entry_key)[1]
+            self.entries[entry_key] = (weakref.ref(cache), nbytes)
+            self.current_bytes += nbytes
+
+            # Always keep the most recent image, even if it alone exceeds the budget
+            while self.current_bytes > self.max_bytes and len(self.entries) > 1:
+                (_, victim_key), (cache_ref, victim_bytes) = self.entries.popitem(
+                    last=False
+                )
+                self.current_bytes -= victim_bytes
+                victim_cache = cache_ref()
+                if victim_cache is not None:
+                    victims.append((victim_cache, victim_key))
+        return victims
+
+    def touch(self, cache: "PageImageCache", key: ImageKey):
+        with self.lock:
+            entry_key = (id(cache), key)
+            if entry_key in self.entries:
+                self.entries.move_to_end(entry_key)
+
+    def remove(self, cache_id: int, keys: Optional[Sequence[ImageKey]] = None):
+        # Takes the cache id, so it can run from a finalizer after the cache is gone
+        with self.lock:
+            if keys is None:
+                keys = [k for c, k in self.entries if c == cache_id]
+            for key in keys:
+                entry = self.entries.pop((cache_id, key), None)
+                if entry is not None:
+                    self.current_bytes -= entry[1]
+
+
+class PageImageCache:
+    """
+    Renders page images on demand from a provider, and keeps the most recently used ones in memory.
+    Images count against a byte budget, which can be shared between caches.  Past the budget, the least
+    recently used images are evicted, and with `spill`, they are written to compressed temporary files
+    that are read back instead of rendering the page again.  Images no stage needs anymore can be dropped
+    with `release`.
+
+    Highres images are mostly used to crop a few regions, like tables and figures.  With `region_max_fraction`,
+    a region covering at most that fraction of a page whose highres image isn't cached is rendered on its
+    own, and cached like a page image.
+
+    The highres DPI can be changed per page with `set_dpi`, for pages with unusually large or small text.
+
+    Lowres images are needed for every page, so a lowres miss also renders the next `readahead` pages
+    in one provider call.  With `multires`, a lowres miss renders the highres image in the same pass.
+
+    The cache can be shared between threads, like a prefetch thread and the builders.  Rendering happens
+    outside the cache lock, so cached images can be read while other pages render.
+    """
+
+    def __init__(
+        self,
+        provider: BaseProvider,
+        lowres_dpi: int,
+        highres_dpi: int,
+        max_bytes: int,
+        page_ids: Sequence[int] = (),
+        readahead: int = 1,
+        multires: bool = False,
+        budget: Optional[ImageBudget] = None,
+        spill: bool = False,
+        spill_dir: Optional[str] = None,
+        region_max_fraction: float = 0,
+    ):
+        self.provider = provider
+        self.dpis = {False: lowres_dpi, True: highres_dpi}
+        self.page_dpis: Dict[ImageKey, int] = {}
+        self.page_ids = list(page_ids)
+        self.readahead = max(1, readahead)
+        self.multires = multires
+        self.budget = budget or ImageBudget(max_bytes)
+        self.spill = spill
+        self.spill_root = spill_dir
+        self.spill_path: Optional[str] = None
+        self.region_max_fraction = region_max_fraction
+        self.images: OrderedDict[ImageKey, Image.Image] = OrderedDict()
+        self.spilled: Dict[ImageKey, Tuple[str, str, Tuple[int, int]]] = {}
+        self.lock = threading.RLock()
+        weakref.finalize(self, self.budget.remove, id(self))
+
+    @property
+    def max_bytes(self) -> int:
+        return self.budget.max_bytes
+
+    def get(self, page_id: int, highres: bool = False) -> Image.Image:
+        key = (page_id, highres)
+        image = self.lookup(key)
+        if image is not None:
+            return image
+
+        render_ids = [page_id]
+        if not highres:
+            with self.lock:
+                render_ids = self.readahead_ids(page_id)
+        rendered = self.render(render_ids, highres)
+        return rendered[key]
+
+    def get_many(self, page_ids: List[int], highres: bool = False) -> List[Image.Image]:
+        # Render all missing pages in a single provider call, so the document is only opened once
+        cached: Dict[int, Image.Image] = {}
+        for page_id in dict.fromkeys(page_ids):
+            image = self.lookup((page_id, highres))
+            if image is not None:
+                cached[page_id] = image
+        missing = [p for p in dict.fromkeys(page_ids) if p not in cached]
+        rendered = self.render(missing, highres) if missing else {}
+
+        return [
+            cached[p] if p in cached else rendered[(p, highres)] for p in page_ids
+        ]
+
+    def image_size(self, page_id: int, highres: bool = False) -> Tuple[int, int]:
+        key = (page_id, highres)
+        with self.lock:
+            if key in self.images:
+                return self.images[key].size
+            if key in self.spilled:
+                return self.spilled[key][2]
+
+        size = None
+        if self.renders_regions(page_id, highres):
+            size = self.provider.get_image_size(page_id, self.dpi(page_id, highres))
+        if size is None:
+            size = self.get(page_id, highres).size
+        return size
+
+    def dpi(self, page_id: int, highres: bool = False) -> int:
+        return self.page_dpis.get((page_id, highres), self.dpis[highres])
+
+    def set_dpi(self, page_id: int, dpi: int, highres: bool = True):
+        """
+        Render a page at a different DPI from the rest.  Images already rendered at the old DPI are released.
+        """
+        with self.lock:
+            if self.dpi(page_id, highres) == dpi:
+                return
+            self.release([page_id], highres)
+            self.page_dpis[(page_id, highres)] = dpi
+
+    def renders_regions(self, page_id: int, highres: bool) -> bool:
+        # Regions match crops of the whole image only if it is rendered directly, not downsampled
+        return (
+            highres
+            and self.region_max_fraction > 0
+            and self.dpi(page_id, True) >= self.dpi(page_id, False)
+        )
+
+    def get_region(
+        self, page_id: int, bbox: Sequence[float], highres: bool = False
+    ) -> Image.Image:
+        """
+        Crop a region of a page image, as a bbox in the pixels of the whole image.
+        """
+        bbox = tuple(int(round(c)) for c in bbox)
+        key = (page_id, highres)
+        with self.lock:
+            cached = key in self.images or key in self.spilled
+        if cached or not self.renders_regions(page_id, highres):
+            return self.get(page_id, highres).crop(bbox)
+
+        dpi = self.dpi(page_id, highres)
+        size = self.provider.get_image_size(page_id, dpi)
+        region_area = max(bbox[2] - bbox[0], 0) * max(bbox[3] - bbox[1], 0)
+        if size is None or region_area > self.region_max_fraction * size[0] * size[1]:
+            return self.get(page_id, highres).crop(bbox)
+
+        region_key = (page_id, highres, bbox)
+        image = self.lookup(region_key)
+        if image is None:
+            image = self.provider.get_region_image(page_id, bbox, dpi)
+            if image is None:
+                return self.get(page_id, highres).crop(bbox)
+            self.put(region_key, image)
+        return image
+
+    def lookup(self, key: ImageKey) -> Image.Image | None:
+        # Must be called without holding our lock, since putting a spilled image back can evict from other caches
+        with self.lock:
+            if key in self.images:
+                self.images.move_to_end(key)
+                self.budget.touch(self, key)
+                return self.images[key]
+
+            spilled = self.spilled.get(key)
+            if spilled is None:
+                return None
+
+        try:
+            image = self.load_spilled(spilled)
+        except FileNotFoundError:
+            # Released by another thread while we were reading it
+            return None
+
+        # Spilled images come back into memory, and count against the budget again
+        self.put(key, image)
+        return image
+
+    def readahead_ids(self, page_id: int) -> List[int]:
+        if page_id not in self.page_ids:
+            return [page_id]
+
+        start = self.page_ids.index(page_id)
+        candidates = self.page_ids[start : start + self.readahead]
+        return [
+            p
+            for p in candidates
+            if p == page_id
+            or ((p, False) not in self.images and (p, False) not in self.spilled)
+        ]
+
+    def render(
+        self, page_ids: List[int], highres: bool
+    ) -> Dict[ImageKey, Image.Image]:
+        levels = [highres]
+        if self.multires and not highres:
+            levels = [False, True]
+
+        # Pages are rendered together if they are at the same DPIs
+        dpi_groups = defaultdict(list)
+        for page_id in page_ids:
+            dpis = tuple(self.dpi(page_id, level) for level in levels)
+            dpi_groups[dpis].append(page_id)
+
+        rendered = {}
+        for dpis, group_ids in dpi_groups.items():
+            dpi_images = self.provider.get_multires_images(group_ids, list(dpis))
+            for level, dpi in zip(levels, dpis):
+                for page_id, image in zip(group_ids, dpi_images[dpi]):
+                    rendered[(page_id, level)] = image
+
+        # Insert the requested images last, so they are the least likely to be evicted
+        for key in sorted(rendered, key=lambda k: k[1] == highres):
+            self.put(key, rendered[key])
+        return rendered
+
+    def put(self, key: ImageKey, image: Image.Image):
+        with self.lock:
+            self.images.pop(key, None)
+            self.images[key] = image
+        victims = self.budget.add(self, key, image_nbytes(image))
+
+        # Evicted outside our lock, since victims can belong to other caches
+        for cache, victim_key in victims:
+            cache.evict(victim_key)
+
+    def evict(self, key: ImageKey):
+        with self.lock:
+            image = self.images.pop(key, None)
+            if image is None or not self.spill or key in self.spilled:
+                return
+            self.write_spilled(key, image)
+
+    def spill_dir(self) -> str:
+        if self.spill_path is None:
+            self.spill_path = tempfile.mkdtemp(
+                prefix="marker-page-images-", dir=self.spill_root
+            )
+            weakref.finalize(self, shutil.rmtree, self.spill_path, True)
+        return self.spill_path
+
+    def write_spilled(self, key: ImageKey, image: Image.Image):
+        # Page images are mostly background, so even the fastest compression shrinks them a lot
+        name = "_".join(str(int(part)) for part in (*key[:2], *(key[2] if len(key) > 2 else ())))
+        path = os.path.join(self.spill_dir(), f"{name}.zlib")
+        with open(path, "wb") as f:
+            f.write(zlib.compress(image.tobytes(), 1))
+        self.spilled[key] = (path, image.mode, image.size)
+
+    @staticmethod
+    def load_spilled(spilled: Tuple[str, str, Tuple[int, int]]) -> Image.Image:
+        path, mode, size = spilled
+        with open(path, "rb") as f:
+            return Image.frombytes(mode, size, zlib.decompress(f.read()))
+
+    def release(self, page_ids: Sequence[int], highres: bool):
+        """
+        Drop page images and their regions from memory and disk, once nothing will read them again.  Released
+        images are rendered again if they are requested after all.
+        """
+        page_ids = set(page_ids)
+        with self.lock:
+            keys = [
+                key
+                for key in {*self.images, *self.spilled}
+                if key[0] in page_ids and key[1] == highres
+            ]
+            for key in keys:
+                self.images.pop(key, None)
+                spilled = self.spilled.pop(key, None)
+                if spilled is not None and os.path.exists(spilled[0]):
+                    os.remove(spilled[0])
+        self.budget.remove(id(self), keys)
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.spilled.clear()
+            if self.spill_path is not None:
+                shutil.rmtree(self.spill_path, ignore_errors=True)
+                self.spill_path = None
+        self.budget.remove(id(self))
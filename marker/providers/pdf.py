@@ -1,20 +1,39 @@
 import contextlib
 import ctypes
+import hashlib
 import logging
+import math
+import multiprocessing
 import re
-from typing import Annotated, Dict, List, Optional, Set
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Annotated, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
-import pypdfium2 as pdfium
 import pypdfium2.raw as pdfium_c
+import numpy as np
 from ftfy import fix_text
 from pdftext.extraction import dictionary_output
 from pdftext.schema import Reference
-from pdftext.pdf.utils import flatten as flatten_pdf_page
+from pdftext.settings import settings as pdftext_settings
 
 from PIL import Image
 from pypdfium2 import PdfiumError, PdfDocument
 
-from marker.providers import BaseProvider, ProviderOutput, Char, ProviderPageLines
+from marker.providers import (
+    BaseProvider,
+    ProviderOutput,
+    Char,
+    ProviderPageChars,
+    ProviderPageLines,
+)
+from marker.providers.rasterize import PageRasterizer, open_pdf, pdfium_lock
+from marker.providers.source import (
+    DocumentSource,
+    is_in_memory,
+    open_source,
+    source_bytes,
+)
 from marker.providers.utils import alphanum_ratio
 from marker.schema import BlockTypes
 from marker.schema.polygon import PolygonBox
@@ -80,11 +99,36 @@ class PdfProvider(BaseProvider):
         bool,
         "Whether to keep character-level information in the output.",
     ] = False
+    retain_chars: Annotated[
+        bool,
+        "Whether to retain compact character boxes from text extraction.",
+        "These are reused for table cell text, instead of parsing the PDF again.",
+        "The PDF converter turns this on when the table processor runs.",
+    ] = False
+    pdftext_window_pages: Annotated[
+        int,
+        "Extract text in windows of this many pages, and stream them to the builders as they finish.",
+        "With more than one pdftext worker, windows are extracted in the background while layout runs.",
+        "Default is None, which extracts all pages up front.",
+    ] = None
+    page_triage: Annotated[
+        bool,
+        "Classify pages as digital, scanned, mixed, blank or image only from their PDF objects, before rendering.",
+        "The classification is used to skip models that a page does not need.",
+    ] = False
+    raster_workers: Annotated[
+        int,
+        "The number of worker processes to use for rendering page images.",
+        "Default is 1, which renders in the current process.",
+    ] = 1
 
-    def __init__(self, filepath: str, config=None):
+    def __init__(self, filepath: DocumentSource, config=None):
         super().__init__(filepath, config)
 
         self.filepath = filepath
+        self.rasterizer = PageRasterizer(
+            self.filepath, workers=self.raster_workers, flatten_pdf=self.flatten_pdf
+        )
 
         with self.get_doc() as doc:
             self.page_count = len(doc)
@@ -92,6 +136,14 @@ class PdfProvider(BaseProvider):
             self.page_refs: Dict[int, List[Reference]] = {
                 i: [] for i in range(len(doc))
             }
+            self.page_chars: Dict[int, ProviderPageChars] = {}
+            self.page_bboxes: Dict[int, List[float]] = {}
+            self.page_object_stats: Dict[int, dict] = {}
+            self.extracted_pages: Set[int] = set()
+            self.pending_windows = deque()
+            self.extraction_pool: ProcessPoolExecutor | None = None
+            self.page_stream: Iterator[Tuple[int, List[ProviderOutput]]] | None = None
+            self.stream_lock = threading.RLock()
 
             if self.page_range is None:
                 self.page_range = range(len(doc))
@@ -100,30 +152,54 @@ class PdfProvider(BaseProvider):
                 f"Invalid page range, values must be between 0 and {len(doc) - 1}.  Min of provided page range is {min(self.page_range)} and max is {max(self.page_range)}."
             )
 
+            if self.page_triage:
+                self.page_object_stats = {
+                    i: self.get_page_object_stats(i, doc) for i in self.page_range
+                }
+
             if self.force_ocr:
                 # Manually assign page bboxes, since we can't get them from pdftext
                 self.page_bboxes = {i: doc[i].get_bbox() for i in self.page_range}
+            elif self.pdftext_window_pages:
+                # Size pages from pdfium, so documents can be built before text extraction finishes
+                self.page_lines = {}
+                self.page_bboxes = {
+                    i: self.get_pdfium_page_bbox(doc[i]) for i in self.page_range
+                }
+
+        # Text extraction runs outside the pdfium lock, which it only takes around its own pdfium calls
+        if not self.force_ocr:
+            if self.pdftext_window_pages:
+                self.start_page_stream()
             else:
-                self.page_lines = self.pdftext_extraction(doc)
+                self.page_lines = self.pdftext_extraction()
 
     @contextlib.contextmanager
     def get_doc(self):
         doc = None
-        try:
-            doc = pdfium.PdfDocument(self.filepath)
-
-            # Must be called on the parent pdf, before retrieving pages to render correctly
-            if self.flatten_pdf:
-                doc.init_forms()
-
-            yield doc
-        finally:
-            if doc:
-                doc.close()
+        with pdfium_lock:
+            try:
+                doc = open_pdf(self.filepath, self.flatten_pdf)
+                yield doc
+            finally:
+                if doc:
+                    doc.close()
 
     def __len__(self) -> int:
         return self.page_count
 
+    def __del__(self):
+        rasterizer = getattr(self, "rasterizer", None)
+        if rasterizer is not None:
+            rasterizer.close()
+        self.close_extraction_pool()
+
+    def close_extraction_pool(self):
+        extraction_pool = getattr(self, "extraction_pool", None)
+        if extraction_pool is not None:
+            extraction_pool.shutdown(wait=False, cancel_futures=True)
+            self.extraction_pool = None
+
     def font_flags_to_format(self, flags: Optional[int]) -> Set[str]:
         if flags is None:
             return {"plain"}
@@ -199,36 +275,140 @@ class PdfProvider(BaseProvider):
             text = text.replace(space, " ")
         return text
 
-    def pdftext_extraction(self, doc: PdfDocument) -> ProviderPageLines:
-        page_lines: ProviderPageLines = {}
-        page_char_blocks = dictionary_output(
-            self.filepath,
-            page_range=self.page_range,
-            keep_chars=self.keep_chars,
-            workers=self.pdftext_workers,
+    def pdftext_kwargs(self) -> dict:
+        return dict(
+            keep_chars=self.keep_chars or self.retain_chars,
             flatten_pdf=self.flatten_pdf,
             quote_loosebox=False,
             disable_links=self.disable_links,
         )
-        self.page_bboxes = {
-            i: [0, 0, page["width"], page["height"]]
-            for i, page in zip(self.page_range, page_char_blocks)
-        }
+
+    def pdftext_source(self, workers: int = 1):
+        if is_in_memory(self.filepath) and workers > 1:
+            # Worker processes need a picklable copy of an in-memory document
+            return source_bytes(self.filepath)
+        return open_source(self.filepath)
+
+    def pdftext_lock(self, workers: int, page_count: int):
+        # pdftext only starts worker processes when each gets enough pages, otherwise it calls pdfium in this process
+        if workers > 1 and page_count // pdftext_settings.WORKER_PAGE_THRESHOLD > 1:
+            return contextlib.nullcontext()
+        return pdfium_lock
+
+    def pdftext_extraction(self) -> ProviderPageLines:
+        with self.pdftext_lock(self.pdftext_workers, len(self.page_range)):
+            page_char_blocks = dictionary_output(
+                self.pdftext_source(self.pdftext_workers),
+                page_range=self.page_range,
+                workers=self.pdftext_workers,
+                **self.pdftext_kwargs(),
+            )
+        return self.process_pdftext_pages(page_char_blocks)
+
+    def start_page_stream(self):
+        windows = [
+            list(self.page_range[i : i + self.pdftext_window_pages])
+            for i in range(0, len(self.page_range), self.pdftext_window_pages)
+        ]
+        if self.pdftext_workers > 1:
+            # Each window is extracted by a single pdftext process, so windows finish in order
+            self.extraction_pool = ProcessPoolExecutor(
+                max_workers=self.pdftext_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            source = self.pdftext_source(self.pdftext_workers)
+            for window in windows:
+                future = self.extraction_pool.submit(
+                    dictionary_output,
+                    source,
+                    page_range=window,
+                    workers=1,
+                    **self.pdftext_kwargs(),
+                )
+                self.pending_windows.append((window, future))
+        else:
+            # Extract lazily in this process, to bound peak memory
+            self.pending_windows.extend((window, None) for window in windows)
+        self.page_stream = self.iter_page_lines()
+
+    def iter_page_lines(self) -> Iterator[Tuple[int, List[ProviderOutput]]]:
+        while self.pending_windows:
+            window, future = self.pending_windows.popleft()
+            if future is not None:
+                page_char_blocks = future.result()
+            else:
+                with pdfium_lock:
+                    page_char_blocks = dictionary_output(
+                        self.pdftext_source(),
+                        page_range=window,
+                        workers=1,
+                        **self.pdftext_kwargs(),
+                    )
+
+            window_lines = self.process_pdftext_pages(page_char_blocks)
+            self.page_lines.update(window_lines)
+            self.extracted_pages.update(window)
+            for page_id in window:
+                yield page_id, window_lines.get(page_id, [])
+
+        self.close_extraction_pool()
+
+    def is_page_ready(self, idx: int) -> bool:
+        return self.page_stream is None or idx in self.extracted_pages
+
+    def wait_for_page(self, idx: int):
+        if self.page_stream is None:
+            return
+        # The stream can be advanced from a prefetch thread and the builders at the same time
+        with self.stream_lock:
+            while idx not in self.extracted_pages:
+                if next(self.page_stream, None) is None:
+                    break
+
+    def get_all_page_lines(self) -> ProviderPageLines:
+        if self.page_stream is not None:
+            with self.stream_lock:
+                for _ in self.page_stream:
+                    pass
+        return self.page_lines
+
+    def process_pdftext_pages(self, page_char_blocks: List[dict]) -> ProviderPageLines:
+        page_lines: ProviderPageLines = {}
+        # Only the page checks call pdfium, building the lines doesn't need the lock
+        with self.get_doc() as doc:
+            text_pages = {
+                page["page"]
+                for page in page_char_blocks
+                if self.check_page(page["page"], doc)
+            }
+        for page in page_char_blocks:
+            self.page_bboxes.setdefault(
+                page["page"], [0, 0, page["width"], page["height"]]
+            )
 
         SpanClass: Span = get_block_class(BlockTypes.Span)
         LineClass: Line = get_block_class(BlockTypes.Line)
-        CharClass: Char = get_block_class(BlockTypes.Char)
+        store_chars = self.retain_chars or self.keep_chars
 
         for page in page_char_blocks:
             page_id = page["page"]
             lines: List[ProviderOutput] = []
-            if not self.check_page(page_id, doc):
+            page_chars: List[str] = []
+            page_char_bboxes: List[List[float]] = []
+            page_char_idxs: List[int] = []
+            page_line_starts: List[int] = []
+            page_line_bboxes: List[List[float]] = []
+            page_span_starts: List[int] = []
+            if page_id not in text_pages:
                 continue
 
             for block in page["blocks"]:
                 for line in block["lines"]:
                     spans: List[Span] = []
                     chars: List[List[Char]] = []
+                    if store_chars:
+                        page_line_starts.append(len(page_chars))
+                        page_line_bboxes.append(line["bbox"])
                     for span in line["spans"]:
                         if not span["text"]:
                             continue
@@ -247,6 +427,17 @@ class PdfProvider(BaseProvider):
                         if superscript or subscript:
                             text = text.strip()
 
+                        # Characters live in a columnar store for the page, spans only keep their offsets
+                        char_range = None
+                        if store_chars:
+                            char_start = len(page_chars)
+                            page_span_starts.append(char_start)
+                            for c in span["chars"]:
+                                page_chars.append(c["char"])
+                                page_char_bboxes.append(c["bbox"])
+                                page_char_idxs.append(c["char_idx"])
+                            char_range = [char_start, len(page_chars)]
+
                         spans.append(
                             SpanClass(
                                 polygon=polygon,
@@ -262,23 +453,10 @@ class PdfProvider(BaseProvider):
                                 url=span.get("url"),
                                 has_superscript=superscript,
                                 has_subscript=subscript,
+                                char_range=char_range,
                             )
                         )
-
-                        if self.keep_chars:
-                            span_chars = [
-                                CharClass(
-                                    text=c["char"],
-                                    polygon=PolygonBox.from_bbox(
-                                        c["bbox"], ensure_nonzero_area=True
-                                    ),
-                                    idx=c["char_idx"],
-                                )
-                                for c in span["chars"]
-                            ]
-                            chars.append(span_chars)
-                        else:
-                            chars.append([])
+                        chars.append([])
 
                     polygon = PolygonBox.from_bbox(
                         line["bbox"], ensure_nonzero_area=True
@@ -296,6 +474,23 @@ class PdfProvider(BaseProvider):
                     )
             if self.check_line_spans(lines):
                 page_lines[page_id] = lines
+                if store_chars:
+                    # Float64 bboxes, so table cell text matches pdftext exactly
+                    self.page_chars[page_id] = ProviderPageChars(
+                        chars=page_chars,
+                        bboxes=np.array(page_char_bboxes, dtype=np.float64).reshape(
+                            -1, 4
+                        ),
+                        idxs=np.array(page_char_idxs, dtype=np.int32),
+                        line_starts=np.array(page_line_starts, dtype=np.int32),
+                        line_bboxes=np.array(page_line_bboxes, dtype=np.float64).reshape(
+                            -1, 4
+                        ),
+                        span_starts=np.array(page_span_starts, dtype=np.int32),
+                        width=page["width"],
+                        height=page["height"],
+                        rotation=page.get("rotation", 0),
+                    )
 
             self.page_refs[page_id] = []
             if page_refs := page.get("refs", None):
@@ -376,6 +571,110 @@ class PdfProvider(BaseProvider):
 
         return True
 
+    def get_page_object_stats(self, page_id: int, doc: PdfDocument) -> dict | None:
+        page = doc.get_page(page_id)
+        page_bbox = PolygonBox.from_bbox(page.get_bbox())
+        try:
+            page_objs = list(
+                page.get_objects(
+                    filter=[
+                        pdfium_c.FPDF_PAGEOBJ_TEXT,
+                        pdfium_c.FPDF_PAGEOBJ_IMAGE,
+                        pdfium_c.FPDF_PAGEOBJ_PATH,
+                    ]
+                )
+            )
+        except PdfiumError:
+            # Happens when pdfium fails to get the number of page objects
+            return None
+
+        stats = {
+            "text_objects": 0,
+            "image_objects": 0,
+            "path_objects": 0,
+            "image_coverage": 0.0,
+        }
+        for obj in page_objs:
+            if obj.type == pdfium_c.FPDF_PAGEOBJ_TEXT:
+                stats["text_objects"] += 1
+            elif obj.type == pdfium_c.FPDF_PAGEOBJ_PATH:
+                stats["path_objects"] += 1
+            else:
+                stats["image_objects"] += 1
+                img_bbox = PolygonBox.from_bbox(obj.get_pos())
+                stats["image_coverage"] = max(
+                    stats["image_coverage"], page_bbox.intersection_pct(img_bbox)
+                )
+        return stats
+
+    def get_page_fingerprints(self, idxs: List[int]) -> Dict[int, str]:
+        fingerprints = {}
+        with self.get_doc() as doc:
+            for idx in idxs:
+                fingerprint = self.get_page_fingerprint(idx, doc)
+                if fingerprint is not None:
+                    fingerprints[idx] = fingerprint
+        return fingerprints
+
+    def get_page_fingerprint(self, idx: int, doc: PdfDocument) -> str | None:
+        """
+        Hash everything pdfium draws from the page content stream (object geometry, colours, path segments, text,
+        fonts and raw image data), plus the annotation and form field values, without rendering the page.
+        """
+        page = doc.get_page(idx)
+        hasher = hashlib.sha256()
+        hasher.update(repr((page.get_size(), page.get_rotation())).encode("utf-8"))
+        hasher.update(page.get_textpage().get_text_range().encode("utf-8"))
+        try:
+            for obj in page.get_objects():
+                pos = [round(v, 2) for v in obj.get_pos()]
+                hasher.update(repr((obj.type, pos)).encode("utf-8"))
+                hasher.update(self._get_object_style(obj.raw).encode("utf-8"))
+                if obj.type == pdfium_c.FPDF_PAGEOBJ_TEXT:
+                    font = pdfium_c.FPDFTextObj_GetFont(obj.raw)
+                    hasher.update(self._get_fontname(font).encode("utf-8"))
+                elif obj.type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+                    hasher.update(self._get_raw_image_data(obj.raw))
+                elif obj.type == pdfium_c.FPDF_PAGEOBJ_PATH:
+                    hasher.update(self._get_path_segments(obj.raw).encode("utf-8"))
+        except PdfiumError:
+            # Happens when pdfium fails to get the number of page objects
+            return None
+
+        # Annotations and form fields are drawn on top of the content stream, or flattened into it
+        formenv = getattr(doc, "formenv", None)
+        form_handle = formenv.raw if formenv is not None else None
+        for annot_idx in range(pdfium_c.FPDFPage_GetAnnotCount(page.raw)):
+            annot = pdfium_c.FPDFPage_GetAnnot(page.raw, annot_idx)
+            if not annot:
+                continue
+            try:
+                hasher.update(
+                    self._get_annotation_values(annot, form_handle).encode("utf-8")
+                )
+            finally:
+                pdfium_c.FPDFPage_CloseAnnot(annot)
+        return hasher.hexdigest()
+
+    def get_page_triage(self, idx: int) -> str | None:
+        stats = self.page_object_stats.get(idx)
+        if stats is None:
+            return None
+
+        # Whether the page text passed check_page, check_line_spans and detect_bad_ocr
+        self.wait_for_page(idx)
+        has_good_lines = bool(self.page_lines.get(idx))
+        large_image = stats["image_coverage"] >= self.image_threshold
+
+        if stats["text_objects"] == 0:
+            if stats["image_objects"] == 0 and stats["path_objects"] == 0:
+                return "blank"
+            return "scanned" if large_image else "image_only"
+
+        if has_good_lines:
+            return "mixed" if large_image else "digital"
+        return "scanned" if large_image else "mixed"
+
     def detect_bad_ocr(self, text):
         if len(text) == 0:
             # Assume OCR failed if we have no text
@@ -400,24 +699,22 @@ class PdfProvider(BaseProvider):
 
         return False
 
-    @staticmethod
-    def _render_image(
-        pdf: pdfium.PdfDocument, idx: int, dpi: int, flatten_page: bool
-    ) -> Image.Image:
-        page = pdf[idx]
-        if flatten_page:
-            flatten_pdf_page(page)
-            page = pdf[idx]
-        image = page.render(scale=dpi / 72, draw_annots=False).to_pil()
-        image = image.convert("RGB")
-        return image
-
     def get_images(self, idxs: List[int], dpi: int) -> List[Image.Image]:
-        with self.get_doc() as doc:
-            images = [
-                self._render_image(doc, idx, dpi, self.flatten_pdf) for idx in idxs
-            ]
-        return images
+        return self.get_multires_images(idxs, [dpi])[dpi]
+
+    def get_multires_images(
+        self, idxs: List[int], dpis: List[int]
+    ) -> Dict[int, List[Image.Image]]:
+        # Each page is rendered once at the highest DPI, lower resolutions are downsampled
+        return self.rasterizer.render(idxs, dpis)
+
+    def get_image_size(self, idx: int, dpi: int) -> Tuple[int, int] | None:
+        return self.rasterizer.image_size(idx, dpi)
+
+    def get_region_image(
+        self, idx: int, bbox: Sequence[int], dpi: int
+    ) -> Image.Image | None:
+        return self.rasterizer.render_region(idx, bbox, dpi)
 
     def get_page_bbox(self, idx: int) -> PolygonBox | None:
         bbox = self.page_bboxes.get(idx)
@@ -425,10 +722,27 @@ class PdfProvider(BaseProvider):
             return PolygonBox.from_bbox(bbox)
 
     def get_page_lines(self, idx: int) -> List[ProviderOutput]:
-        return self.page_lines[idx]
+        self.wait_for_page(idx)
+        # Pages without usable text have no lines, and are OCRed
+        return self.page_lines.get(idx, [])
 
     def get_page_refs(self, idx: int) -> List[Reference]:
-        return self.page_refs[idx]
+        self.wait_for_page(idx)
+        return self.page_refs.get(idx, [])
+
+    def get_page_chars(self, idx: int) -> ProviderPageChars | None:
+        self.wait_for_page(idx)
+        return self.page_chars.get(idx)
+
+    @staticmethod
+    def get_pdfium_page_bbox(page) -> List[float]:
+        # Matches how pdftext sizes pages, including rotation
+        bbox = page.get_bbox()
+        width = math.ceil(abs(bbox[2] - bbox[0]))
+        height = math.ceil(abs(bbox[1] - bbox[3]))
+        if page.get_rotation() in [90, 270]:
+            width, height = height, width
+        return [0, 0, width, height]
 
     @staticmethod
     def _get_fontname(font) -> str:
@@ -450,3 +764,76 @@ class PdfProvider(BaseProvider):
             pass
 
         return font_name
+
+    @staticmethod
+    def _get_object_style(page_obj) -> str:
+        matrix = pdfium_c.FS_MATRIX()
+        pdfium_c.FPDFPageObj_GetMatrix(page_obj, ctypes.byref(matrix))
+        style = [round(v, 4) for v in (matrix.a, matrix.b, matrix.c, matrix.d, matrix.e, matrix.f)]
+        for get_color in (pdfium_c.FPDFPageObj_GetFillColor, pdfium_c.FPDFPageObj_GetStrokeColor):
+            rgba = [ctypes.c_uint() for _ in range(4)]
+            if get_color(page_obj, *[ctypes.byref(c) for c in rgba]):
+                style.extend(c.value for c in rgba)
+        return repr(style)
+
+    @staticmethod
+    def _get_path_segments(path_obj) -> str:
+        segments = []
+        x, y = ctypes.c_float(), ctypes.c_float()
+        for i in range(pdfium_c.FPDFPath_CountSegments(path_obj)):
+            segment = pdfium_c.FPDFPath_GetPathSegment(path_obj, i)
+            pdfium_c.FPDFPathSegment_GetPoint(segment, ctypes.byref(x), ctypes.byref(y))
+            segments.append(
+                (
+                    pdfium_c.FPDFPathSegment_GetType(segment),
+                    bool(pdfium_c.FPDFPathSegment_GetClose(segment)),
+                    round(x.value, 2),
+                    round(y.value, 2),
+                )
+            )
+        return repr(segments)
+
+    @staticmethod
+    def _get_wide_string(get_value) -> str:
+        # pdfium returns the length in bytes of a UTF-16LE string, including the terminator
+        length = get_value(None, 0)
+        if length <= 2:
+            return ""
+        buffer = ctypes.create_string_buffer(length)
+        get_value(ctypes.cast(buffer, ctypes.POINTER(pdfium_c.FPDF_WCHAR)), length)
+        return buffer.raw[: length - 2].decode("utf-16-le", errors="ignore")
+
+    @classmethod
+    def _get_annotation_values(cls, annot, form_handle=None) -> str:
+        rect = pdfium_c.FS_RECTF()
+        pdfium_c.FPDFAnnot_GetRect(annot, ctypes.byref(rect))
+        values = [
+            pdfium_c.FPDFAnnot_GetSubtype(annot),
+            [round(v, 2) for v in (rect.left, rect.bottom, rect.right, rect.top)],
+        ]
+        for key in (b"Contents", b"V", b"AS"):
+            values.append(
+                cls._get_wide_string(
+                    lambda buf, n: pdfium_c.FPDFAnnot_GetStringValue(annot, key, buf, n)
+                )
+            )
+        if form_handle is not None:
+            # Widgets inherit their value from the parent field, which the /V key above misses
+            values.append(
+                cls._get_wide_string(
+                    lambda buf, n: pdfium_c.FPDFAnnot_GetFormFieldValue(
+                        form_handle, annot, buf, n
+                    )
+                )
+            )
+            values.append(pdfium_c.FPDFAnnot_IsChecked(form_handle, annot))
+        return repr(values)
+
+    @staticmethod
+    def _get_raw_image_data(image_obj) -> bytes:
+        length = pdfium_c.FPDFImageObj_GetImageDataRaw(image_obj, None, 0)
+        if length <= 0:
+            return b""
+        buffer = ctypes.create_string_buffer(length)
+        pdfium_c.FPDFImageObj_GetImageDataRaw(image_obj, buffer, length)
+        return buffer.raw
@@ -1,10 +1,7 @@
 import base64
-import os
-import tempfile
-import traceback
 
 from marker.logger import get_logger
-from marker.providers.pdf import PdfProvider
+from marker.providers.html_pdf import RenderedPdfProvider, render_pdf
 
 logger = get_logger()
 
@@ -39,30 +36,15 @@ img {
 """
 
 
-class PowerPointProvider(PdfProvider):
+class PowerPointProvider(RenderedPdfProvider):
     include_slide_number: bool = False
 
-    def __init__(self, filepath: str, config=None):
-        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        self.temp_pdf_path = temp_pdf.name
-        temp_pdf.close()
+    @classmethod
+    def conversion_error(cls, filepath: str, error: Exception) -> Exception:
+        return ValueError(f"Error converting PPTX to PDF: {error}")
 
-        # Convert PPTX to PDF
-        try:
-            self.convert_pptx_to_pdf(filepath)
-        except Exception as e:
-            print(traceback.format_exc())
-            raise ValueError(f"Error converting PPTX to PDF: {e}")
-
-        # Initalize the PDF provider with the temp pdf path
-        super().__init__(self.temp_pdf_path, config)
-
-    def __del__(self):
-        if os.path.exists(self.temp_pdf_path):
-            os.remove(self.temp_pdf_path)
-
-    def convert_pptx_to_pdf(self, filepath):
-        from weasyprint import CSS, HTML
+    @classmethod
+    def convert_to_pdf(cls, filepath: str, output_path: str):
         from pptx import Presentation
         from pptx.enum.shapes import MSO_SHAPE_TYPE
 
@@ -72,44 +54,43 @@ class PowerPointProvider(PdfProvider):
 
         for slide_index, slide in enumerate(pptx.slides):
             html_parts.append("<section>")
-            if self.include_slide_number:
+            if cls.include_slide_number:
                 html_parts.append(f"<h2>Slide {slide_index + 1}</h2>")
 
             # Process shapes in the slide
             for shape in slide.shapes:
                 # If shape is a group shape, we recursively handle all grouped shapes
                 if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
-                    html_parts.append(self._handle_group(shape))
+                    html_parts.append(cls._handle_group(shape))
                     continue
 
                 # If shape is a table
                 if shape.has_table:
-                    html_parts.append(self._handle_table(shape))
+                    html_parts.append(cls._handle_table(shape))
                     continue
 
                 # If shape is a picture
                 if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                    html_parts.append(self._handle_image(shape))
+                    html_parts.append(cls._handle_image(shape))
                     continue
 
                 # If shape has text
                 if hasattr(shape, "text") and shape.text is not None:
                     if shape.has_text_frame:
                         # Distinguish placeholders (title, subtitle, etc.)
-                        html_parts.append(self._handle_text(shape))
+                        html_parts.append(cls._handle_text(shape))
                     else:
-                        html_parts.append(f"<p>{self._escape_html(shape.text)}</p>")
+                        html_parts.append(f"<p>{cls._escape_html(shape.text)}</p>")
 
             html_parts.append("</section>")
 
         html = "\n".join(html_parts)
 
         # We convert the HTML into a PDF
-        HTML(string=html).write_pdf(
-            self.temp_pdf_path, stylesheets=[CSS(string=css), self.get_font_css()]
-        )
+        render_pdf(output_path, string=html, css=css)
 
-    def _handle_group(self, group_shape) -> str:
+    @classmethod
+    def _handle_group(cls, group_shape) -> str:
         """
         Recursively handle shapes in a group. Returns HTML string for the entire group.
         """
@@ -118,26 +99,27 @@ class PowerPointProvider(PdfProvider):
         group_parts = []
         for shape in group_shape.shapes:
             if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
-                group_parts.append(self._handle_group(shape))
+                group_parts.append(cls._handle_group(shape))
                 continue
 
             if shape.has_table:
-                group_parts.append(self._handle_table(shape))
+                group_parts.append(cls._handle_table(shape))
                 continue
 
             if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                group_parts.append(self._handle_image(shape))
+                group_parts.append(cls._handle_image(shape))
                 continue
 
             if hasattr(shape, "text"):
                 if shape.has_text_frame:
-                    group_parts.append(self._handle_text(shape))
+                    group_parts.append(cls._handle_text(shape))
                 else:
-                    group_parts.append(f"<p>{self._escape_html(shape.text)}</p>")
+                    group_parts.append(f"<p>{cls._escape_html(shape.text)}</p>")
 
         return "".join(group_parts)
 
-    def _handle_text(self, shape) -> str:
+    @classmethod
+    def _handle_text(cls, shape) -> str:
         """
         Processes shape text, including bullet/numbered list detection and placeholders
         (title, subtitle, etc.). Returns HTML for the text block(s).
@@ -186,7 +168,7 @@ class PowerPointProvider(PdfProvider):
                 # Build the bullet (li) text from all runs in the paragraph
                 p_text = "".join(run.text for run in paragraph.runs)
                 if p_text:
-                    html_parts.append(f"<li>{self._escape_html(p_text)}</li>")
+                    html_parts.append(f"<li>{cls._escape_html(p_text)}</li>")
 
             else:
                 # If we were in a list, we need to close it
@@ -201,7 +183,7 @@ class PowerPointProvider(PdfProvider):
                 if p_text:
                     # If we know it's a slide title, we can use <h3> or so
                     html_parts.append(
-                        f"<{label_html_tag}>{self._escape_html(p_text)}</{label_html_tag}>"
+                        f"<{label_html_tag}>{cls._escape_html(p_text)}</{label_html_tag}>"
                     )
 
         # If the text frame ended and we still have an open list, close it
@@ -210,7 +192,8 @@ class PowerPointProvider(PdfProvider):
 
         return "".join(html_parts)
 
-    def _handle_image(self, shape) -> str:
+    @classmethod
+    def _handle_image(cls, shape) -> str:
         """
         Embeds the image as a base64 <img> in HTML.
         """
@@ -224,7 +207,8 @@ class PowerPointProvider(PdfProvider):
             logger.warning(f"Warning: image cannot be loaded by Pillow: {e}")
             return ""
 
-    def _handle_table(self, shape) -> str:
+    @classmethod
+    def _handle_table(cls, shape) -> str:
         """
         Renders a shape's table as an HTML <table>.
         """
@@ -234,14 +218,15 @@ class PowerPointProvider(PdfProvider):
         for row in shape.table.rows:
             row_html = ["<tr>"]
             for cell in row.cells:
-                row_html.append(f"<td>{self._escape_html(cell.text)}</td>")
+                row_html.append(f"<td>{cls._escape_html(cell.text)}</td>")
             row_html.append("</tr>")
             table_html.append("".join(row_html))
 
         table_html.append("</table>")
         return "".join(table_html)
 
-    def _escape_html(self, text: str) -> str:
+    @classmethod
+    def _escape_html(cls, text: str) -> str:
         """
         Minimal escaping for HTML special characters.
         """
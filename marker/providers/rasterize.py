@@ -0,0 +1,220 @@
+import atexit
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Sequence, Tuple
+
+import pypdfium2 as pdfium
+from pdftext.pdf.utils import flatten as flatten_pdf_page
+from PIL import Image
+
+from marker.providers.source import (
+    DocumentSource,
+    is_in_memory,
+    open_source,
+    source_bytes,
+)
+
+# (shared memory name, mode, size) for each rendered resolution
+SharedImage = Tuple[str, str, Tuple[int, int]]
+
+# Per-worker pdfium handle, opened once by the pool initializer
+_worker_doc: pdfium.PdfDocument | None = None
+_worker_flatten: bool = True
+
+# pdfium can't be called from two threads at once, even on different documents, so every call in this
+# process is made while holding this lock.  Worker processes have their own copy of pdfium.
+pdfium_lock = threading.RLock()
+
+
+def open_pdf(source: DocumentSource, flatten_pdf: bool) -> pdfium.PdfDocument:
+    doc = pdfium.PdfDocument(open_source(source))
+    # Must be called on the parent pdf, before retrieving pages to render correctly
+    if flatten_pdf:
+        doc.init_forms()
+    return doc
+
+
+def render_multires(
+    doc: pdfium.PdfDocument, idx: int, dpis: List[int], flatten_page: bool
+) -> Dict[int, Image.Image]:
+    """
+    Render a page once at the highest requested DPI, and derive the lower resolutions by downsampling.
+    """
+    page = doc[idx]
+    if flatten_page:
+        flatten_pdf_page(page)
+        page = doc[idx]
+
+    max_dpi = max(dpis)
+    image = page.render(scale=max_dpi / 72, draw_annots=False).to_pil()
+    image = image.convert("RGB")
+
+    images = {}
+    for dpi in dpis:
+        if dpi == max_dpi:
+            images[dpi] = image
+            continue
+        # The same size as rendering directly at this DPI
+        images[dpi] = image.resize(page_image_size(page, dpi), Image.Resampling.LANCZOS)
+    return images
+
+
+def page_image_size(page: pdfium.PdfPage, dpi: int) -> Tuple[int, int]:
+    # The size pdfium renders the whole page at, with the same scale arithmetic
+    width, height = page.get_size()
+    scale = dpi / 72
+    return math.ceil(width * scale), math.ceil(height * scale)
+
+
+def render_region(
+    doc: pdfium.PdfDocument,
+    idx: int,
+    bbox: Sequence[int],
+    dpi: int,
+    flatten_page: bool,
+) -> Image.Image:
+    """
+    Render part of a page, as a bbox in the pixels of the whole page rendered at `dpi`.  The result matches
+    cropping the whole page image, including the black fill past the page edges.
+    """
+    page = doc[idx]
+    if flatten_page:
+        flatten_pdf_page(page)
+        page = doc[idx]
+
+    width, height = page_image_size(page, dpi)
+    x_start, y_start = max(bbox[0], 0), max(bbox[1], 0)
+    x_end, y_end = min(bbox[2], width), min(bbox[3], height)
+    region = Image.new("RGB", (bbox[2] - bbox[0], bbox[3] - bbox[1]))
+    if x_end <= x_start or y_end <= y_start:
+        return region
+
+    # pdfium crops whole pixels off each side, (left, bottom, right, top), rounding up
+    scale = dpi / 72
+    crop = [
+        max(pixels - 0.01, 0) / scale
+        for pixels in (x_start, height - y_end, width - x_end, y_start)
+    ]
+    image = page.render(scale=scale, crop=crop, draw_annots=False).to_pil()
+    region.paste(image.convert("RGB"), (x_start - bbox[0], y_start - bbox[1]))
+    return region
+
+
+def _init_worker(source: str | bytes, flatten_pdf: bool):
+    global _worker_doc, _worker_flatten
+    _worker_doc = open_pdf(source, flatten_pdf)
+    _worker_flatten = flatten_pdf
+    atexit.register(_worker_doc.close)
+
+
+def _render_worker(idx: int, dpis: List[int]) -> Dict[int, SharedImage]:
+    images = render_multires(_worker_doc, idx, dpis, _worker_flatten)
+
+    # Hand the pixels back through shared memory instead of pickling them through the pipe
+    shared = {}
+    for dpi, image in images.items():
+        data = image.tobytes()
+        shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        shm.buf[: len(data)] = data
+        shared[dpi] = (shm.name, image.mode, image.size)
+        shm.close()
+    return shared
+
+
+def _load_shared_image(shared_image: SharedImage) -> Image.Image:
+    name, mode, size = shared_image
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        nbytes = size[0] * size[1] * len(Image.getmodebands(mode))
+        image = Image.frombytes(mode, size, bytes(shm.buf[:nbytes]))
+    finally:
+        shm.close()
+        shm.unlink()
+    return image
+
+
+class PageRasterizer:
+    """
+    Renders pages at one or more resolutions, spreading pages across a process pool when workers > 1.
+    Each worker keeps its own pdfium handle open for the lifetime of the pool.
+    """
+
+    def __init__(
+        self, filepath: DocumentSource, workers: int = 1, flatten_pdf: bool = True
+    ):
+        self.filepath = filepath
+        self.workers = workers
+        self.flatten_pdf = flatten_pdf
+        self.pool: ProcessPoolExecutor | None = None
+        self.page_sizes: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            # In-memory documents are sent to each worker once, when the pool starts
+            source = self.filepath
+            if is_in_memory(source):
+                source = source_bytes(source)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(source, self.flatten_pdf),
+            )
+        return self.pool
+
+    def render(self, idxs: List[int], dpis: List[int]) -> Dict[int, List[Image.Image]]:
+        dpis = sorted(set(dpis))
+        if self.workers <= 1 or len(idxs) <= 1:
+            page_images = self.render_serial(idxs, dpis)
+        else:
+            pool = self.get_pool()
+            futures = [pool.submit(_render_worker, idx, dpis) for idx in idxs]
+            page_images = []
+            for future in futures:
+                shared = future.result()
+                page_images.append(
+                    {dpi: _load_shared_image(shared[dpi]) for dpi in dpis}
+                )
+
+        return {dpi: [images[dpi] for images in page_images] for dpi in dpis}
+
+    def render_serial(
+        self, idxs: List[int], dpis: List[int]
+    ) -> List[Dict[int, Image.Image]]:
+        with pdfium_lock:
+            doc = open_pdf(self.filepath, self.flatten_pdf)
+            try:
+                return [
+                    render_multires(doc, idx, dpis, self.flatten_pdf) for idx in idxs
+                ]
+            finally:
+                doc.close()
+
+    def image_size(self, idx: int, dpi: int) -> Tuple[int, int]:
+        if (idx, dpi) not in self.page_sizes:
+            with pdfium_lock:
+                doc = open_pdf(self.filepath, False)
+                try:
+                    self.page_sizes[(idx, dpi)] = page_image_size(doc[idx], dpi)
+                finally:
+                    doc.close()
+        return self.page_sizes[(idx, dpi)]
+
+    def render_region(
+        self, idx: int, bbox: Sequence[int], dpi: int
+    ) -> Image.Image:
+        # Regions are small, so they are rendered in this process instead of the pool
+        with pdfium_lock:
+            doc = open_pdf(self.filepath, self.flatten_pdf)
+            try:
+                return render_region(doc, idx, bbox, dpi, self.flatten_pdf)
+            finally:
+                doc.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
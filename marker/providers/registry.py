@@ -9,6 +9,11 @@ from marker.providers.html import HTMLProvider
 from marker.providers.image import ImageProvider
 from marker.providers.pdf import PdfProvider
 from marker.providers.powerpoint import PowerPointProvider
+from marker.providers.source import (
+    DocumentSource,
+    is_in_memory,
+    source_header,
+)
 from marker.providers.spreadsheet import SpreadSheetProvider
 
 DOCTYPE_MATCHERS = {
@@ -56,28 +61,45 @@ def provider_from_ext(filepath: str):
     return PdfProvider
 
 
-def provider_from_filepath(filepath: str):
-    if filetype.image_match(filepath) is not None:
+# Providers that can read a document straight from memory, without a temporary file
+IN_MEMORY_PROVIDERS = (PdfProvider, ImageProvider)
+
+
+def supports_in_memory(provider_cls) -> bool:
+    # Subclasses of PdfProvider convert their input to a PDF file first, so only exact matches count
+    return provider_cls in IN_MEMORY_PROVIDERS
+
+
+def provider_from_filepath(filepath: DocumentSource):
+    # Only the file signature is needed to match types, so in-memory documents aren't copied
+    header = source_header(filepath)
+    if filetype.image_match(header) is not None:
         return ImageProvider
-    if file_match(filepath, load_matchers("pdf")) is not None:
+    if file_match(header, load_matchers("pdf")) is not None:
         return PdfProvider
-    if file_match(filepath, load_matchers("epub")) is not None:
+    if file_match(header, load_matchers("epub")) is not None:
         return EpubProvider
-    if file_match(filepath, load_matchers("doc")) is not None:
+    if file_match(header, load_matchers("doc")) is not None:
         return DocumentProvider
-    if file_match(filepath, load_matchers("xls")) is not None:
+    if file_match(header, load_matchers("xls")) is not None:
         return SpreadSheetProvider
-    if file_match(filepath, load_matchers("ppt")) is not None:
+    if file_match(header, load_matchers("ppt")) is not None:
         return PowerPointProvider
 
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            soup = BeautifulSoup(f.read(), "html.parser")
-            # Check if there are any HTML tags
-            if bool(soup.find()):
-                return HTMLProvider
+        if is_in_memory(filepath):
+            text = memoryview(filepath).tobytes().decode("utf-8")
+        else:
+            with open(filepath, "r", encoding="utf-8") as f:
+                text = f.read()
+        soup = BeautifulSoup(text, "html.parser")
+        # Check if there are any HTML tags
+        if bool(soup.find()):
+            return HTMLProvider
     except Exception:
         pass
 
     # Fallback if we incorrectly detect the file type
+    if is_in_memory(filepath):
+        return PdfProvider
     return provider_from_ext(filepath)
@@ -0,0 +1,82 @@
+import io
+import mmap
+from typing import Union
+
+# Documents can be passed as a path, or as an in-memory buffer
+InMemorySource = Union[bytes, bytearray, memoryview, mmap.mmap]
+DocumentSource = Union[str, InMemorySource]
+
+# Used in place of a filepath for documents that were never written to disk
+IN_MEMORY_FILEPATH = "in_memory.pdf"
+
+# Enough bytes to detect the file type from its signature
+SIGNATURE_BYTES = 8192
+
+
+class BufferReader(io.RawIOBase):
+    """
+    A read-only, seekable file over an in-memory buffer, so pdfium and PIL can read it without copying
+    the whole buffer.  Each reader keeps its own position, so one buffer can be opened many times.
+    """
+
+    def __init__(self, buffer: InMemorySource):
+        super().__init__()
+        self.view = memoryview(buffer).cast("B")
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        size = max(0, min(len(b), len(self.view) - self.position))
+        b[:size] = self.view[self.position : self.position + size]
+        self.position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = len(self.view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+
+def is_in_memory(source) -> bool:
+    return isinstance(source, (bytes, bytearray, memoryview, mmap.mmap))
+
+
+def open_source(source: DocumentSource):
+    """
+    Return an input pdfium or PIL can open.  Paths and bytes are passed through, other buffers are wrapped.
+    """
+    if isinstance(source, (str, bytes)):
+        return source
+    return BufferReader(source)
+
+
+def source_bytes(source: InMemorySource) -> bytes:
+    # Needed to hand a buffer to another process.  Bytes are passed through without a copy.
+    if isinstance(source, bytes):
+        return source
+    return memoryview(source).tobytes()
+
+
+def source_header(source: DocumentSource) -> bytes:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read(SIGNATURE_BYTES)
+    return memoryview(source)[:SIGNATURE_BYTES].tobytes()
+
+
+def source_filepath(source: DocumentSource) -> str:
+    return source if isinstance(source, str) else IN_MEMORY_FILEPATH
@@ -1,7 +1,4 @@
-import os
-import tempfile
-
-from marker.providers.pdf import PdfProvider
+from marker.providers.html_pdf import RenderedPdfProvider, render_pdf
 
 css = '''
 @page {
@@ -28,27 +25,9 @@ td {
 '''
 
 
-class SpreadSheetProvider(PdfProvider):
-    def __init__(self, filepath: str, config=None):
-        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=f".pdf")
-        self.temp_pdf_path = temp_pdf.name
-        temp_pdf.close()
-
-        # Convert XLSX to PDF
-        try:
-            self.convert_xlsx_to_pdf(filepath)
-        except Exception as e:
-            raise RuntimeError(f"Failed to convert {filepath} to PDF: {e}")
-
-        # Initialize the PDF provider with the temp pdf path
-        super().__init__(self.temp_pdf_path, config)
-
-    def __del__(self):
-        if os.path.exists(self.temp_pdf_path):
-            os.remove(self.temp_pdf_path)
-
-    def convert_xlsx_to_pdf(self, filepath: str):
-        from weasyprint import CSS, HTML
+class SpreadSheetProvider(RenderedPdfProvider):
+    @classmethod
+    def convert_to_pdf(cls, filepath: str, output_path: str):
         from openpyxl import load_workbook
 
         html = ""
@@ -56,15 +35,12 @@ class SpreadSheetProvider(PdfProvider):
         if workbook is not None:
             for sheet_name in workbook.sheetnames:
                 sheet = workbook[sheet_name]
-                html += f'<div><h1>{sheet_name}</h1>' + self._excel_to_html_table(sheet) + '</div>'
+                html += f'<div><h1>{sheet_name}</h1>' + cls._excel_to_html_table(sheet) + '</div>'
         else:
             raise ValueError("Invalid XLSX file")
 
         # We convert the HTML into a PDF
-        HTML(string=html).write_pdf(
-            self.temp_pdf_path,
-            stylesheets=[CSS(string=css), self.get_font_css()]
-        )
+        render_pdf(output_path, string=html, css=css)
 
     @staticmethod
     def _get_merged_cell_ranges(sheet):
@@ -78,8 +54,9 @@ class SpreadSheetProvider(PdfProvider):
             }
         return merged_info
 
-    def _excel_to_html_table(self, sheet):
-        merged_cells = self._get_merged_cell_ranges(sheet)
+    @classmethod
+    def _excel_to_html_table(cls, sheet):
+        merged_cells = cls._get_merged_cell_ranges(sheet)
 
         html = f'<table>'
 
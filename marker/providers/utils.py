@@ -1,3 +1,7 @@
+import string
+import unicodedata
+
+
 def alphanum_ratio(text):
     text = text.replace(" ", "")
     text = text.replace("\n", "")
@@ -8,3 +12,73 @@ def alphanum_ratio(text):
 
     ratio = alphanumeric_count / len(text)
     return ratio
+
+
+# Frequent function words in common Latin-script languages, used as a small dictionary for text quality
+COMMON_WORDS = frozenset(
+    """
+    a an and are as at be but by for from had has have he her his i in is it its not of on or our she that the
+    their there they this to was we were which will with you
+    aber als am auch auf aus bei das dem den der des die ein eine einer es für ist mit nicht sich sie und von
+    war werden wie zu zum zur
+    au aux avec ce ces dans de du elle en est et il ils la le les leur mais ne par pas plus pour qui que se sont
+    sur un une
+    al como con del el era las lo los para pero por se su sus una y
+    alla che di gli il non per più sono
+    ao da das do dos em na no nos os ou uma
+    dat een het ik niet op te van voor zijn
+    """.split()
+)
+LATIN_VOWELS = set("aeiouyàáâãäåæèéêëìíîïòóôõöøùúûüýÿœ")
+
+
+def word_stats(text: str) -> dict:
+    """
+    Count words in text by how plausible they look.  Words in scripts other than Latin can't be judged this way,
+    and are counted as unknown.
+    """
+    stats = {"words": 0, "plausible": 0, "unknown": 0, "common": 0}
+    for token in text.split():
+        word = token.strip(string.punctuation + "“”‘’«»…–—")
+        if not any(c.isalnum() for c in word):
+            continue
+
+        stats["words"] += 1
+        if any(c.isalpha() and not is_latin(c) for c in word):
+            stats["unknown"] += 1
+            continue
+
+        if word.lower() in COMMON_WORDS:
+            stats["common"] += 1
+        if is_plausible_word(word):
+            stats["plausible"] += 1
+    return stats
+
+
+def is_latin(char: str) -> bool:
+    return char.isascii() or unicodedata.name(char, "").startswith("LATIN")
+
+
+def is_plausible_word(word: str) -> bool:
+    if any(c == "�" or unicodedata.category(c) in ("Cc", "Co", "Cs") for c in word):
+        return False
+
+    letters = [c for c in word if c.isalpha()]
+    if not letters:
+        # Numbers, dates and amounts
+        return True
+    if len(word) > 30:
+        # Usually words run together from missing spaces
+        return False
+    if len(letters) == 1 and len(word) == 1:
+        return word in "aAiIyYoOeEàáé"
+
+    # Case flipping more than once inside a word, like "tHiS"
+    flips = sum(1 for a, b in zip(letters, letters[1:]) if a.islower() and b.isupper())
+    if flips > 1:
+        return False
+
+    # Longer lowercase words have vowels, unlike most acronyms and garbled text
+    if len(letters) >= 4 and not word.isupper():
+        return any(c.lower() in LATIN_VOWELS for c in letters)
+    return True
@@ -46,6 +46,19 @@ class BaseRenderer:
         # Children are in reading order
         raise NotImplementedError
 
+    def page_image_uses(self, document: Document):
+        """
+        The (page id, highres) page images the renderer may read, to extract images.
+        """
+        if not self.extract_images:
+            return set()
+        highres = self.image_extraction_mode == "highres"
+        return {
+            (page.page_id, highres)
+            for page in document.pages
+            if page.has_block_types(self.image_blocks)
+        }
+
     def extract_image(self, document: Document, image_id, to_base64=False):
         image_block = document.get_block(image_id)
         cropped = image_block.get_image(
@@ -108,6 +121,7 @@ class BaseRenderer:
                 {
                     "page_id": page.page_id,
                     "text_extraction_method": page.text_extraction_method,
+                    "page_plan": page.page_plan,
                     "block_counts": block_counts,
                     "block_metadata": block_metadata.model_dump(),
                 }
@@ -12,6 +12,12 @@ if TYPE_CHECKING:
     from marker.schema.document import Document
     from marker.schema.groups.page import PageGroup
 
+# Lines only hold spans, and spans only hold characters, so searches for other block types skip their contents
+TEXT_CONTENT_TYPES = {
+    BlockTypes.Line: frozenset((BlockTypes.Span, BlockTypes.Char)),
+    BlockTypes.Span: frozenset((BlockTypes.Char,)),
+}
+
 
 class BlockMetadata(BaseModel):
     llm_request_count: int = 0
@@ -86,7 +92,7 @@ class Block(BaseModel):
     block_type: Optional[BlockTypes] = None
     block_id: Optional[int] = None
     page_id: Optional[int] = None
-    text_extraction_method: Optional[Literal["pdftext", "surya", "gemini"]] = None
+    text_extraction_method: Optional[Literal["pdftext", "surya", "gemini", "hybrid"]] = None
     structure: List[BlockId] | None = (
         None  # The top-level page structure, which is the block ids in order
     )
@@ -101,6 +107,7 @@ class Block(BaseModel):
     highres_image: Image.Image | None = None
     removed: bool = False  # Has block been replaced by new block?
     _metadata: Optional[dict] = None
+    _structure_positions: Optional[Dict[BlockId, int]] = None  # Rebuilt when the structure changes
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -135,18 +142,41 @@ class Block(BaseModel):
         image = self.highres_image if highres else self.lowres_image
         if image is None:
             page = document.get_page(self.page_id)
-            page_image = page.get_image(highres=highres, remove_blocks=remove_blocks)
 
             # Scale to the image size
             bbox = self.polygon.rescale(
-                (page.polygon.width, page.polygon.height), page_image.size
+                (page.polygon.width, page.polygon.height),
+                page.get_image_size(highres=highres),
             )
             if expansion:
                 bbox = bbox.expand(*expansion)
             bbox = bbox.bbox
-            image = page_image.crop(bbox)
+            image = page.get_image_region(
+                bbox, highres=highres, remove_blocks=remove_blocks
+            )
         return image
 
+    def structure_position(self, block_id: BlockId) -> int:
+        """
+        The position of a block id in the structure, like `structure.index`, without scanning the structure.
+        """
+        # The structure is edited directly in many places, so cached positions are checked before they are used
+        positions = self._structure_positions
+        position = positions.get(block_id) if positions is not None else None
+        if (
+            position is None
+            or position >= len(self.structure)
+            or self.structure[position] != block_id
+        ):
+            positions = {}
+            for i, item in enumerate(self.structure):
+                positions.setdefault(item, i)
+            self._structure_positions = positions
+            if block_id not in positions:
+                raise ValueError(f"{block_id} is not in the structure of {self.id}")
+            position = positions[block_id]
+        return position
+
     def structure_blocks(self, document_page: Document | PageGroup) -> List[Block]:
         if self.structure is None:
             return []
@@ -161,7 +191,7 @@ class Block(BaseModel):
         if ignored_block_types is None:
             ignored_block_types = []
 
-        structure_idx = self.structure.index(block.id)
+        structure_idx = self.structure_position(block.id)
         if structure_idx == 0:
             return None
 
@@ -180,7 +210,7 @@ class Block(BaseModel):
 
         structure_idx = 0
         if block is not None:
-            structure_idx = self.structure.index(block.id) + 1
+            structure_idx = self.structure_position(block.id) + 1
 
         for next_block_id in self.structure[structure_idx:]:
             if next_block_id.block_type not in ignored_block_types:
@@ -265,10 +295,16 @@ class Block(BaseModel):
             block = document.get_block(block_id)
             if block.removed:
                 continue
-            if (
-                block_types is None or block.block_type in block_types
-            ) and not block.removed:
+            if block_types is None or block.block_type in block_types:
                 blocks.append(block)
+
+            content_types = TEXT_CONTENT_TYPES.get(block.block_type)
+            if (
+                block_types is not None
+                and content_types is not None
+                and content_types.isdisjoint(block_types)
+            ):
+                continue
             blocks += block.contained_blocks(document, block_types)
         return blocks
 
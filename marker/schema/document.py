@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Sequence, Optional
+from typing import Any, Dict, List, Sequence, Optional
 
 from pydantic import BaseModel
 
@@ -28,6 +28,15 @@ class Document(BaseModel):
     block_type: BlockTypes = BlockTypes.Document
     table_of_contents: List[TocItem] | None = None
     debug_data_path: str | None = None  # Path that debug data was saved to
+    _source: Optional[Any] = None  # The in-memory input, if the document wasn't read from a file
+    _page_positions: Optional[Dict[int, int]] = None  # Page id to position in pages, rebuilt when stale
+
+    def set_source(self, source):
+        self._source = source
+
+    def get_source(self):
+        # Where the original document can be reopened from, a filepath or an in-memory buffer
+        return self._source if self._source is not None else self.filepath
 
     def get_block(self, block_id: BlockId):
         page = self.get_page(block_id.page_id)
@@ -37,10 +46,29 @@ class Document(BaseModel):
         return None
 
     def get_page(self, page_id):
-        for page in self.pages:
-            if page.page_id == page_id:
-                return page
-        return None
+        position = self.page_position(page_id)
+        if position is None:
+            return None
+        return self.pages[position]
+
+    def page_position(self, page_id) -> int | None:
+        # Pages can be added or replaced directly, so the index is checked on every lookup and rebuilt if stale
+        positions = self._page_positions
+        position = positions.get(page_id) if positions is not None else None
+        if (
+            position is None
+            or position >= len(self.pages)
+            or self.pages[position].page_id != page_id
+        ):
+            positions = {}
+            for i, page in enumerate(self.pages):
+                positions.setdefault(page.page_id, i)
+            self._page_positions = positions
+            position = positions.get(page_id)
+        return position
+
+    def has_block_types(self, block_types: Sequence[BlockTypes] | None) -> bool:
+        return any(page.has_block_types(block_types) for page in self.pages)
 
     def get_next_block(
         self, block: Block, ignored_block_types: List[BlockTypes] = None
@@ -56,14 +84,14 @@ class Document(BaseModel):
             return next_block
 
         # If no block found, search subsequent pages
-        for page in self.pages[self.pages.index(page) + 1 :]:
+        for page in self.pages[self.page_position(page.page_id) + 1 :]:
             next_block = page.get_next_block(None, ignored_block_types)
             if next_block:
                 return next_block
         return None
 
     def get_next_page(self, page: PageGroup):
-        page_idx = self.pages.index(page)
+        page_idx = self.page_position(page.page_id)
         if page_idx + 1 < len(self.pages):
             return self.pages[page_idx + 1]
         return None
@@ -79,7 +107,7 @@ class Document(BaseModel):
         return prev_page.get_block(prev_page.structure[-1])
 
     def get_prev_page(self, page: PageGroup):
-        page_idx = self.pages.index(page)
+        page_idx = self.page_position(page.page_id)
         if page_idx > 0:
             return self.pages[page_idx - 1]
         return None
@@ -107,6 +135,8 @@ class Document(BaseModel):
 
     def contained_blocks(self, block_types: Sequence[BlockTypes] = None) -> List[Block]:
         blocks = []
+        if block_types is not None and not self.has_block_types(block_types):
+            return blocks
         for page in self.pages:
             blocks += page.contained_blocks(self, block_types)
         return blocks
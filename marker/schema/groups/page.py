@@ -14,6 +14,8 @@ from marker.schema.blocks.base import BlockMetadata
 from marker.schema.groups.base import Group
 from marker.schema.polygon import PolygonBox
 from marker.util import matrix_intersection_area, sort_text_lines
+from marker.utils.image import InkMap
+from marker.utils.spatial import SpatialIndex
 
 LINE_MAPPING_TYPE = List[Tuple[int, ProviderOutput]]
 
@@ -35,6 +37,33 @@ class PageGroup(Group):
     block_description: str = "A single page in the document."
     refs: List[Reference] | None = None
     ocr_errors_detected: bool = False
+    triage: Optional[str] = None  # Page class from the provider pre-scan, if enabled
+    page_plan: Optional[Dict[str, Any]] = None  # Which models the page was routed through
+    _image_cache: Optional[Any] = None  # Renders page images on demand if they are not set
+    _provider_chars: Optional[Any] = None  # Compact provider character boxes, if retained
+    _ink_map: Optional[Any] = None  # Grayscale lowres image for blank checks, until the line builder is done
+    _type_index: Optional[Dict[BlockTypes, List[int]]] = None  # Positions of the children of each block type
+    _indexed_children: Optional[List[Block]] = None  # The children list the type index was built from
+    _indexed_count: int = 0
+
+    def set_image_cache(self, image_cache):
+        self._image_cache = image_cache
+
+    def set_provider_chars(self, provider_chars):
+        self._provider_chars = provider_chars
+
+    def get_provider_chars(self):
+        return self._provider_chars
+
+    def reassign_page_id(self, page_id: int):
+        """
+        Move the page and all of its blocks to a new page id, e.g. when reusing a cached page.
+        """
+        self.page_id = page_id
+        for block in [self] + (self.children or []):
+            block.page_id = page_id
+            for block_id in block.structure or []:
+                block_id.page_id = page_id
 
     def incr_block_id(self):
         if self.block_id is None:
@@ -56,6 +85,8 @@ class PageGroup(Group):
         **kwargs,
     ):
         image = self.highres_image if highres else self.lowres_image
+        if image is None and self._image_cache is not None:
+            image = self._image_cache.get(self.page_id, highres=highres)
 
         # Check if RGB, convert if needed
         if isinstance(image, Image.Image) and image.mode != "RGB":
@@ -63,20 +94,98 @@ class PageGroup(Group):
 
         # Avoid double OCR for certain elements
         if remove_blocks:
-            image = image.copy()
-            draw = ImageDraw.Draw(image)
-            bad_blocks = [
-                block
-                for block in self.current_children
-                if block.block_type in remove_blocks
-            ]
-            for bad_block in bad_blocks:
-                poly = bad_block.polygon.rescale(self.polygon.size, image.size).polygon
-                poly = [(int(p[0]), int(p[1])) for p in poly]
-                draw.polygon(poly, fill="white")
+            image = self.remove_blocks_from(image, remove_blocks, image.size)
+
+        return image
+
+    def get_image_size(self, highres: bool = False) -> Tuple[int, int]:
+        image = self.highres_image if highres else self.lowres_image
+        if image is None and self._image_cache is not None:
+            return self._image_cache.image_size(self.page_id, highres=highres)
+        return image.size
+
+    def get_image_region(
+        self,
+        bbox: Sequence[float],
+        highres: bool = False,
+        remove_blocks: Sequence[BlockTypes] | None = None,
+    ) -> Image.Image:
+        """
+        Crop a region of the page image, as a bbox in image pixels.  Small highres regions are rendered on their
+        own if the whole highres image isn't rendered yet.
+        """
+        image = self.highres_image if highres else self.lowres_image
+        if image is not None or self._image_cache is None:
+            return self.get_image(highres=highres, remove_blocks=remove_blocks).crop(bbox)
+
+        region = self._image_cache.get_region(self.page_id, bbox, highres=highres)
+        if region.mode != "RGB":
+            region = region.convert("RGB")
+        if remove_blocks:
+            region = self.remove_blocks_from(
+                region,
+                remove_blocks,
+                self.get_image_size(highres=highres),
+                offset=(round(bbox[0]), round(bbox[1])),
+            )
+        return region
 
+    def remove_blocks_from(
+        self,
+        image: Image.Image,
+        remove_blocks: Sequence[BlockTypes],
+        image_size: Tuple[int, int],
+        offset: Tuple[int, int] = (0, 0),
+    ) -> Image.Image:
+        # Blank out blocks on a copy of the page image, or of a region of it starting at `offset`
+        image = image.copy()
+        draw = ImageDraw.Draw(image)
+        bad_blocks = [
+            block
+            for block in self.current_children
+            if block.block_type in remove_blocks
+        ]
+        for bad_block in bad_blocks:
+            poly = bad_block.polygon.rescale(self.polygon.size, image_size).polygon
+            poly = [(int(p[0]) - offset[0], int(p[1]) - offset[1]) for p in poly]
+            draw.polygon(poly, fill="white")
         return image
 
+    def set_image_dpi(self, dpi: int, highres: bool = True):
+        # Only images rendered on demand can change resolution
+        if self._image_cache is not None:
+            self._image_cache.set_dpi(self.page_id, dpi, highres=highres)
+
+    def release_image(self, highres: bool = False):
+        """
+        Drop the page image from the image cache once nothing will read it again.  It is rendered again
+        if it is requested after all.
+        """
+        if not highres:
+            self.clear_ink_map()
+        if self._image_cache is not None:
+            self._image_cache.release([self.page_id], highres)
+
+    def clear_ink_map(self):
+        self._ink_map = None
+
+    def get_ink_map(self) -> InkMap:
+        image = self.get_image(highres=False)
+        if self._ink_map is None or self._ink_map.size != image.size:
+            self._ink_map = InkMap(image)
+        return self._ink_map
+
+    def is_blank_region(self, bbox: Sequence[float]) -> bool:
+        """
+        Whether a region of the page, as a bbox in page coordinates, has no ink in the lowres page image.
+        """
+        ink_map = self.get_ink_map()
+        x_scale = ink_map.size[0] / self.polygon.width
+        y_scale = ink_map.size[1] / self.polygon.height
+        return ink_map.is_blank(
+            [bbox[0] * x_scale, bbox[1] * y_scale, bbox[2] * x_scale, bbox[3] * y_scale]
+        )
+
     @computed_field
     @property
     def current_children(self) -> List[Block]:
@@ -92,7 +201,7 @@ class PageGroup(Group):
 
         structure_idx = 0
         if block is not None:
-            structure_idx = self.structure.index(block.id) + 1
+            structure_idx = self.structure_position(block.id) + 1
 
         # Iterate over blocks following the given block
         for next_block_id in self.structure[structure_idx:]:
@@ -102,7 +211,7 @@ class PageGroup(Group):
         return None  # No valid next block found
 
     def get_prev_block(self, block: Block):
-        block_idx = self.structure.index(block.id)
+        block_idx = self.structure_position(block.id)
         if block_idx > 0:
             return self.get_block(self.structure[block_idx - 1])
         return None
@@ -123,6 +232,60 @@ class PageGroup(Group):
         self.add_child(block)
         return block
 
+    def block_type_positions(self) -> Dict[BlockTypes, List[int]]:
+        # Children are only ever appended, so new ones are indexed as they show up.  A replaced list is indexed again.
+        children = self.children or []
+        if (
+            self._type_index is None
+            or self._indexed_children is not children
+            or self._indexed_count > len(children)
+        ):
+            self._type_index = defaultdict(list)
+            self._indexed_children = children
+            self._indexed_count = 0
+
+        for i in range(self._indexed_count, len(children)):
+            self._type_index[children[i].block_type].append(i)
+        self._indexed_count = len(children)
+        return self._type_index
+
+    def has_block_types(self, block_types: Sequence[BlockTypes] | None) -> bool:
+        """
+        Whether any block on the page that isn't removed has one of the block types.
+        """
+        if block_types is None:
+            return bool(self.children)
+
+        positions = self.block_type_positions()
+        return any(
+            not self.children[i].removed
+            for block_type in block_types
+            for i in positions.get(block_type, ())
+        )
+
+    def contained_blocks(
+        self, document, block_types: Sequence[BlockTypes] = None
+    ) -> List[Block]:
+        if block_types is None or self.structure is None:
+            return super().contained_blocks(document, block_types)
+
+        positions = self.block_type_positions()
+        blocks = [
+            self.children[i]
+            for block_type in dict.fromkeys(block_types)
+            for i in positions.get(block_type, ())
+            if not self.children[i].removed
+        ]
+        if not blocks:
+            return []
+
+        # Blocks directly in the page structure come out in structure order, without walking the page
+        try:
+            return sorted(blocks, key=lambda b: self.structure_position(b.id))
+        except ValueError:
+            # Some are nested in other blocks, or not in the structure at all
+            return super().contained_blocks(document, block_types)
+
     def get_block(self, block_id: BlockId) -> Block | None:
         block: Block = self.children[block_id.block_id]
         assert block.block_id == block_id.block_id
@@ -141,22 +304,18 @@ class PageGroup(Group):
     ):
         max_intersections = {}
 
-        block_bboxes = [block.polygon.bbox for block in blocks]
-        line_bboxes = [
-            provider_output.line.polygon.bbox for provider_output in provider_outputs
-        ]
-
-        intersection_matrix = matrix_intersection_area(line_bboxes, block_bboxes)
-
-        for line_idx, line in enumerate(provider_outputs):
-            intersection_line = intersection_matrix[line_idx]
-            if intersection_line.sum() == 0:
+        block_index = SpatialIndex([block.polygon.bbox for block in blocks])
+        for line_idx, provider_output in enumerate(provider_outputs):
+            block_idxs, areas = block_index.intersections(
+                provider_output.line.polygon.bbox
+            )
+            if len(block_idxs) == 0:
                 continue
 
-            max_intersection = intersection_line.argmax()
+            max_intersection = areas.argmax()
             max_intersections[line_idx] = (
-                intersection_matrix[line_idx, max_intersection],
-                blocks[max_intersection].id,
+                areas[max_intersection],
+                blocks[block_idxs[max_intersection]].id,
             )
         return max_intersections
 
@@ -234,31 +393,33 @@ class PageGroup(Group):
         new_blocks: List[LINE_MAPPING_TYPE],
         block_lines: Dict[BlockId, LINE_MAPPING_TYPE],
     ):
+        structure_ids = [
+            block_id
+            for block_id in self.structure
+            if block_id.block_type not in self.excluded_block_types
+        ]
+        structure_index = SpatialIndex(
+            [self.get_block(block_id).polygon.bbox for block_id in structure_ids]
+        )
         for new_block in new_blocks:
             block = self.add_block(Text, new_block[0][1].line.polygon)
             block.source = "heuristics"
             block_lines[block.id] = new_block
 
-            min_dist_idx = None
-            min_dist = None
-            for existing_block_id in self.structure:
-                existing_block = self.get_block(existing_block_id)
-                if existing_block.block_type in self.excluded_block_types:
-                    continue
-                # We want to assign to blocks closer in y than x
-                dist = block.polygon.center_distance(
-                    existing_block.polygon, x_weight=5, absolute=True
-                )
-                if dist > 0 and min_dist_idx is None or dist < min_dist:
-                    min_dist = dist
-                    min_dist_idx = existing_block.id
-
-            if min_dist_idx is not None:
-                existing_idx = self.structure.index(min_dist_idx)
+            # We want to assign to blocks closer in y than x
+            nearest_idx, _ = structure_index.nearest(
+                block.polygon.center, x_weight=5, absolute=True
+            )
+            if nearest_idx is not None:
+                existing_idx = self.structure_position(structure_ids[nearest_idx])
                 self.structure.insert(existing_idx + 1, block.id)
             else:
                 self.structure.append(block.id)
 
+            # Later missing blocks can be placed after this one
+            structure_index.insert(block.polygon.bbox)
+            structure_ids.append(block.id)
+
     def add_initial_blocks(
         self,
         block_lines: Dict[BlockId, LINE_MAPPING_TYPE],
@@ -280,6 +441,10 @@ class PageGroup(Group):
                 argsort = [line_polygons.index(p) for p in sorted_line_polygons]
                 lines = [lines[i] for i in argsort]
 
+            # Blocks with any lines that still need OCR are OCRed, even on pages that mostly use provider text
+            block_extraction_method = (
+                "surya" if "surya" in line_extraction_methods else text_extraction_method
+            )
             block = self.get_block(block_id)
             for provider_output in lines:
                 line = provider_output.line
@@ -287,16 +452,18 @@ class PageGroup(Group):
                 self.add_full_block(line)
                 block.add_structure(line)
                 block.polygon = block.polygon.merge([line.polygon])
-                block.text_extraction_method = text_extraction_method
+                block.text_extraction_method = block_extraction_method
                 for span_idx, span in enumerate(spans):
                     self.add_full_block(span)
                     line.add_structure(span)
 
                     if not keep_chars:
+                        # Chars are only built from the page character store when requested
+                        span.char_range = None
                         continue
 
-                    # Provider doesn't have chars
-                    if len(provider_output.chars) == 0:
+                    # Provider doesn't have chars, or they are built lazily from the character store
+                    if len(provider_output.chars) == 0 or not provider_output.chars[span_idx]:
                         continue
 
                     # Loop through characters associated with the span
@@ -305,6 +472,42 @@ class PageGroup(Group):
                         self.add_full_block(char)
                         span.add_structure(char)
 
+    def get_span_chars(self, span: Block) -> List[Block]:
+        """
+        Return the chars for a span, building them from the page character store on first access.
+        """
+        if span.structure:
+            return [
+                self.get_block(block_id)
+                for block_id in span.structure
+                if block_id.block_type == BlockTypes.Char
+            ]
+
+        char_range = getattr(span, "char_range", None)
+        if char_range is None or self._provider_chars is None:
+            return []
+
+        from marker.schema.registry import get_block_class
+
+        CharClass = get_block_class(BlockTypes.Char)
+        page_chars = self._provider_chars
+        chars = []
+        for i in range(*char_range):
+            char = CharClass(
+                text=page_chars.chars[i],
+                polygon=PolygonBox.from_bbox(
+                    page_chars.bboxes[i].tolist(), ensure_nonzero_area=True
+                ),
+                idx=int(page_chars.idxs[i]),
+                page_id=self.page_id,
+            )
+            self.add_full_block(char)
+            span.add_structure(char)
+            chars.append(char)
+
+        span.char_range = None
+        return chars
+
     def merge_blocks(
         self,
         provider_outputs: List[ProviderOutput],
@@ -332,20 +535,20 @@ class PageGroup(Group):
                 assigned_line_idxs.add(line_idx)
 
         # If no intersection, assign by distance
+        block_index = SpatialIndex([block.polygon.bbox for block in valid_blocks])
         for line_idx in set(provider_line_idxs).difference(assigned_line_idxs):
-            min_dist = None
-            min_dist_idx = None
             provider_output: ProviderOutput = provider_outputs[line_idx]
-            line = provider_output.line
-            for block in valid_blocks:
-                # We want to assign to blocks closer in y than x
-                dist = line.polygon.center_distance(block.polygon, x_weight=5)
-                if min_dist_idx is None or dist < min_dist:
-                    min_dist = dist
-                    min_dist_idx = block.id
-
-            if min_dist_idx is not None and min_dist < self.maximum_assignment_distance:
-                block_lines[min_dist_idx].append((line_idx, provider_output))
+            # We want to assign to blocks closer in y than x
+            nearest_idx, min_dist = block_index.nearest(
+                provider_output.line.polygon.center,
+                x_weight=5,
+                max_distance=self.maximum_assignment_distance,
+            )
+
+            if nearest_idx is not None and min_dist < self.maximum_assignment_distance:
+                block_lines[valid_blocks[nearest_idx].id].append(
+                    (line_idx, provider_output)
+                )
                 assigned_line_idxs.add(line_idx)
 
         # This creates new blocks to hold anything too far away
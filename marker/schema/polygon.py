@@ -1,13 +1,17 @@
 from __future__ import annotations
-import copy
-from typing import List
+from typing import List, Optional, Sequence
 
 import numpy as np
 from pydantic import BaseModel, field_validator, computed_field
 
 
 class PolygonBox(BaseModel):
+    """
+    Four corners, clockwise from the top left.  Corners are never edited in place, so the bbox is computed once
+    and cached.  Assign a new `polygon` to move a box.
+    """
     polygon: List[List[float]]
+    _bbox: Optional[List[float]] = None
 
     @field_validator('polygon')
     @classmethod
@@ -30,21 +34,47 @@ class PolygonBox(BaseModel):
         assert v[2][0] >= min_x, 'bottom right corner should have a greater x value than bottom left corner' + corner_error
         return v
 
+    def __setattr__(self, name, value):
+        if name == "polygon":
+            self._bbox = None
+        super().__setattr__(name, value)
+
+    @classmethod
+    def from_corners(cls, corners: List[List[float]], bbox: List[float] | None = None) -> PolygonBox:
+        """
+        Build a box from four [x, y] float corners without validating them, for corners made by the transforms here.
+        """
+        box = cls.model_construct(polygon=corners)
+        box._bbox = bbox
+        return box
+
+    def get_bbox(self) -> List[float]:
+        # The cached bbox itself, for reading only
+        if self._bbox is None:
+            xs = [corner[0] for corner in self.polygon]
+            ys = [corner[1] for corner in self.polygon]
+            self._bbox = [min(xs), min(ys), max(xs), max(ys)]
+        return self._bbox
+
     @property
     def height(self):
-        return self.bbox[3] - self.bbox[1]
+        bbox = self.get_bbox()
+        return bbox[3] - bbox[1]
 
     @property
     def width(self):
-        return self.bbox[2] - self.bbox[0]
+        bbox = self.get_bbox()
+        return bbox[2] - bbox[0]
 
     @property
     def area(self):
-        return self.width * self.height
+        bbox = self.get_bbox()
+        return (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
 
     @property
     def center(self):
-        return [(self.bbox[0] + self.bbox[2]) / 2, (self.bbox[1] + self.bbox[3]) / 2]
+        bbox = self.get_bbox()
+        return [(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2]
 
     @property
     def size(self):
@@ -52,67 +82,57 @@ class PolygonBox(BaseModel):
 
     @property
     def x_start(self):
-        return self.bbox[0]
+        return self.get_bbox()[0]
 
     @property
     def y_start(self):
-        return self.bbox[1]
+        return self.get_bbox()[1]
 
     @property
     def x_end(self):
-        return self.bbox[2]
+        return self.get_bbox()[2]
 
     @property
     def y_end(self):
-        return self.bbox[3]
+        return self.get_bbox()[3]
 
     @computed_field
     @property
     def bbox(self) -> List[float]:
-        min_x = min([corner[0] for corner in self.polygon])
-        min_y = min([corner[1] for corner in self.polygon])
-        max_x = max([corner[0] for corner in self.polygon])
-        max_y = max([corner[1] for corner in self.polygon])
-        return [min_x, min_y, max_x, max_y]
+        # A copy, since callers are free to edit it
+        return list(self.get_bbox())
 
     def expand(self, x_margin: float, y_margin: float) -> PolygonBox:
-        new_polygon = []
         x_margin = x_margin * self.width
         y_margin = y_margin * self.height
-        for idx, poly in enumerate(self.polygon):
-            if idx == 0:
-                new_polygon.append([poly[0] - x_margin, poly[1] - y_margin])
-            elif idx == 1:
-                new_polygon.append([poly[0] + x_margin, poly[1] - y_margin])
-            elif idx == 2:
-                new_polygon.append([poly[0] + x_margin, poly[1] + y_margin])
-            elif idx == 3:
-                new_polygon.append([poly[0] - x_margin, poly[1] + y_margin])
-        return PolygonBox(polygon=new_polygon)
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = self.polygon
+        return PolygonBox.from_corners(
+            [
+                [x0 - x_margin, y0 - y_margin],
+                [x1 + x_margin, y1 - y_margin],
+                [x2 + x_margin, y2 + y_margin],
+                [x3 - x_margin, y3 + y_margin],
+            ]
+        )
 
     def expand_y2(self, y_margin: float) -> PolygonBox:
-        new_polygon = []
         y_margin = y_margin * self.height
-        for idx, poly in enumerate(self.polygon):
-            if idx == 2:
-                new_polygon.append([poly[0], poly[1] + y_margin])
-            elif idx == 3:
-                new_polygon.append([poly[0], poly[1] + y_margin])
-            else:
-                new_polygon.append(poly)
-        return PolygonBox(polygon=new_polygon)
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = self.polygon
+        return PolygonBox.from_corners(
+            [[x0, y0], [x1, y1], [x2, y2 + y_margin], [x3, y3 + y_margin]]
+        )
 
     def expand_y1(self, y_margin: float) -> PolygonBox:
-        new_polygon = []
         y_margin = y_margin * self.height
-        for idx, poly in enumerate(self.polygon):
-            if idx == 0:
-                new_polygon.append([poly[0], poly[1] - y_margin])
-            elif idx == 1:
-                new_polygon.append([poly[0], poly[1] - y_margin])
-            else:
-                new_polygon.append(poly)
-        return PolygonBox(polygon=new_polygon)
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = self.polygon
+        return PolygonBox.from_corners(
+            [[x0, y0 - y_margin], [x1, y1 - y_margin], [x2, y2], [x3, y3]]
+        )
+
+    def shift(self, x_offset: float, y_offset: float) -> PolygonBox:
+        return PolygonBox.from_corners(
+            [[x + x_offset, y + y_offset] for x, y in self.polygon]
+        )
 
     def minimum_gap(self, other: PolygonBox):
         if self.intersection_pct(other) > 0:
@@ -121,26 +141,26 @@ class PolygonBox(BaseModel):
         def dist(p1, p2):
             return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2) ** 0.5
 
-        left = other.bbox[2] < self.bbox[0]
-        right = self.bbox[2] < other.bbox[0]
-        bottom = other.bbox[3] < self.bbox[1]
-        top = self.bbox[3] < other.bbox[1]
+        left = other.get_bbox()[2] < self.get_bbox()[0]
+        right = self.get_bbox()[2] < other.get_bbox()[0]
+        bottom = other.get_bbox()[3] < self.get_bbox()[1]
+        top = self.get_bbox()[3] < other.get_bbox()[1]
         if top and left:
-            return dist((self.bbox[0], self.bbox[3]), (other.bbox[2], other.bbox[1]))
+            return dist((self.get_bbox()[0], self.get_bbox()[3]), (other.get_bbox()[2], other.get_bbox()[1]))
         elif left and bottom:
-            return dist((self.bbox[0], self.bbox[1]), (other.bbox[2], other.bbox[3]))
+            return dist((self.get_bbox()[0], self.get_bbox()[1]), (other.get_bbox()[2], other.get_bbox()[3]))
         elif bottom and right:
-            return dist((self.bbox[2], self.bbox[1]), (other.bbox[0], other.bbox[3]))
+            return dist((self.get_bbox()[2], self.get_bbox()[1]), (other.get_bbox()[0], other.get_bbox()[3]))
         elif right and top:
-            return dist((self.bbox[2], self.bbox[3]), (other.bbox[0], other.bbox[1]))
+            return dist((self.get_bbox()[2], self.get_bbox()[3]), (other.get_bbox()[0], other.get_bbox()[1]))
         elif left:
-            return self.bbox[0] - other.bbox[2]
+            return self.get_bbox()[0] - other.get_bbox()[2]
         elif right:
-            return other.bbox[0] - self.bbox[2]
+            return other.get_bbox()[0] - self.get_bbox()[2]
         elif bottom:
-            return self.bbox[1] - other.bbox[3]
+            return self.get_bbox()[1] - other.get_bbox()[3]
         elif top:
-            return other.bbox[1] - self.bbox[3]
+            return other.get_bbox()[1] - self.get_bbox()[3]
         else:
             return 0
 
@@ -151,7 +171,7 @@ class PolygonBox(BaseModel):
             return abs(self.center[0] - other.center[0]) * x_weight + abs(self.center[1] - other.center[1]) * y_weight
 
     def tl_distance(self, other: PolygonBox):
-        return ((self.bbox[0] - other.bbox[0]) ** 2 + (self.bbox[1] - other.bbox[1]) ** 2) ** 0.5
+        return ((self.get_bbox()[0] - other.get_bbox()[0]) ** 2 + (self.get_bbox()[1] - other.get_bbox()[1]) ** 2) ** 0.5
 
     def rescale(self, old_size, new_size):
         # Point is in x, y format
@@ -161,24 +181,23 @@ class PolygonBox(BaseModel):
         width_scaler = img_width / page_width
         height_scaler = img_height / page_height
 
-        new_corners = copy.deepcopy(self.polygon)
-        for corner in new_corners:
-            corner[0] = corner[0] * width_scaler
-            corner[1] = corner[1] * height_scaler
-        return PolygonBox(polygon=new_corners)
+        return PolygonBox.from_corners(
+            [[x * width_scaler, y * height_scaler] for x, y in self.polygon]
+        )
 
     def fit_to_bounds(self, bounds):
-        new_corners = copy.deepcopy(self.polygon)
-        for corner in new_corners:
-            corner[0] = max(min(corner[0], bounds[2]), bounds[0])
-            corner[1] = max(min(corner[1], bounds[3]), bounds[1])
-        return PolygonBox(polygon=new_corners)
+        return PolygonBox.from_corners(
+            [
+                [max(min(x, bounds[2]), bounds[0]), max(min(y, bounds[3]), bounds[1])]
+                for x, y in self.polygon
+            ]
+        )
 
     def overlap_x(self, other: PolygonBox):
-        return max(0, min(self.bbox[2], other.bbox[2]) - max(self.bbox[0], other.bbox[0]))
+        return max(0, min(self.get_bbox()[2], other.get_bbox()[2]) - max(self.get_bbox()[0], other.get_bbox()[0]))
 
     def overlap_y(self, other: PolygonBox):
-        return max(0, min(self.bbox[3], other.bbox[3]) - max(self.bbox[1], other.bbox[1]))
+        return max(0, min(self.get_bbox()[3], other.get_bbox()[3]) - max(self.get_bbox()[1], other.get_bbox()[1]))
 
     def intersection_area(self, other: PolygonBox):
         return self.overlap_x(other) * self.overlap_y(other)
@@ -208,12 +227,67 @@ class PolygonBox(BaseModel):
                 corners.append([max_x, max_y])
             elif i == 3:
                 corners.append([min_x, max_y])
-        return PolygonBox(polygon=corners)
+        return PolygonBox.from_corners(corners)
 
     @classmethod
     def from_bbox(cls, bbox: List[float], ensure_nonzero_area=False):
+        x_start, y_start, x_end, y_end = (float(c) for c in bbox)
         if ensure_nonzero_area:
-            bbox = list(bbox)
-            bbox[2] = max(bbox[2], bbox[0] + 1)
-            bbox[3] = max(bbox[3], bbox[1] + 1)
-        return cls(polygon=[[bbox[0], bbox[1]], [bbox[2], bbox[1]], [bbox[2], bbox[3]], [bbox[0], bbox[3]]])
+            x_end = max(x_end, x_start + 1)
+            y_end = max(y_end, y_start + 1)
+        return cls.from_corners(
+            [[x_start, y_start], [x_end, y_start], [x_end, y_end], [x_start, y_end]]
+        )
+
+    @staticmethod
+    def corners_array(polygons: Sequence[PolygonBox | List[List[float]]]) -> np.ndarray:
+        """
+        The corners of many boxes, or of corner lists, as one (N, 4, 2) array.
+        """
+        if not len(polygons):
+            return np.zeros((0, 4, 2))
+
+        corners = np.array(
+            [p.polygon if isinstance(p, PolygonBox) else p for p in polygons],
+            dtype=np.float64,
+        )
+        if corners.shape[1:] != (4, 2):
+            raise ValueError("every polygon must have 4 corners of 2 elements")
+        return corners
+
+    @classmethod
+    def from_corners_array(cls, corners: np.ndarray) -> List[PolygonBox]:
+        bboxes = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+        return [
+            cls.from_corners(box_corners, bbox)
+            for box_corners, bbox in zip(corners.tolist(), bboxes.tolist())
+        ]
+
+    @classmethod
+    def rescale_many(
+        cls, polygons: Sequence[PolygonBox | List[List[float]]], old_size, new_size
+    ) -> List[PolygonBox]:
+        scale = np.array(new_size, dtype=np.float64) / np.array(old_size, dtype=np.float64)
+        return cls.from_corners_array(cls.corners_array(polygons) * scale)
+
+    @classmethod
+    def fit_many_to_bounds(
+        cls, polygons: Sequence[PolygonBox | List[List[float]]], bounds
+    ) -> List[PolygonBox]:
+        return cls.from_corners_array(
+            np.clip(cls.corners_array(polygons), bounds[:2], bounds[2:])
+        )
+
+    @classmethod
+    def expand_many(
+        cls,
+        polygons: Sequence[PolygonBox | List[List[float]]],
+        x_margin: float,
+        y_margin: float,
+    ) -> List[PolygonBox]:
+        corners = cls.corners_array(polygons)
+        size = corners.max(axis=1) - corners.min(axis=1)
+        margins = size * np.array([x_margin, y_margin])
+        # Outward from the top left, top right, bottom right and bottom left corners
+        directions = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+        return cls.from_corners_array(corners + directions * margins[:, None, :])
@@ -42,6 +42,7 @@ class Span(Block):
     has_subscript: bool = False
     url: Optional[str] = None
     html: Optional[str] = None
+    char_range: Optional[List[int]] = None  # Offsets into the page character store, for lazily built chars
 
     @property
     def bold(self):
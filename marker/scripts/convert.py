@@ -21,9 +21,18 @@ os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = (
 os.environ["IN_STREAMLIT"] = "true"  # Avoid multiprocessing inside surya
 
 import math
+import pickle
+import shutil
+import tempfile
 import traceback
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+
+from typing import Any, Callable, List
 
 import click
+import pypdfium2 as pdfium
 import torch.multiprocessing as mp
 from tqdm import tqdm
 import gc
@@ -33,11 +42,21 @@ from marker.config.printer import CustomClickPrinter
 from marker.logger import configure_logging, get_logger
 from marker.models import create_model_dict
 from marker.output import output_exists, save_output
+from marker.providers.epub import EpubProvider
+from marker.providers.html import HTMLProvider
+from marker.providers.html_pdf import RenderPool, RenderedPdfProvider, set_render_pool
+from marker.providers.pdf import PdfProvider
+from marker.providers.registry import provider_from_filepath
+from marker.util import parse_range_str
 from marker.utils.gpu import GPUManager
 
 configure_logging()
 logger = get_logger()
 
+# Each worker renders and writes a file in the background while it converts the next one
+output_writer: ThreadPoolExecutor | None = None
+pending_output: Future | None = None
+
 
 def worker_init():
     model_dict = create_model_dict()
@@ -47,6 +66,8 @@ def worker_init():
 
     # Ensure we clean up the model references on exit
     atexit.register(worker_exit)
+    # Pool workers exit without running atexit handlers, so the last file is written by a finalizer
+    Finalize(None, flush_output, exitpriority=10)
 
 
 def worker_exit():
@@ -57,9 +78,49 @@ def worker_exit():
         pass
 
 
+def write_output(
+    render: Callable[[], Any],
+    out_folder: str,
+    base_name: str,
+    fpath: str,
+    source: str,
+    debug_print: bool = False,
+):
+    try:
+        rendered = render()
+        save_output(rendered, out_folder, base_name)
+        if debug_print:
+            logger.debug(f"Converted {fpath}")
+        del rendered
+    except Exception as e:
+        logger.error(f"Error writing {fpath}: {e}")
+        traceback.print_exc()
+    finally:
+        # Rendered sources are kept until now, since page images are read from them
+        if source != fpath and os.path.exists(source):
+            os.remove(source)
+
+
+def submit_output(*args):
+    global output_writer, pending_output
+    # Wait for the previous file, so only one converted document is held in memory
+    flush_output()
+    if output_writer is None:
+        output_writer = ThreadPoolExecutor(max_workers=1)
+    pending_output = output_writer.submit(write_output, *args)
+
+
+def flush_output():
+    global pending_output
+    if pending_output is not None:
+        pending_output.result()
+        pending_output = None
+
+
 def process_single_pdf(args):
     page_count = 0
-    fpath, cli_options = args
+    # The source is a PDF rendered ahead of time for HTML, EPUB and Office inputs, otherwise the file itself
+    fpath, source, cli_options = args
     torch.set_num_threads(cli_options["total_torch_threads"])
     del cli_options["total_torch_threads"]
 
@@ -74,6 +135,7 @@ def process_single_pdf(args):
     config_dict = config_parser.generate_config_dict()
     config_dict["disable_tqdm"] = True
 
+    output_submitted = False
     try:
         if cli_options.get("debug_print"):
             logger.debug(f"Converting {fpath}")
@@ -84,24 +146,206 @@ def process_single_pdf(args):
             renderer=config_parser.get_renderer(),
             llm_service=config_parser.get_llm_service(),
         )
-        rendered = converter(fpath)
-        out_folder = config_parser.get_output_folder(fpath)
-        save_output(rendered, out_folder, base_name)
+        render = converter.build_renderer(source)
         page_count = converter.page_count
 
-        if cli_options.get("debug_print"):
-            logger.debug(f"Converted {fpath}")
-        del rendered
+        output_args = (
+            render,
+            out_folder,
+            base_name,
+            fpath,
+            source,
+            cli_options.get("debug_print", False),
+        )
+        output_submitted = True
+        if cli_options.get("serial_output"):
+            write_output(*output_args)
+        else:
+            submit_output(*output_args)
+        del render
         del converter
     except Exception as e:
         logger.error(f"Error converting {fpath}: {e}")
         traceback.print_exc()
+    finally:
+        if not output_submitted and source != fpath and os.path.exists(source):
+            os.remove(source)
+        gc.collect()
+
+    return page_count
+
+
+def process_file_group(args):
+    files, cli_options = args
+    torch.set_num_threads(cli_options["total_torch_threads"])
+    del cli_options["total_torch_threads"]
+
+    config_parser = ConfigParser(cli_options)
+    config_dict = config_parser.generate_config_dict()
+    config_dict["disable_tqdm"] = True
+
+    if cli_options.get("skip_existing"):
+        files = [
+            f
+            for f in files
+            if not output_exists(
+                config_parser.get_output_folder(f), config_parser.get_base_filename(f)
+            )
+        ]
+    if not files:
+        return 0
+
+    page_count = 0
+    try:
+        converter = create_converter(config_parser, config_dict)
+        # The files are built together, so their pages share model batches
+        results = converter.convert_many(
+            files, max_documents=len(files), return_exceptions=True
+        )
+        for fpath, rendered in zip(files, results):
+            if isinstance(rendered, Exception):
+                logger.error(f"Error converting {fpath}: {rendered}")
+                continue
+            save_output(
+                rendered,
+                config_parser.get_output_folder(fpath),
+                config_parser.get_base_filename(fpath),
+            )
+            page_count += converter.page_count
+            if cli_options.get("debug_print"):
+                logger.debug(f"Converted {fpath}")
+        del converter
+    except Exception as e:
+        logger.error(f"Error converting {', '.join(files)}: {e}")
+        traceback.print_exc()
+    finally:
+        gc.collect()
+
+    return page_count
+
+
+def create_converter(config_parser: ConfigParser, config_dict: dict):
+    converter_cls = config_parser.get_converter_cls()
+    return converter_cls(
+        config=config_dict,
+        artifact_dict=model_refs,
+        processor_list=config_parser.get_processors(),
+        renderer=config_parser.get_renderer(),
+        llm_service=config_parser.get_llm_service(),
+    )
+
+
+def process_pdf_shard(args):
+    fpath, page_range, shard_path, cli_options = args
+    torch.set_num_threads(cli_options["total_torch_threads"])
+    del cli_options["total_torch_threads"]
+
+    config_parser = ConfigParser(cli_options)
+    config_dict = config_parser.generate_config_dict()
+    config_dict["disable_tqdm"] = True
+    config_dict["page_range"] = page_range
+
+    try:
+        converter = create_converter(config_parser, config_dict)
+        document = converter.build_shard(fpath)
+        with open(shard_path, "wb") as f:
+            pickle.dump(document, f, protocol=pickle.HIGHEST_PROTOCOL)
+        del document
+        del converter
+    except Exception as e:
+        logger.error(f"Error converting pages {page_range[0]}-{page_range[-1]} of {fpath}: {e}")
+        traceback.print_exc()
+        shard_path = None
     finally:
         gc.collect()
 
+    return fpath, shard_path
+
+
+def merge_pdf_shards(args):
+    fpath, shard_paths, cli_options = args
+    torch.set_num_threads(cli_options["total_torch_threads"])
+    del cli_options["total_torch_threads"]
+
+    config_parser = ConfigParser(cli_options)
+    config_dict = config_parser.generate_config_dict()
+    config_dict["disable_tqdm"] = True
+
+    page_count = 0
+    try:
+        shards = []
+        for shard_path in shard_paths:
+            with open(shard_path, "rb") as f:
+                shards.append(pickle.load(f))
+
+        converter = create_converter(config_parser, config_dict)
+        rendered = converter.merge_shards(fpath, shards)
+        out_folder = config_parser.get_output_folder(fpath)
+        save_output(rendered, out_folder, config_parser.get_base_filename(fpath))
+        page_count = converter.page_count
+        del rendered
+        del converter
+    except Exception as e:
+        logger.error(f"Error merging shards of {fpath}: {e}")
+        traceback.print_exc()
+    finally:
+        shutil.rmtree(os.path.dirname(shard_paths[0]), ignore_errors=True)
+        gc.collect()
+
     return page_count
 
 
+def process_task(task):
+    task_type, args = task
+    if task_type == "shard":
+        return task_type, process_pdf_shard(args)
+    if task_type == "group":
+        return task_type, (len(args[0]), process_file_group(args))
+    return task_type, process_single_pdf(args)
+
+
+def needs_render(fpath: str, cli_options: dict) -> bool:
+    # Whether the file is rendered to a PDF before conversion, rather than built natively or read directly
+    provider_cls = provider_from_filepath(fpath)
+    if not issubclass(provider_cls, RenderedPdfProvider):
+        return False
+    if provider_cls in (HTMLProvider, EpubProvider):
+        return not cli_options.get("native_html")
+    return not cli_options.get("native_office")
+
+
+def render_to_pdf(fpath: str, render_dir: str) -> str:
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf", dir=render_dir)
+    os.close(fd)
+    try:
+        provider_from_filepath(fpath).convert_to_pdf(fpath, pdf_path)
+    except Exception:
+        os.remove(pdf_path)
+        raise
+    return pdf_path
+
+
+def get_shard_ranges(fpath: str, cli_options: dict) -> List[List[int]] | None:
+    """
+    Split a PDF into page ranges of `shard_pages` pages, or return None if it should be converted whole.
+    """
+    shard_pages = cli_options.get("shard_pages")
+    if not shard_pages or provider_from_filepath(fpath) is not PdfProvider:
+        return None
+
+    page_range = cli_options.get("page_range")
+    if page_range:
+        pages = parse_range_str(page_range)
+    else:
+        doc = pdfium.PdfDocument(fpath)
+        pages = list(range(len(doc)))
+        doc.close()
+
+    if len(pages) <= shard_pages:
+        return None
+    return [pages[i : i + shard_pages] for i in range(0, len(pages), shard_pages)]
+
+
 @click.command(cls=CustomClickPrinter)
 @click.argument("in_folder", type=str)
 @click.option("--chunk_idx", type=int, default=0, help="Chunk index to convert")
@@ -135,6 +379,36 @@ def process_single_pdf(args):
     default=None,
     help="Number of worker processes to use.  Set automatically by default, but can be overridden.",
 )
+@click.option(
+    "--render_workers",
+    type=int,
+    default=0,
+    help="Render HTML, EPUB and Office files to PDF in this many separate processes, while the model workers convert other files.",
+)
+@click.option(
+    "--render_timeout",
+    type=int,
+    default=300,
+    help="Maximum number of seconds to render a single file to PDF, when using render workers.",
+)
+@click.option(
+    "--serial_output",
+    is_flag=True,
+    default=False,
+    help="Render and write each file before converting the next, instead of overlapping the two in each worker.",
+)
+@click.option(
+    "--batch_documents",
+    type=int,
+    default=1,
+    help="Convert this many files at once in each worker, pooling their pages into shared model batches.  Helps most with short files.",
+)
+@click.option(
+    "--shard_pages",
+    type=int,
+    default=None,
+    help="Split PDFs with more pages than this into shards of this many pages, which are converted in parallel and merged.",
+)
 @ConfigParser.common_options
 def convert_cli(in_folder: str, **kwargs):
     total_pages = 0
@@ -183,7 +457,70 @@ def convert_cli(in_folder: str, **kwargs):
         logger.info(
             f"Converting {len(files_to_convert)} pdfs in chunk {kwargs['chunk_idx'] + 1}/{kwargs['num_chunks']} with {total_processes} processes and saving to {kwargs['output_dir']}"
         )
-        task_args = [(f, kwargs) for f in files_to_convert]
+        # Large PDFs are split into page shards, which are merged once all of them are built
+        config_parser = ConfigParser(kwargs)
+        task_args = []
+        render_files = []
+        shard_paths = defaultdict(list)
+        for f in files_to_convert:
+            if kwargs["render_workers"] and needs_render(f, kwargs):
+                if not (
+                    kwargs["skip_existing"]
+                    and output_exists(
+                        config_parser.get_output_folder(f),
+                        config_parser.get_base_filename(f),
+                    )
+                ):
+                    render_files.append(f)
+                continue
+
+            shard_ranges = get_shard_ranges(f, kwargs)
+            if shard_ranges is None:
+                task_args.append(("file", (f, f, kwargs)))
+                continue
+            if kwargs["skip_existing"] and output_exists(
+                config_parser.get_output_folder(f), config_parser.get_base_filename(f)
+            ):
+                continue
+
+            shard_dir = tempfile.mkdtemp(prefix="marker_shards_")
+            for shard_idx, page_range in enumerate(shard_ranges):
+                shard_path = os.path.join(shard_dir, f"{shard_idx}.pkl")
+                shard_paths[f].append(shard_path)
+                # Shards go first, so the largest files don't set the tail latency
+                task_args.insert(0, ("shard", (f, page_range, shard_path, kwargs)))
+
+        if kwargs["batch_documents"] > 1:
+            # Whole files are grouped, so each worker builds a group at once
+            group_files = [args[0] for task_type, args in task_args if task_type == "file"]
+            task_args = [task for task in task_args if task[0] != "file"]
+            for i in range(0, len(group_files), kwargs["batch_documents"]):
+                task_args.append(
+                    ("group", (group_files[i : i + kwargs["batch_documents"]], kwargs))
+                )
+
+        pending_shards = {f: len(paths) for f, paths in shard_paths.items()}
+        failed_files = set()
+        total_files = (
+            sum(len(args[0]) if task_type == "group" else 1 for task_type, args in task_args)
+            - sum(pending_shards.values())
+            + len(shard_paths)
+            + len(render_files)
+        )
+
+        # Files are rendered to PDF in the background, and queued for conversion as they finish
+        render_dir = tempfile.mkdtemp(prefix="marker_rendered_")
+        render_pool = None
+        render_executor = None
+        render_futures = {}
+        if render_files:
+            render_pool = RenderPool(kwargs["render_workers"], kwargs["render_timeout"])
+            set_render_pool(render_pool)
+            render_executor = ThreadPoolExecutor(max_workers=kwargs["render_workers"])
+            render_futures = {
+                render_executor.submit(render_to_pdf, f, render_dir): f
+                for f in render_files
+            }
 
         start_time = time.time()
         with mp.Pool(
@@ -191,12 +528,66 @@ def convert_cli(in_folder: str, **kwargs):
             initializer=worker_init,
             maxtasksperchild=kwargs["max_tasks_per_worker"],
         ) as pool:
-            pbar = tqdm(total=len(task_args), desc="Processing PDFs", unit="pdf")
-            for page_count in pool.imap_unordered(process_single_pdf, task_args):
+            pbar = tqdm(total=total_files, desc="Processing PDFs", unit="pdf")
+
+            def iter_tasks():
+                yield from task_args
+                for future in as_completed(render_futures):
+                    fpath = render_futures[future]
+                    try:
+                        pdf_path = future.result()
+                    except Exception as e:
+                        logger.error(f"Error rendering {fpath} to PDF: {e}")
+                        pbar.update(1)
+                        continue
+                    yield "file", (fpath, pdf_path, kwargs)
+
+            merge_results = []
+            for task_type, result in pool.imap_unordered(process_task, iter_tasks()):
+                if task_type == "file":
+                    pbar.update(1)
+                    total_pages += result
+                    continue
+                if task_type == "group":
+                    file_count, page_count = result
+                    pbar.update(file_count)
+                    total_pages += page_count
+                    continue
+
+                fpath, shard_path = result
+                pending_shards[fpath] -= 1
+                if shard_path is None:
+                    failed_files.add(fpath)
+                if pending_shards[fpath] > 0:
+                    continue
+
+                if fpath in failed_files:
+                    shutil.rmtree(
+                        os.path.dirname(shard_paths[fpath][0]), ignore_errors=True
+                    )
+                    pbar.update(1)
+                    continue
+                merge_results.append(
+                    pool.apply_async(
+                        merge_pdf_shards, ((fpath, shard_paths[fpath], kwargs),)
+                    )
+                )
+
+            for merge_result in merge_results:
+                total_pages += merge_result.get()
                 pbar.update(1)
-                total_pages += page_count
+
+            # Let the workers exit on their own, so they finish writing their last file
+            pool.close()
+            pool.join()
             pbar.close()
 
+        if render_executor is not None:
+            render_executor.shutdown()
+            render_pool.close()
+            set_render_pool(None)
+        shutil.rmtree(render_dir, ignore_errors=True)
+
         total_time = time.time() - start_time
         print(
             f"Inferenced {total_pages} pages in {total_time:.2f} seconds, for a throughput of {total_pages / total_time:.2f} pages/sec for chunk {chunk_idx + 1}/{kwargs['num_chunks']}"
@@ -1,7 +1,6 @@
 import traceback
 
 import click
-import os
 
 from pydantic import BaseModel, Field
 from starlette.responses import HTMLResponse
@@ -9,21 +8,21 @@ from starlette.responses import HTMLResponse
 from marker.config.parser import ConfigParser
 from marker.output import text_from_rendered
 
+import asyncio
 import base64
 from contextlib import asynccontextmanager
 from typing import Optional, Annotated
 import io
 
 from fastapi import FastAPI, Form, File, UploadFile
+from marker.cache import RequestCoalescer, document_key
 from marker.converters.pdf import PdfConverter
 from marker.models import create_model_dict
 from marker.settings import settings
 
 app_data = {}
-
-
-UPLOAD_DIRECTORY = "./uploads"
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+# Identical concurrent requests wait on one conversion instead of each running the pipeline
+coalescer = RequestCoalescer()
 
 
 @asynccontextmanager
@@ -83,7 +82,18 @@ class CommonParams(BaseModel):
     ] = "markdown"
 
 
-async def _convert_pdf(params: CommonParams):
+def run_converter(converter: PdfConverter, source):
+    # Concurrent requests share the models, so their pages are pooled into the same model batches
+    with converter.model_batcher.document():
+        render = converter.build_renderer(source)
+    return render()
+
+
+async def _convert_pdf(params: CommonParams, source: Optional[bytes] = None):
+    # Uploads are converted from memory, everything else from params.filepath
+    if source is None:
+        source = params.filepath
+
     assert params.output_format in ["markdown", "json", "html", "chunks"], (
         "Invalid output format"
     )
@@ -100,7 +110,13 @@ async def _convert_pdf(params: CommonParams):
             renderer=config_parser.get_renderer(),
             llm_service=config_parser.get_llm_service(),
         )
-        rendered = converter(params.filepath)
+        # Hashing a large upload would block the event loop
+        request_key = await asyncio.to_thread(
+            document_key, source, converter.cache_config()
+        )
+        rendered = await coalescer.run(
+            request_key, lambda: asyncio.to_thread(run_converter, converter, source)
+        )
         text, _, images = text_from_rendered(rendered)
         metadata = rendered.metadata
     except Exception as e:
@@ -142,20 +158,16 @@ async def convert_pdf_upload(
         ..., description="The PDF file to convert.", media_type="application/pdf"
     ),
 ):
-    upload_path = os.path.join(UPLOAD_DIRECTORY, file.filename)
-    with open(upload_path, "wb+") as upload_file:
-        file_contents = await file.read()
-        upload_file.write(file_contents)
+    file_contents = await file.read()
 
     params = CommonParams(
-        filepath=upload_path,
+        filepath=None,
         page_range=page_range,
         force_ocr=force_ocr,
         paginate_output=paginate_output,
         output_format=output_format,
     )
-    results = await _convert_pdf(params)
-    os.remove(upload_path)
+    results = await _convert_pdf(params, source=file_contents)
     return results
 
 
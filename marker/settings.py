@@ -22,6 +22,17 @@ class Settings(BaseSettings):
     OUTPUT_ENCODING: str = "utf-8"
     OUTPUT_IMAGE_FORMAT: str = "JPEG"
 
+    # Conversion cache, disabled if no directory is set
+    CONVERSION_CACHE_DIR: Optional[str] = None
+    CONVERSION_CACHE_MAX_BYTES: int = 10 * 1024 * 1024 * 1024
+
+    # Worker processes for rendering HTML, EPUB and Office files to PDF, rendered in-process if 0
+    PDF_RENDER_WORKERS: int = 0
+    PDF_RENDER_TIMEOUT: Optional[int] = 300  # Seconds per document, for pooled rendering
+
+    # How long a model call waits for other documents to join its batch, when converting several at once
+    MODEL_BATCH_MAX_WAIT: float = 0.05
+
     # LLM
     GOOGLE_API_KEY: Optional[str] = ""
 
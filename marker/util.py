@@ -1,7 +1,9 @@
 import inspect
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module
-from typing import List, Annotated
+from typing import Any, Callable, Iterable, Iterator, List, Annotated, TypeVar
 import re
 
 import numpy as np
@@ -13,6 +15,8 @@ from marker.settings import settings
 
 OPENING_TAG_REGEX = re.compile(r"<((?:math|i|b))(?:\s+[^>]*)?>")
 CLOSING_TAG_REGEX = re.compile(r"</((?:math|i|b))>")
+T = TypeVar("T")
+
 TAG_MAPPING = {
     'i': 'italic',
     'b': 'bold',
@@ -92,6 +96,33 @@ def parse_range_str(range_str: str) -> List[int]:
     return page_lst
 
 
+def prefetch(items: Iterable[T], prepare: Callable[[T], Any], depth: int = 1) -> Iterator[T]:
+    """
+    Yield items in order, each once `prepare(item)` has finished.  Items are prepared in a background
+    thread, up to `depth` items ahead of the consumer, so preparation overlaps with the consumer's work.
+    """
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            for item in items:
+                pending.append((item, executor.submit(prepare, item)))
+                if len(pending) <= depth:
+                    continue
+                item, future = pending.popleft()
+                future.result()
+                yield item
+
+            while pending:
+                item, future = pending.popleft()
+                future.result()
+                yield item
+        finally:
+            # Stop preparing if the consumer stops early, or fails
+            for _, future in pending:
+                future.cancel()
+
+
 def matrix_intersection_area(boxes1: List[List[float]], boxes2: List[List[float]]) -> np.ndarray:
     if len(boxes1) == 0 or len(boxes2) == 0:
         return np.zeros((len(boxes1), len(boxes2)))
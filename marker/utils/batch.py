@@ -1,5 +1,18 @@
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from marker.settings import settings
 from marker.utils.gpu import GPUManager
 
+# Model arguments with one entry per input, which are concatenated across calls
+ITEM_ARGS = ("images", "texts", "task_names", "polygons", "bboxes", "input_text")
+
 
 def get_batch_sizes_worker_counts(gpu_manager: GPUManager, peak_worker_vram: int):
     vram = gpu_manager.get_gpu_vram()
@@ -17,3 +30,264 @@ def get_batch_sizes_worker_counts(gpu_manager: GPUManager, peak_worker_vram: int
         "equation_batch_size": 16,
         "detector_postprocessing_cpu_workers": 2,
     }, workers
+
+
+def split_result(result: Any, counts: List[int]) -> List[Any]:
+    """
+    Split the result of a merged model call back into one result per call, with `counts` inputs each.
+    """
+    bounds = []
+    start = 0
+    for count in counts:
+        bounds.append((start, start + count))
+        start += count
+
+    if isinstance(result, list):
+        return [result[s:e] for s, e in bounds]
+
+    if isinstance(result, BaseModel):
+        # Results like OCR error detection hold parallel lists of per-input values
+        fields = result.model_dump()
+        return [
+            type(result)(
+                **{
+                    k: v[s:e] if isinstance(v, list) and len(v) == start else v
+                    for k, v in fields.items()
+                }
+            )
+            for s, e in bounds
+        ]
+
+    raise TypeError(f"Can't split a model result of type {type(result)}")
+
+
+class BatchRequest:
+    def __init__(
+        self,
+        items_name: Optional[str],
+        items: list,
+        item_args: Dict[str, list],
+        kwargs: dict,
+    ):
+        self.items_name = items_name  # None if the inputs were passed positionally
+        self.items = items
+        self.item_args = item_args
+        self.kwargs = kwargs
+        self.result = None
+        self.error: Exception | None = None
+        self.claimed = False
+        self.done = False
+
+    @classmethod
+    def from_call(cls, args: tuple, kwargs: dict) -> Optional["BatchRequest"]:
+        # Only calls with a single list of inputs, and per-input arguments that match it, can be merged
+        if len(args) > 1:
+            return None
+
+        kwargs = dict(kwargs)
+        items_name = None
+        if args:
+            items = args[0]
+        else:
+            items_name = next((k for k in ("images", "texts") if k in kwargs), None)
+            if items_name is None:
+                return None
+            items = kwargs.pop(items_name)
+
+        if not isinstance(items, list) or not items:
+            return None
+
+        item_args = {}
+        for name in ITEM_ARGS:
+            if kwargs.get(name) is None:
+                continue
+            value = kwargs.pop(name)
+            if not isinstance(value, list) or len(value) != len(items):
+                return None
+            item_args[name] = value
+        return cls(items_name, items, item_args, kwargs)
+
+    def key(self, model) -> Tuple:
+        # Calls are only merged if everything besides their inputs is the same
+        return (
+            id(model),
+            self.items_name,
+            tuple(sorted(self.item_args)),
+            tuple(sorted((k, repr(v)) for k, v in self.kwargs.items())),
+        )
+
+
+class BatchedModel:
+    """
+    Wraps a model while documents are converted together, so their calls are merged by a `ModelBatcher`.
+    Attributes are read from and set on the wrapped model.
+    """
+
+    def __init__(self, model, batcher: "ModelBatcher"):
+        object.__setattr__(self, "model", model)
+        object.__setattr__(self, "batcher", batcher)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.model, name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.batcher.call(self.model, args, kwargs)
+
+
+class ModelBatcher:
+    """
+    Pools model calls from documents converted at the same time in different threads into shared batches,
+    so short documents fill the model batches together.  A call waits until every document is waiting on
+    a model, or `max_wait` seconds pass.  Then the waiting calls to the same model are run as one call,
+    and the results are split back to each document.
+
+    Threads take part by converting inside `document()`.  The models in the artifact dict, and in the
+    processors holding them, are only wrapped while a document is inside it, and are restored once the
+    last one leaves.  Calls from other threads run on their own, and only batched calls wait on each other.
+    """
+
+    def __init__(
+        self,
+        artifact_dict: Optional[Dict[str, Any]] = None,
+        max_wait: float = settings.MODEL_BATCH_MAX_WAIT,
+    ):
+        self.artifact_dict = artifact_dict if artifact_dict is not None else {}
+        self.max_wait = max_wait
+        self.condition = threading.Condition()
+        self.run_lock = threading.Lock()
+        self.pending: Dict[Tuple, List[BatchRequest]] = defaultdict(list)
+        self.documents = 0
+        self.waiting = 0
+        self.local = threading.local()
+        self.holders = weakref.WeakSet()  # Objects holding models as attributes, like processors
+        self.wrappers: Dict[int, BatchedModel] = {}  # Model id to its wrapper, while documents are inside
+
+    @classmethod
+    def for_artifacts(cls, artifact_dict: Dict[str, Any]) -> "ModelBatcher":
+        """
+        The batcher for the models in an artifact dict.  It is stored in the dict, so every converter sharing
+        the models shares its batches.
+        """
+        batcher = artifact_dict.get("model_batcher")
+        if batcher is None:
+            batcher = cls(artifact_dict)
+            artifact_dict["model_batcher"] = batcher
+        return batcher
+
+    def register(self, holders: List[Any]):
+        # Holders that pick up models while documents are inside get them wrapped too
+        with self.condition:
+            self.holders.update(holders)
+            if self.wrappers:
+                for holder in holders:
+                    self.swap_attributes(holder, wrap=True)
+
+    def swap_attributes(self, holder: Any, wrap: bool):
+        for name, value in list(vars(holder).items()):
+            if wrap:
+                wrapper = self.wrappers.get(id(value))
+                if wrapper is not None and wrapper.model is value:
+                    setattr(holder, name, wrapper)
+            elif isinstance(value, BatchedModel) and value.batcher is self:
+                setattr(holder, name, value.model)
+
+    def wrap_models(self):
+        for name, value in list(self.artifact_dict.items()):
+            if name.endswith("_model") and value is not None and not isinstance(value, BatchedModel):
+                wrapper = BatchedModel(value, self)
+                self.wrappers[id(value)] = wrapper
+                self.artifact_dict[name] = wrapper
+        for holder in list(self.holders):
+            self.swap_attributes(holder, wrap=True)
+
+    def restore_models(self):
+        for name, value in list(self.artifact_dict.items()):
+            if isinstance(value, BatchedModel) and value.batcher is self:
+                self.artifact_dict[name] = value.model
+        for holder in list(self.holders):
+            self.swap_attributes(holder, wrap=False)
+        self.wrappers = {}
+
+    @contextmanager
+    def document(self):
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        if depth == 0:
+            with self.condition:
+                if self.documents == 0:
+                    self.wrap_models()
+                self.documents += 1
+        try:
+            yield
+        finally:
+            self.local.depth = depth
+            if depth == 0:
+                with self.condition:
+                    self.documents -= 1
+                    if self.documents == 0:
+                        self.restore_models()
+                    # Calls waiting on this document can run now
+                    self.condition.notify_all()
+
+    def call(self, model, args: tuple, kwargs: dict):
+        request = BatchRequest.from_call(args, kwargs)
+        if request is None or not getattr(self.local, "depth", 0):
+            return model(*args, **kwargs)
+
+        key = request.key(model)
+        batch = None
+        with self.condition:
+            self.pending[key].append(request)
+            self.waiting += 1
+            self.condition.notify_all()
+
+            deadline = time.monotonic() + self.max_wait
+            while not request.claimed:
+                remaining = deadline - time.monotonic()
+                if self.waiting >= self.documents or remaining <= 0:
+                    batch = self.pending.pop(key)
+                    for pending_request in batch:
+                        pending_request.claimed = True
+                    # Documents in a running batch will be back with their next call, so they aren't waiting
+                    self.waiting -= len(batch)
+                    break
+                self.condition.wait(remaining)
+
+        if batch is not None:
+            self.run_batch(model, batch)
+
+        with self.condition:
+            while not request.done:
+                self.condition.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def run_batch(self, model, batch: List[BatchRequest]):
+        first = batch[0]
+        items = [item for request in batch for item in request.items]
+        kwargs = dict(first.kwargs)
+        for name in first.item_args:
+            kwargs[name] = [v for request in batch for v in request.item_args[name]]
+
+        try:
+            with self.run_lock:
+                if first.items_name is None:
+                    result = model(items, **kwargs)
+                else:
+                    result = model(**{first.items_name: items}, **kwargs)
+            results = split_result(result, [len(request.items) for request in batch])
+            for request, request_result in zip(batch, results):
+                request.result = request_result
+        except Exception as e:
+            for request in batch:
+                request.error = e
+
+        with self.condition:
+            for request in batch:
+                request.done = True
+            self.condition.notify_all()
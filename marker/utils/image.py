@@ -1,40 +1,102 @@
 from PIL import Image
 import numpy as np
 import cv2
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+
+def gray_ink_mask(gray: np.ndarray) -> np.ndarray:
+    """
+    Binarize a grayscale image into a boolean mask of ink, with an adaptive threshold that ignores page tint and shading.
+    """
+    gray = cv2.GaussianBlur(gray, (7, 7), 0)
+
+    # Adaptive threshold (inverse for text as white)
+    binarized = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 15
+    )
+    return binarized > 0
+
+
+class InkMap:
+    """
+    The ink on an image, for blank checks on many boxes of it.  The image is converted to grayscale once, and each
+    box is thresholded on its own, exactly like a crop of the image, since the blur and threshold depend on the
+    box edges.  Boxes are in the image's pixel coordinates, and are clipped to the image.
+    """
+
+    def __init__(self, image: Image.Image):
+        self.size = image.size
+        if image.width == 0 or image.height == 0:
+            self.gray = np.zeros((image.height, image.width), dtype=np.uint8)
+        else:
+            self.gray = cv2.cvtColor(
+                np.asarray(image.convert("RGB")), cv2.COLOR_RGB2GRAY
+            )
+
+    def clip(self, bbox: Sequence[float]) -> List[int]:
+        width, height = self.size
+        # Rounded the same way as cropping the image
+        x_start, y_start, x_end, y_end = [int(round(coord)) for coord in bbox]
+        return [
+            min(max(x_start, 0), width),
+            min(max(y_start, 0), height),
+            min(max(x_end, 0), width),
+            min(max(y_end, 0), height),
+        ]
+
+    def ink(self, bbox: Sequence[float] | None = None) -> int:
+        x_start, y_start, x_end, y_end = self.clip(bbox or [0, 0, *self.size])
+        if x_end <= x_start or y_end <= y_start:
+            return 0
+
+        # A copy, so the box is thresholded in isolation rather than as a view into the whole image
+        gray = np.ascontiguousarray(self.gray[y_start:y_end, x_start:x_end])
+        return int(np.count_nonzero(gray_ink_mask(gray)))
+
+    def ink_ratio(self, bbox: Sequence[float] | None = None) -> float:
+        x_start, y_start, x_end, y_end = self.clip(bbox or [0, 0, *self.size])
+        area = (x_end - x_start) * (y_end - y_start)
+        if area == 0:
+            return 0.0
+        return self.ink(bbox) / area
+
+    def is_blank(self, bbox: Sequence[float] | None = None) -> bool:
+        return self.ink(bbox) == 0
+
+
+def is_degenerate_polygon(polygon: Optional[List[List[int]]]) -> bool:
+    if polygon is None:
+        return False
+    rounded_polys = [[int(corner[0]), int(corner[1])] for corner in polygon]
+    return rounded_polys[0] == rounded_polys[1] and rounded_polys[2] == rounded_polys[3]
+
 
 def is_blank_image(image: Image.Image, polygon: Optional[List[List[int]]] = None) -> bool:
-    image = np.asarray(image)
     if (
         image is None
-        or image.size == 0
-        or image.shape[0] == 0
-        or image.shape[1] == 0
+        or image.width == 0
+        or image.height == 0
     ):
         # Handle empty image case
         return True
 
-    if polygon is not None:
-        rounded_polys = [[int(corner[0]), int(corner[1])] for corner in polygon]
-        if rounded_polys[0] == rounded_polys[1] and rounded_polys[2] == rounded_polys[3]:
-            return True
+    if is_degenerate_polygon(polygon):
+        return True
 
-    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-    gray = cv2.GaussianBlur(gray, (7, 7), 0)
+    return InkMap(image).is_blank()
 
-    # Adaptive threshold (inverse for text as white)
-    binarized = cv2.adaptiveThreshold(
-        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 15
-    )
 
-    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
-        binarized, connectivity=8
-    )
-    cleaned = np.zeros_like(binarized)
-    for i in range(1, num_labels):  # skip background
-        cleaned[labels == i] = 255
-
-    kernel = np.ones((1, 5), np.uint8)
-    dilated = cv2.dilate(cleaned, kernel, iterations=3)
-    b = dilated / 255
-    return bool(b.sum() == 0)
\ No newline at end of file
+def perceptual_hash(image: Image.Image, hash_size: int = 16) -> np.ndarray:
+    """
+    Difference hash of an image, as a flat boolean array.  Pages with the same structure have hashes that
+    differ in few bits, even if their text differs, since text is averaged into gray at this size.
+    """
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = np.asarray(gray, dtype=np.int16)
+    return (pixels[:, 1:] > pixels[:, :-1]).flatten()
+
+
+def hash_distance(hash_a: np.ndarray, hash_b: np.ndarray) -> int:
+    if hash_a.shape != hash_b.shape:
+        return hash_a.size + hash_b.size
+    return int(np.count_nonzero(hash_a != hash_b))
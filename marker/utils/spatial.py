@@ -0,0 +1,193 @@
+import math
+from collections import defaultdict
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    A uniform grid over a set of boxes, for finding the boxes near a query without comparing against every box.
+    Boxes are [x_start, y_start, x_end, y_end], and are referred to by their position in the list the index was
+    built from.  Boxes can be updated, added and removed after the index is built.
+    """
+
+    def __init__(self, bboxes: Sequence[Sequence[float]], cell_size: float | None = None):
+        self.bboxes = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+        self.active = np.ones(len(self.bboxes), dtype=bool)
+
+        if len(self.bboxes):
+            self.origin = self.bboxes[:, :2].min(axis=0)
+            extent = self.bboxes[:, 2:].max(axis=0) - self.origin
+        else:
+            self.origin = np.zeros(2)
+            extent = np.ones(2)
+
+        if cell_size is None:
+            # Around one box per cell, for boxes spread evenly over their extent
+            cell_size = 2 * math.sqrt(extent[0] * extent[1] / max(len(self.bboxes), 1))
+        self.cell_size = max(cell_size, 1.0)
+        self.grid_size = np.maximum(np.ceil(extent / self.cell_size), 1).astype(int)
+
+        self.cells = defaultdict(list)
+        for idx in range(len(self.bboxes)):
+            self.add_cells(idx)
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def cell_range(self, bbox: Sequence[float]) -> Tuple[int, int, int, int]:
+        # Anything outside the grid falls in its edge cells, so boxes added later don't need a larger grid
+        start = np.floor((np.asarray(bbox[:2]) - self.origin) / self.cell_size)
+        end = np.floor((np.asarray(bbox[2:]) - self.origin) / self.cell_size)
+        start = np.clip(start, 0, self.grid_size - 1).astype(int)
+        end = np.clip(end, 0, self.grid_size - 1).astype(int)
+        return start[0], start[1], end[0], end[1]
+
+    def add_cells(self, idx: int):
+        x_start, y_start, x_end, y_end = self.cell_range(self.bboxes[idx])
+        for x in range(x_start, x_end + 1):
+            for y in range(y_start, y_end + 1):
+                self.cells[(x, y)].append(idx)
+
+    def remove_cells(self, idx: int):
+        x_start, y_start, x_end, y_end = self.cell_range(self.bboxes[idx])
+        for x in range(x_start, x_end + 1):
+            for y in range(y_start, y_end + 1):
+                self.cells[(x, y)].remove(idx)
+
+    def insert(self, bbox: Sequence[float]) -> int:
+        idx = len(self.bboxes)
+        self.bboxes = np.vstack([self.bboxes, np.asarray(bbox, dtype=np.float64)])
+        self.active = np.append(self.active, True)
+        self.add_cells(idx)
+        return idx
+
+    def update(self, idx: int, bbox: Sequence[float]):
+        if self.active[idx]:
+            self.remove_cells(idx)
+        self.bboxes[idx] = bbox
+        self.active[idx] = True
+        self.add_cells(idx)
+
+    def remove(self, idx: int):
+        if self.active[idx]:
+            self.remove_cells(idx)
+            self.active[idx] = False
+
+    def candidates(self, bbox: Sequence[float], margin: float = 0) -> np.ndarray:
+        """
+        The sorted indices of the boxes that overlap or touch `bbox`, after expanding it by `margin` on each side.
+        """
+        bbox = [bbox[0] - margin, bbox[1] - margin, bbox[2] + margin, bbox[3] + margin]
+        x_start, y_start, x_end, y_end = self.cell_range(bbox)
+        found = set()
+        for x in range(x_start, x_end + 1):
+            for y in range(y_start, y_end + 1):
+                found.update(self.cells.get((x, y), ()))
+        if not found:
+            return np.zeros(0, dtype=int)
+
+        idxs = np.array(sorted(found))
+        boxes = self.bboxes[idxs]
+        overlaps = (
+            (boxes[:, 0] <= bbox[2])
+            & (boxes[:, 2] >= bbox[0])
+            & (boxes[:, 1] <= bbox[3])
+            & (boxes[:, 3] >= bbox[1])
+        )
+        return idxs[overlaps]
+
+    def intersections(self, bbox: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The indices of the boxes that intersect `bbox` with a positive area, and the areas of the intersections.
+        """
+        idxs = self.candidates(bbox)
+        boxes = self.bboxes[idxs]
+        width = np.minimum(boxes[:, 2], bbox[2]) - np.maximum(boxes[:, 0], bbox[0])
+        height = np.minimum(boxes[:, 3], bbox[3]) - np.maximum(boxes[:, 1], bbox[1])
+        areas = np.maximum(width, 0) * np.maximum(height, 0)
+        positive = areas > 0
+        return idxs[positive], areas[positive]
+
+    def containing(self, bbox: Sequence[float]) -> np.ndarray:
+        """
+        The indices of the boxes that fully contain `bbox`.
+        """
+        idxs = self.candidates(bbox)
+        boxes = self.bboxes[idxs]
+        contains = (
+            (boxes[:, 0] <= bbox[0])
+            & (boxes[:, 1] <= bbox[1])
+            & (boxes[:, 2] >= bbox[2])
+            & (boxes[:, 3] >= bbox[3])
+        )
+        return idxs[contains]
+
+    def gaps(
+        self, bbox: Sequence[float], max_gap: float, exclude: Sequence[int] = ()
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The indices of the boxes within `max_gap` of `bbox`, and their gaps, as the distance between the closest
+        points of the two boxes.  Boxes that overlap have a gap of 0.
+        """
+        idxs = self.candidates(bbox, margin=max_gap)
+        if len(exclude):
+            idxs = idxs[~np.isin(idxs, exclude)]
+        boxes = self.bboxes[idxs]
+        dx = np.maximum(0, np.maximum(boxes[:, 0] - bbox[2], bbox[0] - boxes[:, 2]))
+        dy = np.maximum(0, np.maximum(boxes[:, 1] - bbox[3], bbox[1] - boxes[:, 3]))
+        gaps = np.hypot(dx, dy)
+        near = gaps <= max_gap
+        return idxs[near], gaps[near]
+
+    def nearest(
+        self,
+        point: Sequence[float],
+        x_weight: float = 1,
+        y_weight: float = 1,
+        absolute: bool = False,
+        max_distance: float | None = None,
+    ) -> Tuple[int | None, float | None]:
+        """
+        The box whose center is nearest to `point`, with the same weighted distance as `PolygonBox.center_distance`,
+        and that distance.  Ties go to the lowest index.  Returns (None, None) if no box is within `max_distance`.
+        """
+        if not self.active.any():
+            return None, None
+
+        point = np.asarray(point, dtype=np.float64)
+        boxes = self.bboxes[self.active]
+        bounds = [*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0)]
+        radius = self.cell_size if max_distance is None else max_distance
+        while True:
+            # Every center within `radius` of the point is inside this window
+            if absolute:
+                x_reach, y_reach = radius / x_weight, radius / y_weight
+            else:
+                x_reach, y_reach = radius / math.sqrt(x_weight), radius / math.sqrt(y_weight)
+            window = [point[0] - x_reach, point[1] - y_reach, point[0] + x_reach, point[1] + y_reach]
+            covers_all = (
+                window[0] <= bounds[0]
+                and window[1] <= bounds[1]
+                and window[2] >= bounds[2]
+                and window[3] >= bounds[3]
+            )
+
+            idxs = self.candidates(window)
+            if len(idxs):
+                boxes = self.bboxes[idxs]
+                dx = (boxes[:, 0] + boxes[:, 2]) / 2 - point[0]
+                dy = (boxes[:, 1] + boxes[:, 3]) / 2 - point[1]
+                if absolute:
+                    distances = np.abs(dx) * x_weight + np.abs(dy) * y_weight
+                else:
+                    distances = np.sqrt(dx**2 * x_weight + dy**2 * y_weight)
+
+                best = int(np.argmin(distances))
+                if distances[best] <= radius or (covers_all and max_distance is None):
+                    return int(idxs[best]), float(distances[best])
+
+            if max_distance is not None or covers_all:
+                return None, None
+            radius *= 2
@@ -0,0 +1,38 @@
+import pytest
+
+from marker.builders.document import DocumentBuilder
+from marker.builders.line import LineBuilder
+from marker.providers import ProviderOutput
+from marker.schema.polygon import PolygonBox
+from marker.schema.text.line import Line
+
+
+def make_lines(heights):
+    return [
+        ProviderOutput(
+            line=Line(polygon=PolygonBox.from_bbox([0, 0, 100, height]), page_id=0),
+            spans=[],
+            chars=[],
+        )
+        for height in heights
+    ]
+
+
+@pytest.mark.config({"page_range": [0], "adaptive_highres_dpi": True})
+def test_adaptive_highres_dpi(config, doc_provider, detection_model, ocr_error_model):
+    line_builder = LineBuilder(detection_model, ocr_error_model, config)
+
+    # 12pt lines at 192 DPI are 32 pixels tall
+    assert line_builder.get_highres_dpi(make_lines([12] * 10)) == 192
+    assert line_builder.get_highres_dpi(make_lines([24] * 10)) == 96
+    # A few small lines pull the DPI up, up to the maximum
+    assert line_builder.get_highres_dpi(make_lines([24] * 8 + [4] * 2)) == 288
+    assert line_builder.get_highres_dpi([]) is None
+
+    document = DocumentBuilder(config).build_document(doc_provider)
+    page = document.pages[0]
+    page.set_image_dpi(96)
+    width, height = doc_provider.get_images([0], 96)[0].size
+    assert page.get_image(highres=True).size == (width, height)
+    assert page.get_image_size(highres=True) == (width, height)
+    assert page.get_image(highres=False).size == (width, height)
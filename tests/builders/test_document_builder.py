@@ -1,5 +1,9 @@
 import pytest
 
+from marker.builders.document import DocumentBuilder
+from marker.builders.layout import LayoutBuilder
+from marker.builders.line import LineBuilder
+from marker.builders.ocr import OcrBuilder
 from marker.schema import BlockTypes
 from marker.schema.text.line import Line
 
@@ -40,3 +44,64 @@ def test_document_builder_inline_eq(pdf_document):
     assert first_span.block_type == BlockTypes.Span
     assert first_span.text.strip() == "Subspace Adversarial Training"
     assert "bold" in first_span.formats
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_document_builder_lazy_images(config, doc_provider):
+    document = DocumentBuilder(config).build_document(doc_provider)
+    page = document.pages[0]
+    assert page.lowres_image is None
+    assert page.highres_image is None
+
+    assert page.get_image(highres=False).size == (816, 1056)
+    assert list(page._image_cache.images.keys()) == [(0, False)]
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_document_builder_page_cache(
+    config,
+    doc_provider,
+    layout_model,
+    ocr_error_model,
+    recognition_model,
+    detection_model,
+    tmp_path,
+):
+    config = {**config, "page_cache_dir": str(tmp_path)}
+    layout_builder = LayoutBuilder(layout_model, config)
+    line_builder = LineBuilder(detection_model, ocr_error_model, config)
+    ocr_builder = OcrBuilder(recognition_model, config)
+
+    first = DocumentBuilder(config)(doc_provider, layout_builder, line_builder, ocr_builder)
+    second = DocumentBuilder(config)(doc_provider, layout_builder, line_builder, ocr_builder)
+
+    assert "cached" not in first.pages[0].page_plan
+    assert second.pages[0].page_plan["cached"]
+    assert second.pages[0].structure == first.pages[0].structure
+    assert second.pages[0].raw_text(second) == first.pages[0].raw_text(first)
+
+
+@pytest.mark.filename("thinkpython.pdf")
+@pytest.mark.config({"page_range": [0, 1, 2, 3, 4]})
+def test_document_builder_pipelined(
+    config,
+    doc_provider,
+    layout_model,
+    ocr_error_model,
+    recognition_model,
+    detection_model,
+):
+    layout_builder = LayoutBuilder(layout_model, config)
+    line_builder = LineBuilder(detection_model, ocr_error_model, config)
+    ocr_builder = OcrBuilder(recognition_model, config)
+
+    serial = DocumentBuilder(config)(doc_provider, layout_builder, line_builder, ocr_builder)
+    pipelined_config = {**config, "pipeline_batch_pages": 2, "pipeline_depth": 1}
+    pipelined = DocumentBuilder(pipelined_config)(
+        doc_provider, layout_builder, line_builder, ocr_builder
+    )
+
+    assert [p.page_id for p in pipelined.pages] == [0, 1, 2, 3, 4]
+    for serial_page, pipelined_page in zip(serial.pages, pipelined.pages):
+        assert pipelined_page.structure == serial_page.structure
+        assert pipelined_page.raw_text(pipelined) == serial_page.raw_text(serial)
@@ -54,3 +54,25 @@ def test_nongarbled_builder(config, doc_provider, detection_model, ocr_error_mod
     )
     assert len(bad_ocr_results.labels) == 2
     assert all([label == "good" for label in bad_ocr_results.labels])
+
+
+@pytest.mark.filename("hindi_judgement.pdf")
+@pytest.mark.config({"page_range": [2, 3], "disable_ocr": True, "ocr_error_cascade": True})
+def test_ocr_error_cascade(config, doc_provider, detection_model, ocr_error_model):
+    line_builder = LineBuilder(detection_model, ocr_error_model, config)
+    builder = DocumentBuilder(config)
+    document = builder.build_document(doc_provider)
+
+    # Text in scripts the word statistics can't judge is never labeled clean without the model
+    labels, decisions = line_builder.get_ocr_error_labels(
+        document.pages, doc_provider.page_lines, doc_provider
+    )
+    assert len(labels) == 2
+    assert any([label == "bad" for label in labels])
+    assert all(decision != "clean_text" for decision in decisions.values())
+
+    clean_text = " ".join(
+        ["The report was written in the spring, and it is one of the first"] * 4
+    )
+    assert line_builder.heuristic_ocr_error_label(clean_text) == "good"
+    assert line_builder.heuristic_ocr_error_label("") == "bad"
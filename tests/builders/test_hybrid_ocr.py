@@ -0,0 +1,37 @@
+import pytest
+
+from marker.builders.document import DocumentBuilder
+from marker.builders.layout import LayoutBuilder
+from marker.builders.line import LineBuilder
+from marker.schema import BlockTypes
+
+
+@pytest.mark.filename("thinkpython.pdf")
+@pytest.mark.config({"page_range": [0]})
+def test_hybrid_ocr_blocks(
+    config, doc_provider, layout_model, ocr_error_model, detection_model
+):
+    layout_builder = LayoutBuilder(layout_model, config)
+    line_builder = LineBuilder(detection_model, ocr_error_model, config)
+    builder = DocumentBuilder(config)
+    document = builder.build_document(doc_provider)
+    layout_builder(document, doc_provider)
+    page = document.pages[0]
+
+    # Drop the provider lines of one block, as if its text was only in an image
+    text_blocks = page.contained_blocks(document, (BlockTypes.Text,))
+    missing_block = text_blocks[0]
+    provider_lines = [
+        line
+        for line in doc_provider.get_page_lines(page.page_id)
+        if line.line.polygon.intersection_area(missing_block.polygon) == 0
+    ]
+
+    ocr_blocks = line_builder.get_hybrid_ocr_blocks(page, provider_lines, doc_provider)
+    assert missing_block.id in [block.id for block in ocr_blocks]
+    assert len(ocr_blocks) < len(page.structure)
+
+    kept_lines, _ = line_builder.split_hybrid_lines(
+        page, ocr_blocks, provider_lines, []
+    )
+    assert 0 < len(kept_lines) <= len(provider_lines)
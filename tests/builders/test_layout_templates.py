@@ -0,0 +1,41 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from marker.builders.document import DocumentBuilder
+from marker.builders.layout import LayoutBuilder
+from marker.cache import LayoutTemplateCache
+from marker.providers.pdf import PdfProvider
+
+
+@pytest.mark.filename("thinkpython.pdf")
+@pytest.mark.config({"page_range": [0], "layout_templates": True})
+def test_layout_templates(config, doc_provider, layout_model):
+    LayoutTemplateCache._shared.clear()
+    layout_builder = LayoutBuilder(layout_model, config)
+
+    first = DocumentBuilder(config).build_document(doc_provider)
+    layout_builder(first, doc_provider)
+    second = DocumentBuilder(config).build_document(doc_provider)
+    layout_builder(second, doc_provider)
+
+    assert not (first.pages[0].page_plan or {}).get("layout_template")
+    assert second.pages[0].page_plan["layout_template"]
+    assert [b.block_type for b in second.pages[0].children] == [
+        b.block_type for b in first.pages[0].children
+    ]
+
+
+@pytest.mark.config({"page_range": [0], "layout_templates": True})
+def test_layout_templates_image_page(config, tmp_path, layout_model):
+    LayoutTemplateCache._shared.clear()
+    image = Image.new("RGB", (850, 1100), "white")
+    ImageDraw.Draw(image).text((100, 100), "Scanned text", fill="black")
+    image.save(tmp_path / "scanned.pdf", "PDF", resolution=100)
+    provider = PdfProvider(str(tmp_path / "scanned.pdf"), config)
+    layout_builder = LayoutBuilder(layout_model, config)
+
+    # Pages without text lines never match a template, and are laid out as usual
+    for _ in range(2):
+        document = DocumentBuilder(config).build_document(provider)
+        layout_builder(document, provider)
+        assert not (document.pages[0].page_plan or {}).get("layout_template")
@@ -0,0 +1,91 @@
+import pytest
+
+from marker.builders.native.document import DocxBuilder
+from marker.builders.native.epub import EpubBuilder
+from marker.builders.native.html import HTMLBuilder
+from marker.builders.native.powerpoint import PowerPointBuilder
+from marker.builders.native.spreadsheet import SpreadSheetBuilder
+from marker.converters.pdf import PdfConverter
+from marker.renderers.markdown import MarkdownOutput
+from marker.schema import BlockTypes
+
+
+@pytest.mark.filename("single_sheet.xlsx")
+def test_spreadsheet_builder(config, temp_doc):
+    document = SpreadSheetBuilder(config)(temp_doc.name)
+
+    first_page = document.pages[0]
+    header = first_page.contained_blocks(document, (BlockTypes.SectionHeader,))[0]
+    assert header.raw_text(document).strip() == "Sheet1"
+
+    tables = first_page.contained_blocks(document, (BlockTypes.Table,))
+    assert len(tables) == 1
+    assert len(tables[0].contained_blocks(document, (BlockTypes.TableCell,))) > 0
+
+
+@pytest.mark.filename("lambda.pptx")
+def test_powerpoint_builder(config, temp_doc):
+    document = PowerPointBuilder(config)(temp_doc.name)
+
+    first_page = document.pages[0]
+    assert first_page.page_plan == {"native": True}
+    text = "".join(
+        block.raw_text(document)
+        for block in first_page.contained_blocks(
+            document, (BlockTypes.SectionHeader, BlockTypes.Text)
+        )
+    )
+    assert "Lambda Calculus" in text
+
+
+@pytest.mark.filename("gatsby.docx")
+def test_docx_builder(config, temp_doc):
+    document = DocxBuilder(config)(temp_doc.name)
+
+    text = "".join(
+        block.raw_text(document)
+        for page in document.pages
+        for block in page.contained_blocks(
+            document, (BlockTypes.SectionHeader, BlockTypes.Text)
+        )
+    )
+    assert "Themes" in text
+
+
+@pytest.mark.filename("manual.epub")
+def test_epub_builder(config, temp_doc):
+    document = EpubBuilder(config)(temp_doc.name)
+
+    first_page = document.pages[0]
+    text = "".join(
+        block.raw_text(document)
+        for block in first_page.contained_blocks(
+            document, (BlockTypes.SectionHeader, BlockTypes.Text)
+        )
+    )
+    assert "The Project Gutenberg eBook of Simple" in text
+
+
+@pytest.mark.filename("china.html")
+def test_html_builder(config, temp_doc):
+    document = HTMLBuilder(config)(temp_doc.name)
+
+    headers = [
+        block.raw_text(document)
+        for page in document.pages
+        for block in page.contained_blocks(document, (BlockTypes.SectionHeader,))
+    ]
+    assert any("China" in header for header in headers)
+    assert all(page.page_plan == {"native": True} for page in document.pages)
+
+
+@pytest.mark.output_format("markdown")
+@pytest.mark.config({"native_office": True})
+@pytest.mark.filename("single_sheet.xlsx")
+def test_pdf_converter_native_office(pdf_converter: PdfConverter, temp_doc):
+    with open(temp_doc.name, "rb") as f:
+        data = f.read()
+
+    markdown_output: MarkdownOutput = pdf_converter(data)
+    assert "# Sheet1" in markdown_output.markdown
+    assert "|" in markdown_output.markdown
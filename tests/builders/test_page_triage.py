@@ -0,0 +1,64 @@
+import pypdfium2 as pdfium
+import pytest
+from PIL import Image, ImageDraw
+
+from marker.builders.document import DocumentBuilder
+from marker.builders.line import LineBuilder
+from marker.providers.pdf import PdfProvider
+
+
+def make_blank_pdf(path):
+    doc = pdfium.PdfDocument.new()
+    doc.new_page(612, 792)
+    doc.save(str(path))
+    return str(path)
+
+
+def make_image_pdf(path):
+    # A page that is only an image, with no text layer
+    image = Image.new("RGB", (850, 1100), "white")
+    ImageDraw.Draw(image).text((100, 100), "Scanned text", fill="black")
+    image.save(path, "PDF", resolution=100)
+    return str(path)
+
+
+def build_page_plan(provider, config, detection_model, ocr_error_model):
+    document = DocumentBuilder(config).build_document(provider)
+    line_builder = LineBuilder(detection_model, ocr_error_model, config)
+    line_builder.get_all_lines(document, provider)
+    return document.pages[0]
+
+
+@pytest.mark.config({"page_range": [0], "page_triage": True})
+def test_triage_blank_page(tmp_path, config, detection_model, ocr_error_model):
+    provider = PdfProvider(make_blank_pdf(tmp_path / "blank.pdf"), config)
+    assert provider.get_page_triage(0) == "blank"
+
+    page = build_page_plan(provider, config, detection_model, ocr_error_model)
+    assert page.triage == "blank"
+    assert page.page_plan["triage"] == "blank"
+    assert page.page_plan["ocr_error_decision"] == "triage"
+    assert not page.page_plan["line_detection"]
+
+
+@pytest.mark.config({"page_range": [0], "page_triage": True})
+def test_triage_image_pdf(tmp_path, config, detection_model, ocr_error_model):
+    provider = PdfProvider(make_image_pdf(tmp_path / "scanned.pdf"), config)
+    assert provider.get_page_triage(0) == "scanned"
+
+    page = build_page_plan(provider, config, detection_model, ocr_error_model)
+    assert page.page_plan["triage"] == "scanned"
+    assert page.page_plan["ocr_error_decision"] == "triage"
+    assert page.page_plan["line_detection"]
+    assert page.text_extraction_method == "surya"
+
+
+@pytest.mark.filename("thinkpython.pdf")
+@pytest.mark.config({"page_range": [0], "page_triage": True})
+def test_triage_digital_page(config, doc_provider, detection_model, ocr_error_model):
+    assert doc_provider.get_page_triage(0) == "digital"
+
+    page = build_page_plan(doc_provider, config, detection_model, ocr_error_model)
+    assert page.page_plan["triage"] == "digital"
+    assert page.page_plan["ocr_error_decision"] == "triage"
+    assert not page.page_plan["ocr_error_detection"]
@@ -0,0 +1,32 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from marker.builders.document import DocumentBuilder
+from marker.builders.line import LineBuilder
+from marker.providers.pdf import PdfProvider
+
+
+def make_image_pdf(path):
+    # A page that is only an image, with no text layer
+    image = Image.new("RGB", (850, 1100), "white")
+    ImageDraw.Draw(image).text((100, 100), "Scanned text", fill="black")
+    image.save(path, "PDF", resolution=100)
+    return str(path)
+
+
+@pytest.mark.parametrize("stream_config", [{}, {"pdftext_window_pages": 1}])
+def test_textless_page_lines(
+    tmp_path, stream_config, detection_model, ocr_error_model
+):
+    config = {"page_range": [0], **stream_config}
+    provider = PdfProvider(make_image_pdf(tmp_path / "scanned.pdf"), config)
+    assert provider.get_page_lines(0) == []
+    assert provider.get_page_refs(0) == []
+
+    document = DocumentBuilder(config).build_document(provider)
+    line_builder = LineBuilder(detection_model, ocr_error_model, config)
+    provider_lines, ocr_lines = line_builder.get_all_lines(document, provider)
+
+    assert provider_lines[0] == []
+    assert document.pages[0].text_extraction_method == "surya"
+    assert len(ocr_lines[0]) > 0
@@ -2,6 +2,8 @@ import io
 
 import pytest
 from marker.converters.pdf import PdfConverter
+from marker.processors.table import TableProcessor
+from marker.utils.batch import BatchedModel
 from marker.renderers.markdown import MarkdownOutput
 
 
@@ -103,3 +105,83 @@ def test_pdf_converter_bytes(pdf_converter: PdfConverter, temp_doc):
     # Some assertions for line joining across columns
     assert "remain similar across a wide range of choices." in markdown  # pg: 2
     assert "a new scheme for designing more robust and efficient" in markdown  # pg: 8
+
+
+@pytest.mark.output_format("markdown")
+@pytest.mark.config({"page_range": [0], "disable_ocr": True})
+def test_pdf_converter_cache(pdf_converter: PdfConverter, temp_doc, tmp_path):
+    pdf_converter.conversion_cache_dir = str(tmp_path)
+    first: MarkdownOutput = pdf_converter(temp_doc.name)
+
+    cached_files = list((tmp_path / "documents").rglob("*.pkl"))
+    assert len(cached_files) == 1
+
+    second: MarkdownOutput = pdf_converter(temp_doc.name)
+    assert second.markdown == first.markdown
+    assert pdf_converter.page_count == 1
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_pdf_converter_provider_config(pdf_converter: PdfConverter):
+    # Character boxes are retained for table cell text, only if tables are processed
+    assert pdf_converter.provider_config()["retain_chars"]
+    pdf_converter.processor_list = [
+        p for p in pdf_converter.processor_list if not isinstance(p, TableProcessor)
+    ]
+    assert "retain_chars" not in pdf_converter.provider_config()
+
+
+@pytest.mark.output_format("markdown")
+@pytest.mark.config({"page_range": [0, 1], "disable_ocr": True})
+def test_pdf_converter_shards(pdf_converter: PdfConverter, config, temp_doc):
+    unsharded: MarkdownOutput = pdf_converter(temp_doc.name)
+
+    shards = []
+    for page_range in ([0], [1]):
+        pdf_converter.config = {**config, "page_range": page_range}
+        shards.append(pdf_converter.build_shard(temp_doc.name))
+    assert all(page._image_cache is None for shard in shards for page in shard.pages)
+
+    pdf_converter.config = config
+    merged: MarkdownOutput = pdf_converter.merge_shards(temp_doc.name, shards)
+    assert pdf_converter.page_count == 2
+    assert "# Subspace Adversarial Training" in merged.markdown
+    assert (
+        "AT solutions. However, these methods highly rely on specifically"
+        in merged.markdown
+    )  # Joined across the shard boundary
+    assert merged.markdown == unsharded.markdown
+
+
+@pytest.mark.output_format("markdown")
+@pytest.mark.config({"page_range": [0], "disable_ocr": True})
+def test_pdf_converter_convert_many(pdf_converter: PdfConverter, temp_doc):
+    with open(temp_doc.name, "rb") as f:
+        data = f.read()
+
+    single = pdf_converter(temp_doc.name).markdown
+    outputs = list(
+        pdf_converter.convert_many([temp_doc.name, data, b"not a pdf"], return_exceptions=True)
+    )
+
+    assert len(outputs) == 3
+    assert outputs[0].markdown == single
+    assert outputs[1].markdown == single
+    assert isinstance(outputs[2], Exception)
+    assert pdf_converter.page_count is not None
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_pdf_converter_model_batching(pdf_converter: PdfConverter, model_dict):
+    table_processor = next(
+        p for p in pdf_converter.processor_list if isinstance(p, TableProcessor)
+    )
+    model = model_dict["table_rec_model"]
+
+    # Models are only wrapped while documents are batched, and restored afterwards
+    assert table_processor.table_rec_model is model
+    with pdf_converter.model_batcher.document():
+        assert isinstance(model_dict["table_rec_model"], BatchedModel)
+        assert table_processor.table_rec_model is model_dict["table_rec_model"]
+    assert model_dict["table_rec_model"] is model
+    assert table_processor.table_rec_model is model
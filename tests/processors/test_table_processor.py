@@ -88,3 +88,33 @@ def test_split_rows(pdf_document, recognition_model, table_rec_model, detection_
     )
     unique_rows = len(set([cell.row_id for cell in cells]))
     assert unique_rows == 6
+
+
+@pytest.mark.config({"page_range": [5], "retain_chars": True})
+def test_table_text_from_provider_chars(
+    pdf_document, temp_doc, recognition_model, table_rec_model, detection_model
+):
+    processor = TableProcessor(recognition_model, table_rec_model, detection_model)
+    page = pdf_document.pages[0]
+    assert page.get_provider_chars() is not None
+    img_size = page.get_image_size(highres=True)
+
+    def extract_blocks():
+        return [
+            {
+                "page_id": page.page_id,
+                "table_bbox": table.polygon.rescale(page.polygon.size, img_size).bbox,
+                "img_size": img_size,
+            }
+            for table in page.contained_blocks(pdf_document, (BlockTypes.Table,))
+        ]
+
+    # Text from the retained characters matches parsing the PDF again
+    reused = extract_blocks()
+    processor.assign_pdftext_lines(reused, temp_doc.name, pdf_document)
+    reparsed = extract_blocks()
+    processor.assign_pdftext_lines(reparsed, temp_doc.name)
+    assert reused
+    assert [b.get("table_text_lines") for b in reused] == [
+        b.get("table_text_lines") for b in reparsed
+    ]
@@ -55,4 +55,12 @@ def test_xlsx_provider(doc_provider):
     page_lines = doc_provider.get_page_lines(0)
 
     spans = page_lines[0].spans
-    assert spans[0].text == "Sheet1"
\ No newline at end of file
+    assert spans[0].text == "Sheet1"
+
+def test_pptx_provider_invalid(tmp_path):
+    from marker.providers.powerpoint import PowerPointProvider
+
+    path = tmp_path / "broken.pptx"
+    path.write_bytes(b"not a presentation")
+    with pytest.raises(ValueError):
+        PowerPointProvider(str(path))
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from marker.providers import html_pdf
+from marker.providers.html_pdf import RenderPool
+from marker.providers.pdf import PdfProvider
+
+
+def test_render_pool(tmp_path):
+    pool = RenderPool(workers=1, timeout=60)
+    try:
+        for i in range(2):
+            output_path = str(tmp_path / f"{i}.pdf")
+            pool.write_pdf(output_path, string=f"<h1>Document {i}</h1>")
+
+            provider = PdfProvider(output_path)
+            assert len(provider) == 1
+
+        # The worker is reused between documents
+        assert pool.started == 1
+    finally:
+        pool.close()
+
+
+def test_render_pool_timeout(tmp_path):
+    pool = RenderPool(workers=1, timeout=0.001)
+    try:
+        with pytest.raises(TimeoutError):
+            pool.write_pdf(str(tmp_path / "slow.pdf"), string="<p>text</p>" * 10000)
+
+        # The stuck worker is killed, and replaced on the next render
+        assert pool.started == 0
+    finally:
+        pool.close()
+
+
+def test_render_pool_timeout_wakes_waiters(tmp_path):
+    pool = RenderPool(workers=1, timeout=0.001)
+    errors = []
+
+    def render(i):
+        try:
+            pool.write_pdf(str(tmp_path / f"{i}.pdf"), string="<p>text</p>" * 10000)
+        except TimeoutError as e:
+            errors.append(e)
+
+    try:
+        # The second render waits for the only worker, and starts a replacement once it is killed
+        threads = [threading.Thread(target=render, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=120)
+        assert not any(thread.is_alive() for thread in threads)
+        assert len(errors) == 2
+        assert pool.started == 0
+    finally:
+        pool.close()
+
+
+def test_render_pool_start_failure(monkeypatch):
+    pool = RenderPool(workers=1)
+
+    def fail():
+        raise OSError("no processes left")
+
+    monkeypatch.setattr(pool, "start_worker", fail)
+    with pytest.raises(OSError):
+        pool.acquire()
+    # The failed start gives its slot back
+    assert pool.started == 0
+
+
+def test_get_render_pool_shared(monkeypatch):
+    monkeypatch.setattr(html_pdf.settings, "PDF_RENDER_WORKERS", 1)
+    monkeypatch.setattr(html_pdf, "_render_pool", None)
+    monkeypatch.setattr(html_pdf.atexit, "register", lambda fn: fn)
+
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def get_pool():
+        barrier.wait()
+        pools.append(html_pdf.get_render_pool())
+
+    threads = [threading.Thread(target=get_pool) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(pool) for pool in pools}) == 1
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from PIL import Image
+
+from marker.providers.images import ImageBudget, PageImageCache
+
+
+class FakeProvider:
+    def __init__(self):
+        self.rendered = []
+
+    def get_multires_images(self, page_ids, dpis):
+        self.rendered.extend(page_ids)
+        return {
+            dpi: [Image.new("RGB", (dpi, dpi), (page_id, 0, 0)) for page_id in page_ids]
+            for dpi in dpis
+        }
+
+    def get_image_size(self, idx, dpi):
+        return dpi, dpi
+
+    def get_region_image(self, idx, bbox, dpi):
+        self.rendered.append((idx, tuple(bbox)))
+        return Image.new("RGB", (bbox[2] - bbox[0], bbox[3] - bbox[1]), (idx, 0, 0))
+
+
+def test_page_image_cache_spill(tmp_path):
+    provider = FakeProvider()
+    # Room for two lowres images
+    budget = ImageBudget(2 * 10 * 10 * 3)
+    cache = PageImageCache(
+        provider, 10, 20, budget.max_bytes, budget=budget, spill=True, spill_dir=str(tmp_path)
+    )
+
+    for page_id in range(4):
+        cache.get(page_id)
+    assert len(cache.images) == 2
+    assert set(cache.spilled) == {(0, False), (1, False)}
+
+    # Spilled images are read back instead of rendered again
+    image = cache.get(0)
+    assert image.getpixel((0, 0)) == (0, 0, 0)
+    assert provider.rendered == [0, 1, 2, 3]
+
+    cache.release([0, 1, 2, 3], highres=False)
+    assert not cache.images and not cache.spilled
+    assert budget.current_bytes == 0
+
+    # Released images are rendered again on demand
+    assert cache.get(1).getpixel((0, 0)) == (1, 0, 0)
+    assert provider.rendered == [0, 1, 2, 3, 1]
+
+    cache.clear()
+    assert not any(tmp_path.iterdir())
+
+
+def test_page_image_budget_shared():
+    budget = ImageBudget(2 * 10 * 10 * 3)
+    first = PageImageCache(FakeProvider(), 10, 20, budget.max_bytes, budget=budget)
+    second = PageImageCache(FakeProvider(), 10, 20, budget.max_bytes, budget=budget)
+
+    first.get(0)
+    first.get(1)
+    second.get(0)
+
+    # The least recently used image is evicted, even from another cache
+    assert list(first.images) == [(1, False)]
+    assert list(second.images) == [(0, False)]
+    assert budget.current_bytes == budget.max_bytes
+
+    del second
+    assert budget.current_bytes == 10 * 10 * 3
+
+
+def test_page_image_cache_regions():
+    provider = FakeProvider()
+    cache = PageImageCache(provider, 10, 20, 10**6, region_max_fraction=0.25)
+
+    # Small highres regions are rendered on their own, and cached
+    assert cache.get_region(0, [0, 0, 10, 5], highres=True).size == (10, 5)
+    cache.get_region(0, [0, 0, 10, 5], highres=True)
+    assert provider.rendered == [(0, (0, 0, 10, 5))]
+    assert cache.image_size(0, highres=True) == (20, 20)
+
+    # Large regions render the whole page, and later regions are cropped from it
+    assert cache.get_region(0, [0, 0, 20, 10], highres=True).size == (20, 10)
+    cache.get_region(0, [5, 5, 10, 10], highres=True)
+    assert provider.rendered == [(0, (0, 0, 10, 5)), 0]
+
+    cache.release([0], highres=True)
+    assert not cache.images
+
+
+class SlowSpillCache(PageImageCache):
+    def load_spilled(self, *args):
+        # Slow disk reads, so the threads below are reading spilled images at the same time
+        time.sleep(0.01)
+        return super().load_spilled(*args)
+
+
+def test_page_image_cache_spill_threads(tmp_path):
+    budget = ImageBudget(2 * 10 * 10 * 3)
+    caches = [
+        SlowSpillCache(
+            FakeProvider(), 10, 20, budget.max_bytes, budget=budget, spill=True, spill_dir=str(tmp_path)
+        )
+        for _ in range(2)
+    ]
+    for cache in caches:
+        for page_id in range(4):
+            cache.get(page_id)
+
+    # Reading a spilled image back evicts images from the other cache, which is reading its own at the same time
+    errors = []
+
+    def read(cache):
+        try:
+            for _ in range(5):
+                for page_id in range(4):
+                    assert cache.get(page_id).getpixel((0, 0)) == (page_id, 0, 0)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read, args=(cache,), daemon=True) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not errors
+    assert all(cache.provider.rendered == [0, 1, 2, 3] for cache in caches)
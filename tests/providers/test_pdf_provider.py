@@ -1,5 +1,36 @@
+import mmap
+
+import numpy as np
+
 import pytest
 
+from marker.providers.pdf import PdfProvider
+from marker.providers.registry import provider_from_filepath
+
+
+def make_form_pdf(path, value):
+    # One page with a single text field, where only the field value differs between files
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R /AcroForm << /Fields [4 0 R] >> >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Annots [4 0 R] >>",
+        b"<< /Type /Annot /Subtype /Widget /FT /Tx /T (name) /Rect [100 600 400 630] /P 3 0 R /V ("
+        + value.encode("latin-1")
+        + b") >>",
+    ]
+    pdf = b"%PDF-1.7\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(pdf)
+    return str(path)
+
 
 @pytest.mark.config({"page_range": [0]})
 def test_pdf_provider(doc_provider):
@@ -15,3 +46,75 @@ def test_pdf_provider(doc_provider):
     assert spans[0].text == "Subspace Adversarial Training"
     assert spans[0].font == "NimbusRomNo9L-Medi"
     assert spans[0].formats == ["plain"]
+
+
+@pytest.mark.config(
+    {"page_range": [0, 1, 2], "pdftext_window_pages": 2, "pdftext_workers": 1}
+)
+def test_pdf_provider_streaming(doc_provider):
+    assert not doc_provider.is_page_ready(0)
+    assert len(doc_provider.get_page_lines(0)) == 85
+    assert doc_provider.is_page_ready(1)
+    assert not doc_provider.is_page_ready(2)
+
+    assert set(doc_provider.get_all_page_lines().keys()) <= {0, 1, 2}
+    assert doc_provider.is_page_ready(2)
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_pdf_provider_in_memory(config, temp_doc):
+    with open(temp_doc.name, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    assert provider_from_filepath(mapped) is PdfProvider
+    provider = PdfProvider(mapped, config)
+    assert len(provider) == 12
+    assert provider.get_images([0], 96)[0].size == (816, 1056)
+    assert len(provider.get_page_lines(0)) == 85
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_pdf_provider_region_image(doc_provider):
+    page_image = doc_provider.get_images([0], 192)[0]
+    assert doc_provider.get_image_size(0, 192) == page_image.size
+
+    # Regions match crops of the whole page, including past its edges
+    for bbox in [[100, 150, 700, 400], [-20, -10, 300, 200]]:
+        region = doc_provider.get_region_image(0, bbox, 192)
+        assert region.tobytes() == page_image.crop(bbox).tobytes()
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_pdf_provider_retain_chars(config, temp_doc):
+    # Character boxes are only kept when asked for
+    assert PdfProvider(temp_doc.name, config).get_page_chars(0) is None
+
+    provider = PdfProvider(temp_doc.name, {**config, "retain_chars": True})
+    page_chars = provider.get_page_chars(0)
+    assert len(page_chars.chars) == len(page_chars.bboxes) > 0
+
+
+@pytest.mark.config({"page_range": [0]})
+def test_pdf_provider_multires(doc_provider):
+    images = doc_provider.get_multires_images([0], [96, 150, 192])
+    for dpi in (96, 150, 192):
+        direct = doc_provider.get_images([0], dpi)[0]
+        image = images[dpi][0]
+        assert image.size == direct.size == doc_provider.get_image_size(0, dpi)
+
+        # Downsampled images only differ from direct renders by resampling
+        diff = np.abs(
+            np.asarray(image, dtype=np.int16) - np.asarray(direct, dtype=np.int16)
+        )
+        assert diff.mean() < 8
+
+
+@pytest.mark.parametrize("flatten_pdf", [True, False])
+def test_pdf_provider_fingerprint_form_values(tmp_path, flatten_pdf):
+    config = {"flatten_pdf": flatten_pdf}
+    fingerprints = [
+        PdfProvider(make_form_pdf(tmp_path / f"form{i}.pdf", value), config).get_page_fingerprints([0])[0]
+        for i, value in enumerate(["Alice", "Bob", "Alice"])
+    ]
+    assert fingerprints[0] != fingerprints[1]
+    assert fingerprints[0] == fingerprints[2]
@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from marker.cache import PageResultCache
+from marker.schema.groups.page import PageGroup
+from marker.schema.polygon import PolygonBox
+from marker.utils.image import InkMap, is_blank_image
+
+
+def crop_is_blank(image, bbox):
+    # The blank check that binarized every crop on its own
+    gray = cv2.cvtColor(np.asarray(image.crop(bbox)), cv2.COLOR_RGB2GRAY)
+    gray = cv2.GaussianBlur(gray, (7, 7), 0)
+    binarized = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 15
+    )
+    return binarized.sum() == 0
+
+
+def test_page_ink_map():
+    image = Image.new("RGB", (200, 100), "white")
+    ImageDraw.Draw(image).rectangle([20, 20, 60, 30], fill="black")
+    page = PageGroup(
+        page_id=0,
+        polygon=PolygonBox.from_bbox([0, 0, 400, 200]),
+        lowres_image=image,
+    )
+
+    # Page coordinates are twice the image size
+    assert not page.is_blank_region([30, 30, 130, 70])
+    assert page.is_blank_region([200, 100, 400, 200])
+    assert page.is_blank_region([500, 500, 600, 600])
+
+    ink_map = page.get_ink_map()
+    assert ink_map is page.get_ink_map()
+    assert ink_map.ink([15, 15, 61, 31]) > 0
+    assert 0 < ink_map.ink_ratio([10, 10, 70, 40]) < 1
+
+    assert not is_blank_image(image.crop((10, 10, 70, 40)))
+    assert is_blank_image(image.crop((100, 50, 200, 100)))
+
+
+def test_ink_map_matches_crops(tmp_path):
+    # Shaded page with text, so boxes cutting through text and shading are thresholded differently than the page
+    shading = np.linspace(180, 255, 400, dtype=np.uint8)
+    image = Image.fromarray(np.stack([np.tile(shading, (300, 1))] * 3, axis=-1))
+    draw = ImageDraw.Draw(image)
+    for i in range(12):
+        draw.text((10 + (i % 3) * 130, 10 + i * 24), f"Line {i} of some text", fill="black")
+
+    ink_map = InkMap(image)
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        x_start, y_start = rng.integers(0, 395), rng.integers(0, 295)
+        bbox = [
+            int(x_start),
+            int(y_start),
+            int(min(x_start + rng.integers(1, 80), 400)),
+            int(min(y_start + rng.integers(1, 30), 300)),
+        ]
+        assert ink_map.is_blank(bbox) == crop_is_blank(image, bbox)
+
+    # The map isn't stored with pages in the page cache
+    page = PageGroup(page_id=0, polygon=PolygonBox.from_bbox([0, 0, 400, 300]), lowres_image=image)
+    page.is_blank_region([0, 0, 10, 10])
+    cache = PageResultCache(str(tmp_path), "config")
+    cache.put_page("fingerprint", page)
+    assert cache.get_page("fingerprint", 0)._ink_map is None
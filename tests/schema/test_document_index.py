@@ -0,0 +1,98 @@
+from marker.schema import BlockTypes
+from marker.schema.blocks import Block, Table, Text
+from marker.schema.document import Document
+from marker.schema.groups import TableGroup
+from marker.schema.groups.page import PageGroup
+from marker.schema.polygon import PolygonBox
+from marker.schema.text import Line, Span
+
+
+def make_page(page_id):
+    page = PageGroup(page_id=page_id, polygon=PolygonBox.from_bbox([0, 0, 100, 100]))
+    for i in range(3):
+        block = page.add_block(Text, PolygonBox.from_bbox([0, i * 10, 100, i * 10 + 10]))
+        page.add_structure(block)
+    return page
+
+
+def test_document_index():
+    document = Document(filepath="test.pdf", pages=[make_page(i) for i in range(3)])
+    assert document.get_page(2).page_id == 2
+    assert document.get_page(5) is None
+
+    # Pages replaced or added directly are still found
+    document.pages[1] = make_page(7)
+    document.pages.append(make_page(9))
+    assert document.get_page(7) is document.pages[1]
+    assert document.get_page(9) is document.pages[3]
+    assert document.get_page(1) is None
+    assert document.get_next_page(document.pages[1]) is document.pages[2]
+
+    # Structure positions follow structure edits
+    page = document.pages[0]
+    first, second, third = page.structure_blocks(document)
+    assert page.get_next_block(first) is second
+    page.structure.remove(second.id)
+    assert page.get_next_block(first) is third
+    assert page.get_prev_block(third) is first
+
+    # Block types are indexed as blocks are added, and removed blocks don't count
+    assert document.has_block_types((BlockTypes.Text,))
+    assert not document.has_block_types((BlockTypes.Table,))
+    table = page.add_block(Table, PolygonBox.from_bbox([0, 50, 100, 60]))
+    page.add_structure(table)
+    assert document.has_block_types((BlockTypes.Table,))
+    assert document.contained_blocks((BlockTypes.Table,)) == [table]
+
+    page.replace_block(table, Text(polygon=table.polygon, page_id=page.page_id))
+    assert not page.has_block_types((BlockTypes.Table,))
+    assert document.contained_blocks((BlockTypes.Table,)) == []
+
+
+def test_contained_blocks_index():
+    page = make_page(0)
+    document = Document(filepath="test.pdf", pages=[page])
+    first, second, third = page.structure_blocks(document)
+
+    # A line and span in the second block, and a table nested in a group
+    line = page.add_block(Line, PolygonBox.from_bbox([0, 10, 100, 20]))
+    span = page.add_full_block(
+        Span(
+            polygon=line.polygon,
+            page_id=page.page_id,
+            text="text",
+            font="font",
+            font_weight=400,
+            font_size=10,
+            minimum_position=0,
+            maximum_position=0,
+            formats=["plain"],
+        )
+    )
+    line.add_structure(span)
+    second.add_structure(line)
+    group = page.add_block(TableGroup, PolygonBox.from_bbox([0, 50, 100, 60]))
+    table = page.add_block(Table, PolygonBox.from_bbox([0, 50, 100, 60]))
+    group.add_structure(table)
+    page.structure.insert(0, group.id)
+
+    def walk(block_types):
+        return Block.contained_blocks(page, document, block_types)
+
+    # The index gives the same blocks in the same order as walking the page
+    for block_types in [
+        (BlockTypes.Text,),
+        (BlockTypes.Table,),
+        (BlockTypes.Span,),
+        (BlockTypes.Table, BlockTypes.Text),
+        (BlockTypes.TableGroup, BlockTypes.Text),
+    ]:
+        assert page.contained_blocks(document, block_types) == walk(block_types)
+    assert page.contained_blocks(document, (BlockTypes.Text,)) == [first, second, third]
+    assert page.contained_blocks(document, (BlockTypes.Span,)) == [span]
+    assert page.contained_blocks(document, (BlockTypes.Table,)) == [table]
+
+    # Removed blocks, and anything only inside them, are left out
+    second.removed = True
+    assert page.contained_blocks(document, (BlockTypes.Text,)) == [first, third]
+    assert page.contained_blocks(document, (BlockTypes.Span,)) == []
@@ -0,0 +1,44 @@
+import pytest
+
+from marker.schema.polygon import PolygonBox
+
+
+def test_polygon_bbox_cache():
+    box = PolygonBox.from_bbox([0, 0, 10, 20])
+    assert box.bbox == [0, 0, 10, 20]
+
+    # Editing the returned bbox doesn't touch the box, assigning new corners does
+    box.bbox[0] = 5
+    assert box.x_start == 0
+    box.polygon = [[1, 2], [11, 2], [11, 22], [1, 22]]
+    assert box.bbox == [1, 2, 11, 22]
+    assert box.model_dump() == {"polygon": box.polygon, "bbox": [1, 2, 11, 22]}
+
+    moved = box.shift(1, 1)
+    assert moved.bbox == [2, 3, 12, 23]
+    assert box.bbox == [1, 2, 11, 22]
+
+    with pytest.raises(ValueError):
+        PolygonBox(polygon=[[0, 0], [1, 0], [1, 1]])
+
+
+def test_polygon_batch_transforms():
+    boxes = [
+        PolygonBox.from_bbox([0, 0, 10, 20]),
+        PolygonBox(polygon=[[5, 5], [30, 8], [28, 40], [4, 38]]),
+    ]
+
+    rescaled = PolygonBox.rescale_many(boxes, (100, 200), (50, 400))
+    assert [b.polygon for b in rescaled] == [b.rescale((100, 200), (50, 400)).polygon for b in boxes]
+    assert [b.bbox for b in rescaled] == [b.rescale((100, 200), (50, 400)).bbox for b in boxes]
+
+    fit = PolygonBox.fit_many_to_bounds(boxes, (2, 2, 25, 30))
+    assert [b.polygon for b in fit] == [b.fit_to_bounds((2, 2, 25, 30)).polygon for b in boxes]
+
+    expanded = PolygonBox.expand_many([b.polygon for b in boxes], 0.1, 0.2)
+    for batch, box in zip(expanded, boxes):
+        assert batch.polygon == pytest.approx(box.expand(0.1, 0.2).polygon)
+
+    assert PolygonBox.rescale_many([], (1, 1), (2, 2)) == []
+    with pytest.raises(ValueError):
+        PolygonBox.rescale_many([[[0, 0], [1, 0], [1, 1]]], (1, 1), (2, 2))
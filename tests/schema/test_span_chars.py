@@ -0,0 +1,60 @@
+import pytest
+from pdftext.extraction import dictionary_output
+
+from marker.cache import PageResultCache
+from marker.schema.groups.page import PageGroup
+from marker.schema.polygon import PolygonBox
+
+
+def eager_chars(filepath, provider):
+    # The Char fields the provider used to build for every character up front
+    pages = dictionary_output(
+        filepath, page_range=[0], workers=1, **provider.pdftext_kwargs()
+    )
+    return [
+        [
+            (c["char"], PolygonBox.from_bbox(c["bbox"], ensure_nonzero_area=True).bbox, c["char_idx"])
+            for c in span["chars"]
+        ]
+        for block in pages[0]["blocks"]
+        for line in block["lines"]
+        for span in line["spans"]
+        if span["text"]
+    ]
+
+
+def lazy_chars(page, spans):
+    return [
+        [(c.text, c.polygon.bbox, c.idx) for c in page.get_span_chars(span)]
+        for span in spans
+    ]
+
+
+@pytest.mark.config({"page_range": [0], "keep_chars": True})
+def test_span_chars(doc_provider, temp_doc, tmp_path):
+    page = PageGroup(page_id=0, polygon=doc_provider.get_page_bbox(0))
+    page.set_provider_chars(doc_provider.get_page_chars(0))
+    spans = [
+        page.add_full_block(span)
+        for provider_line in doc_provider.get_page_lines(0)
+        for span in provider_line.spans
+    ]
+    char_ranges = [span.char_range for span in spans]
+    expected = eager_chars(temp_doc.name, doc_provider)
+    assert lazy_chars(page, spans) == expected
+    # Built once, and read back from the span structure after that
+    assert lazy_chars(page, spans) == expected
+
+    # Pages from the page cache get the character store from the provider again
+    page = PageGroup(page_id=0, polygon=doc_provider.get_page_bbox(0))
+    spans = [
+        page.add_full_block(span.model_copy(update={"structure": None, "char_range": char_range}))
+        for span, char_range in zip(spans, char_ranges)
+    ]
+    cache = PageResultCache(str(tmp_path), "config")
+    cache.put_page("fingerprint", page)
+    cached = cache.get_page("fingerprint", 0)
+    assert cached.get_provider_chars() is None
+    cached.set_provider_chars(doc_provider.get_page_chars(0))
+    cached_spans = [cached.get_block(span.id) for span in spans]
+    assert lazy_chars(cached, cached_spans) == expected
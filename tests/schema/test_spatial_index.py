@@ -0,0 +1,32 @@
+import numpy as np
+
+from marker.util import matrix_intersection_area
+from marker.utils.spatial import SpatialIndex
+
+
+def test_spatial_index():
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 600, (200, 2))
+    bboxes = np.hstack([starts, starts + rng.uniform(1, 80, (200, 2))]).tolist()
+    index = SpatialIndex(bboxes)
+
+    query = [100, 100, 250, 180]
+    idxs, areas = index.intersections(query)
+    expected = matrix_intersection_area([query], bboxes)[0]
+    assert idxs.tolist() == np.nonzero(expected)[0].tolist()
+    assert np.allclose(areas, expected[expected > 0])
+
+    centers = (np.array(bboxes)[:, :2] + np.array(bboxes)[:, 2:]) / 2
+    distances = np.sqrt((centers[:, 0] - 300) ** 2 * 5 + (centers[:, 1] - 300) ** 2)
+    nearest_idx, distance = index.nearest([300, 300], x_weight=5)
+    assert nearest_idx == distances.argmin()
+    assert np.isclose(distance, distances.min())
+    assert index.nearest([5000, 5000], max_distance=20) == (None, None)
+
+    index.update(0, [1000, 1000, 1010, 1010])
+    assert index.containing([1002, 1002, 1005, 1005]).tolist() == [0]
+    index.remove(0)
+    assert len(index.containing([1002, 1002, 1005, 1005])) == 0
+
+    gap_idxs, gaps = index.gaps([700, 0, 710, 10], max_gap=50)
+    assert all(gaps <= 50)